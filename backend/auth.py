@@ -5,7 +5,8 @@ import json
 import logging
 import secrets
 import time
-from typing import Any
+from collections import OrderedDict
+from typing import Any, cast
 from urllib.parse import urlencode
 
 import httpx
@@ -26,6 +27,7 @@ from .config import (
     SOCRATA_SECRET_TOKEN,
     fernet,
 )
+from .http_client import get_http_client
 from .models import (
     OpenAIConfigRequest,
     OpenAISessionResponse,
@@ -39,6 +41,87 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/auth")
 
+# Decrypted session payloads keyed by sha256 of the raw cookie, so repeat
+# requests (e.g. a burst of parallel chat streams) skip Fernet's HMAC + AES
+# and the JSON parse. Entries expire with the cookie's Fernet TTL. Payloads
+# are held as JSON and re-parsed per hit, so callers get a private dict they
+# can mutate. Only successfully decrypted cookies are cached.
+_SESSION_CACHE_MAX_ENTRIES = 1024
+_session_cache: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+
+def _session_cache_key(raw: str) -> str:
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _remember_session(raw: str, payload_json: str, expires_at: float) -> None:
+    key = _session_cache_key(raw)
+    _session_cache[key] = (expires_at, payload_json)
+    _session_cache.move_to_end(key)
+    while len(_session_cache) > _SESSION_CACHE_MAX_ENTRIES:
+        _session_cache.popitem(last=False)
+
+
+# /api/users/current.json results per OAuth token (keyed by its sha256), so
+# session checks on page load answer locally. A rejected token is cached as
+# None for a shorter window; transient failures are not cached at all.
+_USER_INFO_TTL_SECONDS = 300
+_USER_INFO_NEGATIVE_TTL_SECONDS = 60
+_USER_INFO_MAX_ENTRIES = 1024
+_user_info_cache: OrderedDict[str, tuple[float, SocrataOAuthUserInfo | None]] = (
+    OrderedDict()
+)
+
+
+def _token_cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def _lookup_oauth_user(
+    client: httpx.AsyncClient, token: str
+) -> SocrataOAuthUserInfo | None:
+    """The user behind an OAuth token, or None if the portal rejects it."""
+    key = _token_cache_key(token)
+    cached = _user_info_cache.get(key)
+    if cached is not None:
+        expires_at, user = cached
+        if time.time() < expires_at:
+            _user_info_cache.move_to_end(key)
+            return user
+        del _user_info_cache[key]
+
+    resp = await client.get(
+        f"{SOCRATA_BASE_URL}/api/users/current.json",
+        headers={"Authorization": f"OAuth {token}"},
+        timeout=15.0,
+    )
+    if resp.status_code in (401, 403):
+        user = None
+        ttl = _USER_INFO_NEGATIVE_TTL_SECONDS
+    elif resp.status_code != 200:
+        # Transient (5xx, 429, …) — report no session this time, but ask
+        # again on the next check.
+        return None
+    else:
+        user_data = resp.json()
+        user = SocrataOAuthUserInfo(
+            id=user_data.get("id", ""),
+            displayName=user_data.get("displayName", ""),
+            email=user_data.get("email"),
+        )
+        ttl = _USER_INFO_TTL_SECONDS
+    _user_info_cache[key] = (time.time() + ttl, user)
+    while len(_user_info_cache) > _USER_INFO_MAX_ENTRIES:
+        _user_info_cache.popitem(last=False)
+    return user
+
+
+def _forget_session(request: Request) -> None:
+    """Drop the request's (now superseded) cookie from the session cache."""
+    raw = request.cookies.get(SESSION_COOKIE_NAME)
+    if raw:
+        _session_cache.pop(_session_cache_key(raw), None)
+
 
 def require_xhr_header(request: Request) -> None:
     """CSRF guard for cookie-authenticated mutations.
@@ -57,7 +140,15 @@ def require_xhr_header(request: Request) -> None:
 
 def _set_session_payload(response: Response, payload: dict[str, Any]) -> None:
     """Encrypt an auth payload into the session cookie."""
-    encrypted = fernet.encrypt(json.dumps(payload).encode()).decode()
+    payload_json = json.dumps(payload)
+    encrypted = fernet.encrypt(payload_json.encode()).decode()
+    # Pre-populate the cache so the browser's next request with the new
+    # cookie is a hit.
+    _remember_session(
+        encrypted,
+        payload_json,
+        fernet.extract_timestamp(encrypted.encode()) + SESSION_COOKIE_MAX_AGE,
+    )
     response.set_cookie(
         SESSION_COOKIE_NAME,
         encrypted,
@@ -74,20 +165,45 @@ def read_session(request: Request) -> dict[str, Any]:
     raw = request.cookies.get(SESSION_COOKIE_NAME)
     if not raw:
         return {}
+    key = _session_cache_key(raw)
+    cached = _session_cache.get(key)
+    if cached is not None:
+        expires_at, payload_json = cached
+        if time.time() < expires_at:
+            _session_cache.move_to_end(key)
+            return cast(dict[str, Any], json.loads(payload_json))
+        del _session_cache[key]
     try:
-        decrypted = fernet.decrypt(raw.encode(), ttl=SESSION_COOKIE_MAX_AGE).decode()
+        token = raw.encode()
+        decrypted = fernet.decrypt(token, ttl=SESSION_COOKIE_MAX_AGE).decode()
         data = json.loads(decrypted)
-        return data if isinstance(data, dict) else {}
+        if not isinstance(data, dict):
+            return {}
+        _remember_session(
+            raw, decrypted, fernet.extract_timestamp(token) + SESSION_COOKIE_MAX_AGE
+        )
+        return data
     except (InvalidToken, ValueError, json.JSONDecodeError):
         return {}
 
 
+def session_fingerprint(request: Request) -> str:
+    """Opaque per-client key for fairness accounting: a hash of the session
+    cookie, or of the client address when there is none."""
+    raw = request.cookies.get(SESSION_COOKIE_NAME)
+    if raw:
+        return _session_cache_key(raw)
+    host = request.client.host if request.client else ""
+    return _session_cache_key(f"addr:{host}")
+
+
 def _update_session(
     request: Request, response: Response, updates: dict[str, Any]
 ) -> dict[str, Any]:
     """Read current session, apply updates, and write back to the cookie."""
     session = read_session(request)
     session.update(updates)
+    _forget_session(request)
     _set_session_payload(response, session)
     return session
 
@@ -140,6 +256,7 @@ async def socrata_oauth_callback(
     code: str | None = None,
     error: str | None = None,
     state: str | None = None,
+    client: httpx.AsyncClient = Depends(get_http_client),
 ) -> RedirectResponse:
     """OAuth callback — exchanges authorization code for access token, redirects to frontend."""
     base = FRONTEND_URL.rstrip("/") if FRONTEND_URL else ""
@@ -189,44 +306,40 @@ async def socrata_oauth_callback(
         raise HTTPException(status_code=500, detail="OAuth not configured on server")
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            token_resp = await client.post(
-                f"{SOCRATA_BASE_URL}/oauth/access_token",
-                data={
-                    "client_id": SOCRATA_APP_TOKEN,
-                    "client_secret": SOCRATA_SECRET_TOKEN,
-                    "grant_type": "authorization_code",
-                    "redirect_uri": SOCRATA_OAUTH_REDIRECT_URI,
-                    "code": code,
-                },
-            )
-
-            if token_resp.status_code != 200:
-                logger.error("OAuth token exchange failed: %s", token_resp.text)
-                # The Socrata portal may reissue a stale authorization code from
-                # a previous session. If so, retry once — the failed exchange
-                # invalidates the old code, so the next authorize round-trip
-                # will produce a fresh one.
-                if not is_retry and "Authorization code invalid" in token_resp.text:
-                    logger.info("Stale authorization code — retrying OAuth flow")
-                    return RedirectResponse(
-                        url=_build_oauth_authorize_url(is_retry=True)
-                    )
-                return RedirectResponse(
-                    url=f"{base}/#oauth_error=token_exchange_failed"
-                )
-
-            token_data = token_resp.json()
-            access_token = token_data.get("access_token")
-
-            if not access_token:
-                return RedirectResponse(url=f"{base}/#oauth_error=no_access_token")
+        token_resp = await client.post(
+            f"{SOCRATA_BASE_URL}/oauth/access_token",
+            data={
+                "client_id": SOCRATA_APP_TOKEN,
+                "client_secret": SOCRATA_SECRET_TOKEN,
+                "grant_type": "authorization_code",
+                "redirect_uri": SOCRATA_OAUTH_REDIRECT_URI,
+                "code": code,
+            },
+            timeout=30.0,
+        )
 
-            # Success: set encrypted HttpOnly cookie, redirect to frontend home.
-            # The frontend calls /api/auth/socrata/session on load to discover the session.
-            redirect = RedirectResponse(url=base or "/")
-            _update_session(request, redirect, {"kind": "oauth", "token": access_token})
-            return redirect
+        if token_resp.status_code != 200:
+            logger.error("OAuth token exchange failed: %s", token_resp.text)
+            # The Socrata portal may reissue a stale authorization code from
+            # a previous session. If so, retry once — the failed exchange
+            # invalidates the old code, so the next authorize round-trip
+            # will produce a fresh one.
+            if not is_retry and "Authorization code invalid" in token_resp.text:
+                logger.info("Stale authorization code — retrying OAuth flow")
+                return RedirectResponse(url=_build_oauth_authorize_url(is_retry=True))
+            return RedirectResponse(url=f"{base}/#oauth_error=token_exchange_failed")
+
+        token_data = token_resp.json()
+        access_token = token_data.get("access_token")
+
+        if not access_token:
+            return RedirectResponse(url=f"{base}/#oauth_error=no_access_token")
+
+        # Success: set encrypted HttpOnly cookie, redirect to frontend home.
+        # The frontend calls /api/auth/socrata/session on load to discover the session.
+        redirect = RedirectResponse(url=base or "/")
+        _update_session(request, redirect, {"kind": "oauth", "token": access_token})
+        return redirect
 
     except Exception:
         logger.exception("OAuth callback error")
@@ -234,7 +347,9 @@ async def socrata_oauth_callback(
 
 
 @router.get("/socrata/session", response_model=SocrataSessionResponse)
-async def socrata_session(request: Request) -> SocrataSessionResponse:
+async def socrata_session(
+    request: Request, client: httpx.AsyncClient = Depends(get_http_client)
+) -> SocrataSessionResponse:
     """Return the state of the current auth session (OAuth or API key)."""
     session = read_session(request)
     kind = session.get("kind")
@@ -244,22 +359,10 @@ async def socrata_session(request: Request) -> SocrataSessionResponse:
         if not token:
             return SocrataSessionResponse(kind=None)
         try:
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                resp = await client.get(
-                    f"{SOCRATA_BASE_URL}/api/users/current.json",
-                    headers={"Authorization": f"OAuth {token}"},
-                )
-                if resp.status_code != 200:
-                    return SocrataSessionResponse(kind=None)
-                user_data = resp.json()
-                return SocrataSessionResponse(
-                    kind="oauth",
-                    user=SocrataOAuthUserInfo(
-                        id=user_data.get("id", ""),
-                        displayName=user_data.get("displayName", ""),
-                        email=user_data.get("email"),
-                    ),
-                )
+            user = await _lookup_oauth_user(client, token)
+            if user is None:
+                return SocrataSessionResponse(kind=None)
+            return SocrataSessionResponse(kind="oauth", user=user)
         except Exception:
             logger.exception("Session OAuth lookup failed")
             return SocrataSessionResponse(kind=None)
@@ -300,22 +403,28 @@ async def socrata_api_key_save(
     status_code=204,
     dependencies=[Depends(require_xhr_header)],
 )
-async def socrata_logout(request: Request, response: Response) -> Response:
+async def socrata_logout(
+    request: Request,
+    response: Response,
+    client: httpx.AsyncClient = Depends(get_http_client),
+) -> Response:
     """Clear the Socrata auth from the session cookie. For OAuth sessions, also revoke upstream."""
     session = read_session(request)
+    if session.get("token"):
+        _user_info_cache.pop(_token_cache_key(session["token"]), None)
     if session.get("kind") == "oauth" and SOCRATA_APP_TOKEN and SOCRATA_SECRET_TOKEN:
         token = session.get("token")
         if token:
             try:
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    await client.post(
-                        f"{SOCRATA_BASE_URL}/oauth/revoke_token",
-                        data={
-                            "access_token": token,
-                            "client_id": SOCRATA_APP_TOKEN,
-                            "client_secret": SOCRATA_SECRET_TOKEN,
-                        },
-                    )
+                await client.post(
+                    f"{SOCRATA_BASE_URL}/oauth/revoke_token",
+                    data={
+                        "access_token": token,
+                        "client_id": SOCRATA_APP_TOKEN,
+                        "client_secret": SOCRATA_SECRET_TOKEN,
+                    },
+                    timeout=10.0,
+                )
             except Exception:
                 # Revoke is best-effort — the cookie is still invalidated below.
                 logger.exception("Upstream token revoke failed")
@@ -325,6 +434,7 @@ async def socrata_logout(request: Request, response: Response) -> Response:
     session.pop("token", None)
     session.pop("id", None)
     session.pop("secret", None)
+    _forget_session(request)
     if session:
         _set_session_payload(response, session)
     else:
@@ -403,6 +513,7 @@ async def openai_logout(request: Request, response: Response) -> Response:
     """Clear OpenAI configuration from the session cookie."""
     session = read_session(request)
     session.pop("openai_config", None)
+    _forget_session(request)
     if session:
         _set_session_payload(response, session)
     else:
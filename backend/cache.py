@@ -0,0 +1,315 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Generic, TypeVar
+
+from .shared_store import SharedStore
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+# A disk tier over its limit is pruned down to this fraction of it, so the
+# scan isn't repeated on every write once the tier is full.
+_DISK_PRUNE_TARGET = 0.9
+
+
+class ByteLRUCache:
+    """In-process LRU of serialized (str) values, bounded by total byte size.
+
+    An optional on-disk tier (`disk_dir`) keeps entries across restarts and
+    beyond the memory budget: memory misses fall through to disk, and disk
+    hits are promoted back into memory. The disk tier is pruned oldest-first
+    (by mtime) once it exceeds `disk_max_bytes`. Its size is tracked as a
+    running total (this process's writes on top of the last directory scan),
+    so the directory is only rescanned when that total crosses the limit.
+
+    Values are stored serialized so their size is known exactly and callers
+    can't mutate a cached entry in place.
+
+    With a `shared` store (multi-worker mode), entries are also written there
+    under `shared_prefix` and misses in this process are looked up there last,
+    so a result one worker computed serves the others.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        disk_dir: Path | None = None,
+        disk_max_bytes: int = 0,
+        shared: SharedStore | None = None,
+        shared_prefix: str = "",
+        shared_ttl_seconds: float | None = None,
+    ) -> None:
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self._bytes = 0
+        self._disk_dir = disk_dir
+        self._disk_max_bytes = disk_max_bytes
+        self._disk_bytes = 0
+        if disk_dir is not None:
+            disk_dir.mkdir(parents=True, exist_ok=True)
+            self._prune_disk()
+        self._shared = shared
+        self._shared_prefix = shared_prefix
+        self._shared_ttl = shared_ttl_seconds
+        self.hits = 0
+        self.disk_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _disk_path(self, key: str) -> Path | None:
+        if self._disk_dir is None:
+            return None
+        return self._disk_dir / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+    def _put_memory(self, key: str, value: str) -> None:
+        size = len(value.encode())
+        if key in self._entries:
+            self._bytes -= self._sizes.pop(key)
+            del self._entries[key]
+        if size > self._max_bytes:
+            # Larger than the whole budget — keep it on disk only.
+            return
+        self._entries[key] = value
+        self._sizes[key] = size
+        self._bytes += size
+        while self._bytes > self._max_bytes:
+            old_key, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(old_key)
+            self.evictions += 1
+
+    def get(self, key: str) -> str | None:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+        path = self._disk_path(key)
+        if path is not None:
+            try:
+                value = path.read_text(encoding="utf-8")
+            except FileNotFoundError:
+                value = None
+            except OSError:
+                logger.warning("Failed to read cache file %s", path, exc_info=True)
+                value = None
+            if value is not None:
+                try:
+                    # Bump mtime so pruning treats the entry as recently used.
+                    os.utime(path)
+                except OSError:
+                    # E.g. pruned by another worker since the read; the value
+                    # itself is still good.
+                    pass
+                self._put_memory(key, value)
+                self.disk_hits += 1
+                return value
+        if self._shared is not None:
+            row = self._shared.get(self._shared_prefix + key)
+            if row is not None:
+                self._put_memory(key, row[0])
+                self.shared_hits += 1
+                return row[0]
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        self._put_memory(key, value)
+        if self._shared is not None:
+            self._shared.set(self._shared_prefix + key, value, self._shared_ttl)
+        path = self._disk_path(key)
+        if path is None:
+            return
+        try:
+            # Per-process temp name, as workers may share the directory.
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp.write_text(value, encoding="utf-8")
+            size = tmp.stat().st_size
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            tmp.replace(path)
+            self._disk_bytes += size - replaced
+            if 0 < self._disk_max_bytes < self._disk_bytes:
+                self._prune_disk()
+        except OSError:
+            logger.warning("Failed to write cache file %s", path, exc_info=True)
+
+    def _prune_disk(self) -> None:
+        """Rescan the disk tier and, if it is over `disk_max_bytes`, drop
+        its oldest files down to _DISK_PRUNE_TARGET of that. Resets the
+        running total to what remains."""
+        if self._disk_dir is None or self._disk_max_bytes <= 0:
+            return
+        files: list[tuple[Path, os.stat_result]] = []
+        for p in self._disk_dir.glob("*.json"):
+            try:
+                files.append((p, p.stat()))
+            except FileNotFoundError:
+                # Removed by another worker mid-scan.
+                continue
+        total = sum(st.st_size for _, st in files)
+        target = (
+            self._disk_max_bytes * _DISK_PRUNE_TARGET
+            if total > self._disk_max_bytes
+            else total
+        )
+        for p, st in sorted(files, key=lambda f: f[1].st_mtime):
+            if total <= target:
+                break
+            p.unlink(missing_ok=True)
+            total -= st.st_size
+        self._disk_bytes = total
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "maxBytes": self._max_bytes,
+            "hits": self.hits,
+            "diskHits": self.disk_hits,
+            "sharedHits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+@dataclass
+class _Refreshable(Generic[V]):
+    value: V
+    fetched_at: float
+
+
+@dataclass
+class SharedTier(Generic[V]):
+    """Where, and in what encoding, a RefreshingCache mirrors its entries in
+    the cross-worker SharedStore."""
+
+    store: SharedStore
+    namespace: str
+    encode: Callable[[V], str]
+    decode: Callable[[str], V]
+
+
+class RefreshingCache(Generic[V]):
+    """Keyed async cache for slow upstream lookups, bounded to `max_keys` (LRU).
+
+    - Single-flight: concurrent misses for a key share one `loader()` call.
+    - Stale-while-revalidate: once an entry is older than `ttl_seconds` it is
+      still returned immediately while one background refresh replaces it.
+    - A failed refresh keeps serving the stale value and is retried no sooner
+      than `retry_seconds` later; a failed first load raises to every waiter.
+
+    `on_update` is called after every successful load (e.g. to persist a
+    snapshot); `items()` and `set(..., fetched_at=)` round-trip entries.
+    With a `shared` tier, loads are published to the other workers, and a
+    worker adopts a fresher shared entry instead of calling `loader()`.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_keys: int = 1,
+        retry_seconds: float = 60.0,
+        on_update: Callable[[], None] | None = None,
+        shared: SharedTier[V] | None = None,
+    ) -> None:
+        self._ttl = ttl_seconds
+        self._max_keys = max_keys
+        self._retry = retry_seconds
+        self._on_update = on_update
+        self._shared = shared
+        self._entries: OrderedDict[str, _Refreshable[V]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task[V]] = {}
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[V]]) -> V:
+        entry = self._entries.get(key) or self._from_shared(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            if time.time() - entry.fetched_at >= self._ttl:
+                self._start_load(key, loader)
+            return entry.value
+        # Shield so a caller that disconnects doesn't cancel the load the
+        # other waiters are sharing.
+        return await asyncio.shield(self._start_load(key, loader))
+
+    def _start_load(
+        self, key: str, loader: Callable[[], Awaitable[V]]
+    ) -> asyncio.Task[V]:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader))
+            task.add_done_callback(self._log_failure)
+            self._inflight[key] = task
+        return task
+
+    def _from_shared(self, key: str) -> _Refreshable[V] | None:
+        """Adopt the shared entry for `key` if it is newer than ours."""
+        local = self._entries.get(key)
+        if self._shared is None:
+            return local
+        row = self._shared.store.get(self._shared.namespace + key)
+        if row is None or (local is not None and local.fetched_at >= row[1]):
+            return local
+        try:
+            value = self._shared.decode(row[0])
+        except Exception:
+            logger.warning("Ignoring undecodable shared entry %s", key, exc_info=True)
+            return local
+        self.set(key, value, row[1])
+        return self._entries[key]
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[V]]) -> V:
+        try:
+            # Another worker may have refreshed this key already.
+            adopted = self._from_shared(key)
+            if adopted is not None and time.time() - adopted.fetched_at < self._ttl:
+                return adopted.value
+            value = await loader()
+        except Exception:
+            stale = self._entries.get(key)
+            if stale is not None:
+                # Back off before the next refresh attempt.
+                stale.fetched_at = time.time() - self._ttl + self._retry
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self.set(key, value)
+        if self._shared is not None:
+            self._shared.store.set(
+                self._shared.namespace + key,
+                self._shared.encode(value),
+                updated_at=self._entries[key].fetched_at,
+            )
+        if self._on_update is not None:
+            self._on_update()
+        return value
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task[V]) -> None:
+        # Retrieve the exception so background refresh failures are logged
+        # once rather than reported as "never retrieved".
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Cache refresh failed: %s", task.exception())
+
+    def set(self, key: str, value: V, fetched_at: float | None = None) -> None:
+        self._entries[key] = _Refreshable(
+            value, time.time() if fetched_at is None else fetched_at
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_keys:
+            self._entries.popitem(last=False)
+
+    def items(self) -> list[tuple[str, V, float]]:
+        """(key, value, fetched_at) for every entry, least recent first."""
+        return [(k, e.value, e.fetched_at) for k, e in self._entries.items()]
@@ -33,6 +33,67 @@ SOCRATA_OAUTH_REDIRECT_URI = (
     or f"{FRONTEND_URL}/api/auth/socrata/callback"
 )
 
+# Default quartile engine for numeric columns on import: "exact" ($offset
+# lookups, three full-column sorts) or "histogram" (one bucketed group-by,
+# approximate within 1% of the column's range). Overridable per import.
+SOCRATA_QUANTILE_METHOD: Literal["exact", "histogram"] = (
+    "histogram"
+    if os.getenv("SOCRATA_QUANTILE_METHOD", "").strip().lower() == "histogram"
+    else "exact"
+)
+
+# Column stats engine on import (see socrata_profile): "soda" runs aggregate
+# queries per column, "local" streams the CSV export once and profiles it
+# in-process, "auto" (default) goes local when rows x columns is at most
+# LOCAL_PROFILE_MAX_CELLS. Overridable per import.
+_stats_engine_raw = os.getenv("SOCRATA_STATS_ENGINE", "").strip().lower()
+SOCRATA_STATS_ENGINE: Literal["auto", "soda", "local"] = (
+    "soda"
+    if _stats_engine_raw == "soda"
+    else "local" if _stats_engine_raw == "local" else "auto"
+)
+LOCAL_PROFILE_MAX_CELLS = int(os.getenv("LOCAL_PROFILE_MAX_CELLS", "2000000"))
+
+# Snapshot of the catalog caches (categories, licenses, tags) so a restart
+# serves them from the last known lists instead of waiting on the catalog
+# API. Set CATALOG_SNAPSHOT_PATH to an empty value to disable.
+_catalog_snapshot_raw = os.getenv("CATALOG_SNAPSHOT_PATH")
+CATALOG_SNAPSHOT_PATH: Path | None = (
+    _BACKEND_DIR / ".cache" / "catalog_snapshot.json"
+    if _catalog_snapshot_raw is None
+    else Path(_catalog_snapshot_raw.strip()) if _catalog_snapshot_raw.strip() else None
+)
+
+# Import result cache (see socrata._import_cache). Memory tier is bounded by
+# serialized size; set IMPORT_CACHE_DIR to also keep results on disk across
+# restarts (pruned oldest-first past IMPORT_CACHE_DISK_MAX_BYTES).
+IMPORT_CACHE_MAX_BYTES = int(os.getenv("IMPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+IMPORT_CACHE_DIR = os.getenv("IMPORT_CACHE_DIR", "").strip()
+IMPORT_CACHE_DISK_MAX_BYTES = int(
+    os.getenv("IMPORT_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024))
+)
+
+# SODA request concurrency adapts between 1 and SODA_MAX_CONCURRENCY, starting
+# at SODA_INITIAL_CONCURRENCY (see ratelimit.AdaptiveLimiter). Throttled or
+# transient failures are retried up to SODA_MAX_ATTEMPTS times in total.
+SODA_INITIAL_CONCURRENCY = int(os.getenv("SODA_INITIAL_CONCURRENCY", "10"))
+SODA_MAX_CONCURRENCY = int(os.getenv("SODA_MAX_CONCURRENCY", "32"))
+SODA_MAX_ATTEMPTS = max(1, int(os.getenv("SODA_MAX_ATTEMPTS", "4")))
+
+# --- Outbound HTTP ---------------------------------------------------------
+# Tuning for the shared, lifespan-managed httpx client (see http_client.py)
+# used for all Socrata traffic. The default timeout is generous because wide
+# SODA aggregates on large datasets are slow; endpoints that need a tighter
+# bound pass their own per-request timeout.
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "90"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+# HTTP/2 multiplexes concurrent SODA queries over one connection per host.
+# Requires the optional h2 package (pip install httpx[http2]).
+HTTP_ENABLE_HTTP2 = os.getenv("HTTP_ENABLE_HTTP2", "").strip() == "1"
+
 # --- LLM -------------------------------------------------------------------
 LLM_ENDPOINT = os.getenv("LLM_ENDPOINT", "")
 LLM_API_KEY = os.getenv("LLM_API_KEY", "")
@@ -41,6 +102,39 @@ LLM_MODEL_CONCISE = os.getenv("LLM_MODEL_CONCISE", "")
 LLM_MODEL_DETAILED = os.getenv("LLM_MODEL_DETAILED", "")
 LLM_MODEL_SUGGEST = os.getenv("LLM_MODEL_SUGGEST", "")
 
+# Pooled AsyncOpenAI clients (see llm_clients.py), one per (endpoint, key).
+# Bounded so users cycling through custom keys can't grow it without limit;
+# clients unused for LLM_CLIENT_IDLE_SECONDS are closed.
+LLM_CLIENT_POOL_SIZE = int(os.getenv("LLM_CLIENT_POOL_SIZE", "16"))
+LLM_CLIENT_IDLE_SECONDS = float(os.getenv("LLM_CLIENT_IDLE_SECONDS", "300"))
+
+# Opt-in cache of completed chat responses (see llm._response_cache), keyed by
+# the resolved endpoint, credentials, model, mode and prompts. Off while
+# LLM_RESPONSE_CACHE_MAX_BYTES is 0; entries expire after the TTL.
+LLM_RESPONSE_CACHE_MAX_BYTES = int(os.getenv("LLM_RESPONSE_CACHE_MAX_BYTES", "0"))
+LLM_RESPONSE_CACHE_TTL_SECONDS = float(
+    os.getenv("LLM_RESPONSE_CACHE_TTL_SECONDS", "86400")
+)
+
+# Upstream LLM concurrency (see llm_scheduler.py), per worker process: at
+# most LLM_MAX_CONCURRENCY completions at once and LLM_SESSION_MAX_CONCURRENCY
+# per session, queued fairly across sessions. Bulk work (batches, evals) may
+# not take the last LLM_INTERACTIVE_RESERVED_SLOTS slots.
+LLM_MAX_CONCURRENCY = max(1, int(os.getenv("LLM_MAX_CONCURRENCY", "16")))
+LLM_SESSION_MAX_CONCURRENCY = max(1, int(os.getenv("LLM_SESSION_MAX_CONCURRENCY", "4")))
+LLM_INTERACTIVE_RESERVED_SLOTS = max(
+    0, int(os.getenv("LLM_INTERACTIVE_RESERVED_SLOTS", "2"))
+)
+
+# Batch generation (POST /api/openai/chat/batch): completions run per batch at
+# most LLM_BATCH_MAX_CONCURRENCY at a time (LLM_BATCH_CONCURRENCY unless the
+# request asks for fewer/more), over at most LLM_BATCH_MAX_ITEMS prompts.
+LLM_BATCH_CONCURRENCY = max(1, int(os.getenv("LLM_BATCH_CONCURRENCY", "4")))
+LLM_BATCH_MAX_CONCURRENCY = max(
+    LLM_BATCH_CONCURRENCY, int(os.getenv("LLM_BATCH_MAX_CONCURRENCY", "8"))
+)
+LLM_BATCH_MAX_ITEMS = int(os.getenv("LLM_BATCH_MAX_ITEMS", "500"))
+
 # Judge model for the dev-mode eval. Falls back to LLM_MODEL so judge runs work
 # out of the box; override in env when you want a different model judging output.
 JUDGE_LLM_MODEL = os.getenv("JUDGE_LLM_MODEL", "") or LLM_MODEL
@@ -48,21 +142,76 @@ JUDGE_LLM_MODEL = os.getenv("JUDGE_LLM_MODEL", "") or LLM_MODEL
 # a bulk regenerate+judge loop, so it is off by default and must be opted into
 # explicitly via ENABLE_EVAL=1 in backend/.env (or the process env).
 ENABLE_EVAL = os.getenv("ENABLE_EVAL", "").strip() == "1"
+# Eval run checkpoints (one JSONL file per run, see eval._checkpoint_path).
+EVAL_RUNS_DIR = Path(
+    os.getenv("EVAL_RUNS_DIR", "").strip() or _BACKEND_DIR / ".cache" / "eval_runs"
+)
+# Eval memo store (see eval._memo_store): fetched datasets, generations and
+# judgments, content-addressed on disk. Defaults to backend/.cache/eval_memo;
+# set EVAL_MEMO_DIR empty to disable it.
+_eval_memo_dir_raw = os.getenv("EVAL_MEMO_DIR")
+EVAL_MEMO_DIR: Path | None = (
+    _BACKEND_DIR / ".cache" / "eval_memo"
+    if _eval_memo_dir_raw is None
+    else Path(_eval_memo_dir_raw.strip()) if _eval_memo_dir_raw.strip() else None
+)
+EVAL_MEMO_DISK_MAX_BYTES = int(
+    os.getenv("EVAL_MEMO_DISK_MAX_BYTES", str(256 * 1024 * 1024))
+)
+# Eval pipeline parallelism: datasets in flight at once, plus separate caps on
+# concurrent Socrata fetches, generations and judgments across them. LLM calls
+# are additionally bounded by LLM_SESSION_MAX_CONCURRENCY (one eval session).
+EVAL_DATASET_CONCURRENCY = max(1, int(os.getenv("EVAL_DATASET_CONCURRENCY", "4")))
+EVAL_FETCH_CONCURRENCY = max(1, int(os.getenv("EVAL_FETCH_CONCURRENCY", "4")))
+EVAL_GENERATE_CONCURRENCY = max(1, int(os.getenv("EVAL_GENERATE_CONCURRENCY", "4")))
+EVAL_JUDGE_CONCURRENCY = max(1, int(os.getenv("EVAL_JUDGE_CONCURRENCY", "4")))
+
+# --- Workers ---------------------------------------------------------------
+# Number of uvicorn worker processes (pass the same value to
+# `uvicorn --workers`; `python -m backend.main` reads it directly). With more
+# than one, every process must share the secrets below, and the catalog
+# caches, import cache and SODA limiter share state through a SQLite file at
+# SHARED_CACHE_PATH (default backend/.cache/shared.sqlite3).
+try:
+    WORKERS = int(os.getenv("WORKERS", "1"))
+except ValueError as exc:
+    raise RuntimeError("WORKERS must be a positive integer") from exc
+if WORKERS <= 0:
+    raise RuntimeError("WORKERS must be a positive integer")
+_shared_cache_raw = os.getenv("SHARED_CACHE_PATH", "").strip()
+SHARED_CACHE_PATH: Path | None = (
+    Path(_shared_cache_raw)
+    if _shared_cache_raw
+    else _BACKEND_DIR / ".cache" / "shared.sqlite3" if WORKERS > 1 else None
+)
+# Past this many bytes of keys and values, the periodic prune drops the
+# least recently updated entries.
+SHARED_CACHE_MAX_BYTES = int(
+    os.getenv("SHARED_CACHE_MAX_BYTES", str(512 * 1024 * 1024))
+)
 
 # --- Session / cookie crypto ----------------------------------------------
-# Secret for signing OAuth state tokens (used to prevent CSRF). Fresh on every
-# server start — restart invalidates outstanding state tokens, but users simply
-# re-initiate the OAuth flow. Stronger than deriving from SOCRATA_SECRET_TOKEN.
-# Note: this is per-process, so a multi-worker deploy (e.g. uvicorn --workers N)
-# would fail any callback that lands on a different worker than the authorize
-# call. The app is currently single-worker on Databricks; if that ever changes,
-# move this to a shared env var (e.g. OAUTH_STATE_SECRET) with a stable value.
-OAUTH_STATE_SECRET = secrets.token_hex(32)
+# Secret for signing OAuth state tokens (used to prevent CSRF). Set
+# OAUTH_STATE_SECRET for a stable value; otherwise it is fresh on every server
+# start — restart invalidates outstanding state tokens, but users simply
+# re-initiate the OAuth flow. A per-process secret would fail any callback
+# that lands on a different worker than the authorize call, so it is required
+# when WORKERS > 1.
+OAUTH_STATE_SECRET = os.getenv("OAUTH_STATE_SECRET", "").strip()
+if not OAUTH_STATE_SECRET:
+    if WORKERS > 1:
+        raise RuntimeError("OAUTH_STATE_SECRET must be set when WORKERS > 1")
+    OAUTH_STATE_SECRET = secrets.token_hex(32)
 
 # Fernet key for encrypting the OAuth session cookie. Prefer a stable key from
 # the environment to keep users logged in across restarts; fall back to a
-# fresh ephemeral key if none is provided.
-_session_key = os.getenv("SESSION_ENCRYPTION_KEY") or Fernet.generate_key().decode()
+# fresh ephemeral key if none is provided (single worker only — each worker
+# would otherwise reject the others' cookies).
+_session_key = os.getenv("SESSION_ENCRYPTION_KEY", "")
+if not _session_key:
+    if WORKERS > 1:
+        raise RuntimeError("SESSION_ENCRYPTION_KEY must be set when WORKERS > 1")
+    _session_key = Fernet.generate_key().decode()
 fernet = Fernet(_session_key.encode())
 
 SESSION_COOKIE_NAME = "socrata_session"
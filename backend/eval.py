@@ -1,17 +1,22 @@
+import asyncio
 import csv
+import hashlib
 import json
 import logging
 import re
+import secrets
 import time
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, TypeVar, cast
 
 import httpx
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
-from openai import AsyncOpenAI
+from openai import APIStatusError, AsyncOpenAI
+from openai.types.chat import ChatCompletion, ChatCompletionMessageParam
 from openai.types.shared_params import (
     ResponseFormatJSONObject,
     ResponseFormatJSONSchema,
@@ -20,13 +25,26 @@ from openai.types.shared_params.response_format_json_schema import JSONSchema
 
 from .config import (
     ENABLE_EVAL,
+    EVAL_DATASET_CONCURRENCY,
+    EVAL_FETCH_CONCURRENCY,
+    EVAL_GENERATE_CONCURRENCY,
+    EVAL_JUDGE_CONCURRENCY,
+    EVAL_MEMO_DIR,
+    EVAL_MEMO_DISK_MAX_BYTES,
+    EVAL_RUNS_DIR,
     JUDGE_LLM_MODEL,
     LLM_API_KEY,
     LLM_ENDPOINT,
     LLM_MODEL,
     SOCRATA_APP_TOKEN,
+    SOCRATA_DOMAIN,
 )
+from .cache import ByteLRUCache
+from .http_client import get_http_client
+from .llm_scheduler import llm_scheduler
 from .models import EvalRunRequest
+from .socrata import fetch_dataset_preview, fetch_view_metadata
+from .socrata_soda import build_socrata_auth
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +54,12 @@ _CSV_PATH = (
     / "DatasetsWithSolidMetadata - Sheet1.csv"
 )
 
+# Eval runs queue as one bulk session in the LLM scheduler, behind
+# interactive generations.
+_SCHEDULER_SESSION = "eval"
+
+_T = TypeVar("_T")
+
 _FENCE_RE = re.compile(r"<<<\s*(?:END_)?UNTRUSTED_DATA\s*>>>", re.IGNORECASE)
 _CONTROL_RE = re.compile(r"[\x00-\x08\x0B-\x1F\x7F]")
 _UNTRUSTED_OPEN = "<<<UNTRUSTED_DATA>>>"
@@ -347,67 +371,184 @@ def _build_judge_schema(
     }
 
 
-_SOCRATA_HEADERS = {
-    "X-App-Token": SOCRATA_APP_TOKEN,
-    "User-Agent": "data-wa-gov-AI-Metadata-Tool-eval/1.0",
-}
+# Content-addressed memo of fetched datasets, generations and judgments, kept
+# on disk across runs so iterating on one stage (e.g. the judge model or the
+# scoring categories) re-spends only that stage's tokens.
+_EVAL_MEMO_MEMORY_BYTES = 16 * 1024 * 1024
+_memo_store = (
+    ByteLRUCache(
+        max_bytes=_EVAL_MEMO_MEMORY_BYTES,
+        disk_dir=EVAL_MEMO_DIR,
+        disk_max_bytes=EVAL_MEMO_DISK_MAX_BYTES,
+    )
+    if ENABLE_EVAL and EVAL_MEMO_DIR is not None
+    else None
+)
 
+_ZERO_USAGE = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
+
+def _memo_key(*parts: Any) -> str:
+    material = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class _EvalMemo:
+    """One run's view of the memo store: counts reuse per stage, and with
+    `reuse` off only records (every stage runs fresh)."""
+
+    def __init__(self, reuse: bool) -> None:
+        self.reuse = reuse and _memo_store is not None
+        self.hits = {"dataset": 0, "generation": 0, "judgment": 0}
+
+    def get(self, stage: str, key: str) -> Any | None:
+        if not self.reuse or _memo_store is None:
+            return None
+        raw = _memo_store.get(f"{stage}:{key}")
+        if raw is None:
+            return None
+        self.hits[stage] += 1
+        return json.loads(raw)
+
+    def put(self, stage: str, key: str, value: Any) -> None:
+        if _memo_store is not None:
+            _memo_store.set(
+                f"{stage}:{key}", json.dumps(value, ensure_ascii=False, default=str)
+            )
+
+
+# Structured-output formats the judge can ask for, most to least strict.
+_JSON_SCHEMA = "json_schema"
+_JSON_OBJECT = "json_object"
+
+# Statuses that mean "this request shape isn't accepted" (as opposed to auth,
+# throttling or server trouble): the endpoint rejected json_schema itself.
+_FORMAT_REJECTED_STATUSES = {400, 404, 415, 422}
+
+
+class _ResponseFormatRegistry:
+    """Which structured-output format each (endpoint, model) accepts.
+
+    The first judge call for a pair probes json_schema; if the endpoint
+    rejects it, json_object is recorded and every later call goes straight
+    to it instead of paying for a failed round trip first. Calls that arrive
+    while a probe is running wait for its outcome (single-flight). A probe
+    that fails for any other reason (throttling, network, cancellation)
+    records nothing, so the next call probes again. Kept per process for
+    the life of the server, so later runs skip the probe too.
+    """
+
+    def __init__(self) -> None:
+        self._known: dict[tuple[str, str], str] = {}
+        self._probes: dict[tuple[str, str], asyncio.Future[str | None]] = {}
+
+    def get(self, endpoint: str, model: str) -> str | None:
+        return self._known.get((endpoint, model))
+
+    async def run(
+        self,
+        endpoint: str,
+        model: str,
+        attempt: Callable[[str], Awaitable[_T]],
+    ) -> _T:
+        """Call `attempt(format)` with the format known to work for the
+        pair, probing for it first if it isn't known yet."""
+        key = (endpoint, model)
+        while (pending := self._probes.get(key)) is not None:
+            # shield(): a cancelled waiter mustn't cancel the shared probe.
+            await asyncio.shield(pending)
+        known = self._known.get(key)
+        if known == _JSON_OBJECT:
+            return await attempt(_JSON_OBJECT)
+
+        probe: asyncio.Future[str | None] | None = None
+        if known is None:
+            probe = asyncio.get_running_loop().create_future()
+            self._probes[key] = probe
+        chosen = known
+        try:
+            try:
+                result = await attempt(_JSON_SCHEMA)
+                chosen = _JSON_SCHEMA
+            except Exception as e:
+                rejected = (
+                    isinstance(e, APIStatusError)
+                    and e.status_code in _FORMAT_REJECTED_STATUSES
+                )
+                # Anything else is inconclusive; fall back for this call only.
+                result = await attempt(_JSON_OBJECT)
+                if rejected and probe is not None:
+                    chosen = _JSON_OBJECT
+                    logger.info(
+                        "%s at %s rejected json_schema (%s); judging with "
+                        "json_object from now on",
+                        model,
+                        endpoint,
+                        e,
+                    )
+            if chosen is not None:
+                self._known[key] = chosen
+            return result
+        finally:
+            if probe is not None:
+                del self._probes[key]
+                probe.set_result(chosen)
 
-async def _fetch_dataset(client: httpx.AsyncClient, dataset_id: str) -> dict[str, Any]:
-    meta_resp = await client.get(
-        f"https://data.wa.gov/api/views/{dataset_id}.json",
-        headers=_SOCRATA_HEADERS,
-        timeout=60.0,
-    )
-    meta_resp.raise_for_status()
-    metadata = meta_resp.json()
-
-    sample_resp = await client.get(
-        f"https://data.wa.gov/resource/{dataset_id}.json",
-        params={"$limit": "10"},
-        headers=_SOCRATA_HEADERS,
-        timeout=60.0,
-    )
-    sample_resp.raise_for_status()
-    sample_rows_raw = sample_resp.json()
-
-    count_resp = await client.get(
-        f"https://data.wa.gov/resource/{dataset_id}.json",
-        params={"$select": "count(*) as total"},
-        headers=_SOCRATA_HEADERS,
-        timeout=60.0,
-    )
-    count_resp.raise_for_status()
-    count_data = count_resp.json()
-    total_rows = int(count_data[0]["total"]) if count_data else 0
-
-    columns: list[dict[str, Any]] = []
-    for col in metadata.get("columns", []) or []:
-        field_name = col.get("fieldName") or ""
-        if field_name.startswith(":"):
-            continue
-        columns.append(
-            {
-                "fieldName": field_name,
-                "name": col.get("name") or field_name,
-                "description": col.get("description") or "",
-                "dataType": col.get("dataTypeName") or "",
-            }
-        )
 
-    field_to_display = {c["fieldName"]: c["name"] for c in columns}
-    sample_rows: list[dict[str, Any]] = []
-    for row in sample_rows_raw:
-        sample_rows.append({field_to_display.get(k, k): v for k, v in row.items()})
+_response_formats = _ResponseFormatRegistry()
 
+
+def _socrata_headers() -> dict[str, str]:
+    # App-token auth only (public datasets), as an anonymous import would use.
     return {
+        **build_socrata_auth({}),
+        "User-Agent": "data-wa-gov-AI-Metadata-Tool-eval/1.0",
+    }
+
+
+async def _fetch_dataset(
+    client: httpx.AsyncClient, dataset_id: str, memo: _EvalMemo
+) -> dict[str, Any]:
+    """Fetch a dataset's metadata, sample rows and row count through the same
+    fetch layer as the import router (SOCRATA_BASE_URL, the SODA limiter and
+    retries, and the import cache)."""
+    headers = _socrata_headers()
+    metadata = await fetch_view_metadata(client, dataset_id, headers)
+
+    # Keyed by the view's version stamps (as socrata's import cache is), so
+    # a changed dataset is fetched afresh.
+    rows_updated = metadata.get("rowsUpdatedAt")
+    view_modified = metadata.get("viewLastModified")
+    memo_key = (
+        _memo_key(SOCRATA_DOMAIN, dataset_id, rows_updated, view_modified)
+        if rows_updated is not None or view_modified is not None
+        else None
+    )
+    if memo_key is not None:
+        memoized = memo.get("dataset", memo_key)
+        if memoized is not None:
+            return cast(dict[str, Any], memoized)
+
+    preview = await fetch_dataset_preview(client, dataset_id, metadata, headers)
+    ds = {
         "id": dataset_id,
-        "name": metadata.get("name") or dataset_id,
-        "description": metadata.get("description") or "",
-        "total_rows": total_rows,
-        "columns": columns,
-        "sample_rows": sample_rows,
+        "name": preview.datasetName,
+        "description": preview.datasetDescription,
+        "total_rows": preview.totalRowCount,
+        "columns": [
+            {
+                "fieldName": c.fieldName,
+                "name": c.name or c.fieldName,
+                "description": c.description,
+                "dataType": c.dataTypeName,
+            }
+            for c in preview.columns
+        ],
+        "sample_rows": preview.sampleRows,
     }
+    if memo_key is not None:
+        memo.put("dataset", memo_key, ds)
+    return ds
 
 
 def _column_stats_from_sample(
@@ -442,16 +583,22 @@ def _column_stats_from_sample(
 
 
 async def _generate(
-    client: AsyncOpenAI, prompt: str, model: str
+    client: AsyncOpenAI, prompt: str, model: str, memo: _EvalMemo
 ) -> tuple[str, dict[str, int]]:
-    resp = await client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": _SYSTEM_PROMPT},
-            {"role": "user", "content": prompt},
-        ],
-    )
+    """Generate a description; a memoized one costs no tokens."""
+    messages: list[ChatCompletionMessageParam] = [
+        {"role": "system", "content": _SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+    memo_key = _memo_key(model, messages)
+    memoized = memo.get("generation", memo_key)
+    if memoized is not None:
+        return str(memoized), dict(_ZERO_USAGE)
+
+    async with llm_scheduler.slot(_SCHEDULER_SESSION):
+        resp = await client.chat.completions.create(model=model, messages=messages)
     text = (resp.choices[0].message.content or "").strip()
+    memo.put("generation", memo_key, text)
     usage = {
         "prompt_tokens": getattr(resp.usage, "prompt_tokens", 0) if resp.usage else 0,
         "completion_tokens": (
@@ -469,40 +616,52 @@ async def _judge(
     generated: str,
     categories: list[tuple[str, str, str]],
     model: str,
+    memo: _EvalMemo,
 ) -> tuple[dict[str, Any], dict[str, int]]:
+    """Score `generated` against `gold`; a memoized judgment of the same
+    inputs (model, schema and prompts) costs no tokens."""
     system_prompt = _build_judge_system_prompt(categories)
     user_prompt = _build_judge_user_prompt(context, gold, generated)
     schema = _build_judge_schema(categories)
+    memo_key = _memo_key(model, schema, system_prompt, user_prompt)
+    memoized = memo.get("judgment", memo_key)
+    if memoized is not None:
+        return cast(dict[str, Any], memoized), dict(_ZERO_USAGE)
+
     json_schema_format: ResponseFormatJSONSchema = {
         "type": "json_schema",
         "json_schema": schema,
     }
     json_object_format: ResponseFormatJSONObject = {"type": "json_object"}
-    try:
-        resp = await client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            response_format=json_schema_format,
-        )
-    except Exception:
-        # Some OpenAI-compatible servers don't support json_schema; fall back.
-        resp = await client.chat.completions.create(
-            model=model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        system_prompt
-                        + "\n\nReturn ONLY valid JSON matching the structure described."
-                    ),
-                },
-                {"role": "user", "content": user_prompt},
-            ],
-            response_format=json_object_format,
-        )
+
+    async def attempt(response_format: str) -> ChatCompletion:
+        async with llm_scheduler.slot(_SCHEDULER_SESSION):
+            if response_format == _JSON_SCHEMA:
+                return await client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    response_format=json_schema_format,
+                )
+            # Some OpenAI-compatible servers don't support json_schema.
+            return await client.chat.completions.create(
+                model=model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": (
+                            system_prompt
+                            + "\n\nReturn ONLY valid JSON matching the structure described."
+                        ),
+                    },
+                    {"role": "user", "content": user_prompt},
+                ],
+                response_format=json_object_format,
+            )
+
+    resp = await _response_formats.run(str(client.base_url), model, attempt)
     raw = (resp.choices[0].message.content or "").strip()
     usage = {
         "prompt_tokens": getattr(resp.usage, "prompt_tokens", 0) if resp.usage else 0,
@@ -520,6 +679,8 @@ async def _judge(
             if match
             else {"raw": raw, "error": "unparseable"}
         )
+    if not (isinstance(parsed, dict) and parsed.get("error") == "unparseable"):
+        memo.put("judgment", memo_key, parsed)
     return parsed, usage
 
 
@@ -532,6 +693,296 @@ def _load_dataset_ids(limit: int | None) -> list[str]:
     return ids
 
 
+@dataclass
+class _EvalStages:
+    """Per-run worker pools: each stage's calls run at most this many at a
+    time, independently of the other stages."""
+
+    fetch: asyncio.Semaphore
+    generate: asyncio.Semaphore
+    judge: asyncio.Semaphore
+
+
+async def _evaluate_dataset(
+    request: EvalRunRequest,
+    http_client: httpx.AsyncClient,
+    openai_client: AsyncOpenAI,
+    stages: _EvalStages,
+    judge_model: str,
+    memo: _EvalMemo,
+    dataset_id: str,
+    idx: int,
+    total: int,
+    emit: Callable[[dict[str, Any]], None],
+) -> dict[str, Any]:
+    """Fetch, generate and judge one dataset (and its columns).
+
+    Progress events go to `emit` in the order a serial run would produce
+    them, ending with "dataset_done"; returns the dataset's result entry.
+    Column generations and judgments run concurrently, bounded by `stages`.
+    """
+    t0 = time.time()
+    emit({"type": "dataset_start", "i": idx, "total": total, "id": dataset_id})
+
+    try:
+        async with stages.fetch:
+            ds = await _fetch_dataset(http_client, dataset_id, memo)
+    except Exception as exc:
+        err = f"fetch failed: {exc}"
+        result: dict[str, Any] = {"dataset_id": dataset_id, "error": err}
+        emit(
+            {
+                "type": "dataset_done",
+                "result": result,
+                "elapsed_seconds": round(time.time() - t0, 2),
+            }
+        )
+        return result
+
+    gold_description = (ds.get("description") or "").strip()
+    if not gold_description:
+        result = {
+            "dataset_id": dataset_id,
+            "name": ds["name"],
+            "error": "no gold description",
+        }
+        emit(
+            {
+                "type": "dataset_done",
+                "result": result,
+                "elapsed_seconds": round(time.time() - t0, 2),
+            }
+        )
+        return result
+
+    emit({"type": "stage", "stage": "generating"})
+    dataset_prompt = _build_dataset_prompt(
+        ds["name"],
+        ds["total_rows"],
+        ds["columns"],
+        ds["sample_rows"],
+    )
+    async with stages.generate:
+        gen_description, gen_usage = await _generate(
+            openai_client, dataset_prompt, LLM_MODEL, memo
+        )
+
+    emit({"type": "stage", "stage": "judging"})
+    dataset_context = (
+        f"Dataset Name: {_sanitize_inline(ds['name'])}\n"
+        f"Rows: {ds['total_rows']}\n"
+        f"Columns: {len(ds['columns'])}\n"
+        f"Column list: {', '.join(_sanitize_inline(c['name']) for c in ds['columns'])}"
+    )
+
+    async def evaluate_column(
+        col: dict[str, Any], col_gold: str
+    ) -> tuple[dict[str, Any], dict[str, int], dict[str, int]]:
+        stats, sample_values, sample_non_null = _column_stats_from_sample(
+            col["name"], col["dataType"], ds["sample_rows"]
+        )
+        est_non_null = int(
+            round(ds["total_rows"] * (sample_non_null / max(len(ds["sample_rows"]), 1)))
+        )
+        column_prompt = _build_column_prompt(
+            col["name"],
+            col["dataType"],
+            est_non_null,
+            ds["total_rows"],
+            stats,
+            sample_values,
+            gen_description,
+        )
+        async with stages.generate:
+            col_gen, col_gen_usage = await _generate(
+                openai_client, column_prompt, LLM_MODEL, memo
+            )
+
+        col_context = (
+            f"Dataset: {_sanitize_inline(ds['name'])}\n"
+            f"Column name: {_sanitize_inline(col['name'])}\n"
+            f"Data type: {_sanitize_inline(col['dataType'])}\n"
+            f"Estimated non-null: {est_non_null}/{ds['total_rows']}\n"
+            f"Sample values: {', '.join(_sanitize_inline(v) for v in sample_values)}"
+        )
+        async with stages.judge:
+            col_judgment, col_judge_usage = await _judge(
+                openai_client,
+                col_context,
+                col_gold,
+                col_gen,
+                _SCORING_CATEGORIES_COLUMN,
+                judge_model,
+                memo,
+            )
+        entry = {
+            "field_name": col["fieldName"],
+            "display_name": col["name"],
+            "data_type": col["dataType"],
+            "gold_description": col_gold,
+            "generated_description": col_gen,
+            "judgment": col_judgment,
+        }
+        return entry, col_gen_usage, col_judge_usage
+
+    # Column prompts only depend on the generated dataset description, so the
+    # columns start alongside the dataset judgment.
+    column_tasks: list[
+        tuple[
+            dict[str, Any],
+            asyncio.Task[tuple[dict[str, Any], dict[str, int], dict[str, int]]],
+        ]
+    ] = []
+    if request.evalColumns:
+        cols = ds["columns"]
+        if request.maxColumnsPerDataset is not None:
+            cols = cols[: request.maxColumnsPerDataset]
+        for col in cols:
+            col_gold = (col.get("description") or "").strip()
+            if col_gold:
+                column_tasks.append(
+                    (col, asyncio.create_task(evaluate_column(col, col_gold)))
+                )
+
+    column_evals: list[dict[str, Any]] = []
+    col_gen_prompt = col_gen_completion = 0
+    col_judge_prompt = col_judge_completion = 0
+    try:
+        async with stages.judge:
+            dataset_judgment, judge_usage = await _judge(
+                openai_client,
+                dataset_context,
+                gold_description,
+                gen_description,
+                _SCORING_CATEGORIES_DATASET,
+                judge_model,
+                memo,
+            )
+
+        # Collected in column order, so events and token sums match a
+        # serial run.
+        for scored_count, (col, task) in enumerate(column_tasks, start=1):
+            emit(
+                {
+                    "type": "stage",
+                    "stage": "column",
+                    "col": col["name"],
+                    "i": scored_count,
+                    "total": len(column_tasks),
+                }
+            )
+            entry, col_gen_usage, col_judge_usage = await task
+            col_gen_prompt += col_gen_usage["prompt_tokens"]
+            col_gen_completion += col_gen_usage["completion_tokens"]
+            col_judge_prompt += col_judge_usage["prompt_tokens"]
+            col_judge_completion += col_judge_usage["completion_tokens"]
+            column_evals.append(entry)
+    finally:
+        for _, task in column_tasks:
+            task.cancel()
+
+    result = {
+        "dataset_id": dataset_id,
+        "name": ds["name"],
+        "total_rows": ds["total_rows"],
+        "column_count": len(ds["columns"]),
+        "dataset_evaluation": {
+            "gold_description": gold_description,
+            "generated_description": gen_description,
+            "judgment": dataset_judgment,
+        },
+        "column_evaluations": column_evals,
+        "tokens": {
+            "dataset_generation": {
+                "prompt": gen_usage["prompt_tokens"],
+                "completion": gen_usage["completion_tokens"],
+                "total": gen_usage["total_tokens"],
+            },
+            "dataset_judge": {
+                "prompt": judge_usage["prompt_tokens"],
+                "completion": judge_usage["completion_tokens"],
+                "total": judge_usage["total_tokens"],
+            },
+            "column_generation": {
+                "prompt": col_gen_prompt,
+                "completion": col_gen_completion,
+                "total": col_gen_prompt + col_gen_completion,
+            },
+            "column_judge": {
+                "prompt": col_judge_prompt,
+                "completion": col_judge_completion,
+                "total": col_judge_prompt + col_judge_completion,
+            },
+        },
+        "elapsed_seconds": round(time.time() - t0, 2),
+    }
+    emit(
+        {
+            "type": "dataset_done",
+            "result": result,
+            "elapsed_seconds": result["elapsed_seconds"],
+        }
+    )
+    return result
+
+
+def _eval_config_hash(request: EvalRunRequest, judge_model: str) -> str:
+    """Hash of everything that shapes a dataset's result, so a checkpoint is
+    only resumed by a run that would have produced the same results.
+    datasetLimit is left out: a resumed run may cover more datasets."""
+    material = json.dumps(
+        {
+            "generator_model": LLM_MODEL,
+            "judge_model": judge_model,
+            "llm_endpoint": LLM_ENDPOINT,
+            "eval_columns": request.evalColumns,
+            "max_columns_per_dataset": request.maxColumnsPerDataset,
+            "prompts": [_SYSTEM_PROMPT, _DATASET_PROMPT, _COLUMN_PROMPT],
+            "scoring_categories_dataset": _SCORING_CATEGORIES_DATASET,
+            "scoring_categories_column": _SCORING_CATEGORIES_COLUMN,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(material.encode()).hexdigest()[:16]
+
+
+def _checkpoint_path(run_id: str, config_hash: str) -> Path:
+    return EVAL_RUNS_DIR / f"{run_id}-{config_hash}.jsonl"
+
+
+def _latest_run_id(config_hash: str) -> str | None:
+    suffix = f"-{config_hash}.jsonl"
+    runs = sorted(EVAL_RUNS_DIR.glob(f"*{suffix}"), key=lambda p: p.stat().st_mtime)
+    return runs[-1].name.removesuffix(suffix) if runs else None
+
+
+def _load_checkpoint(path: Path) -> dict[str, dict[str, Any]]:
+    """Finished results by dataset id. Fetch failures are left out so a
+    resumed run retries them; a torn last line (killed mid-write) is skipped."""
+    done: dict[str, dict[str, Any]] = {}
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return done
+    for raw in lines:
+        try:
+            result = json.loads(raw)
+        except json.JSONDecodeError:
+            continue
+        if str(result.get("error", "")).startswith("fetch failed"):
+            continue
+        done[result["dataset_id"]] = result
+    return done
+
+
+def _append_checkpoint(path: Path, result: dict[str, Any]) -> None:
+    try:
+        with path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+    except OSError:
+        logger.warning("Failed to write eval checkpoint %s", path, exc_info=True)
+
+
 router = APIRouter()
 
 
@@ -575,6 +1026,23 @@ async def eval_run(request: EvalRunRequest, http_request: Request) -> StreamingR
     started_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
     judge_model = JUDGE_LLM_MODEL or LLM_MODEL
 
+    config_hash = _eval_config_hash(request, judge_model)
+    EVAL_RUNS_DIR.mkdir(parents=True, exist_ok=True)
+    run_id = request.runId or (_latest_run_id(config_hash) if request.resume else None)
+    if run_id is None:
+        run_id = (
+            datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            + "-"
+            + secrets.token_hex(3)
+        )
+    checkpoint = _checkpoint_path(run_id, config_hash)
+    if request.resume:
+        finished = _load_checkpoint(checkpoint)
+    else:
+        finished = {}
+        checkpoint.unlink(missing_ok=True)
+    resumed_count = sum(1 for dataset_id in dataset_ids if dataset_id in finished)
+
     async def event_stream() -> AsyncGenerator[str, None]:
         def line(payload: dict[str, Any]) -> str:
             return json.dumps(payload, ensure_ascii=False, default=str) + "\n"
@@ -588,217 +1056,92 @@ async def eval_run(request: EvalRunRequest, http_request: Request) -> StreamingR
                 "generator_model": LLM_MODEL,
                 "judge_model": judge_model,
                 "started_at": started_at,
+                "run_id": run_id,
+                "config_hash": config_hash,
+                "resumed": resumed_count,
             }
         )
 
         try:
-            async with (
-                AsyncOpenAI(
-                    base_url=LLM_ENDPOINT, api_key=LLM_API_KEY
-                ) as openai_client,
-                httpx.AsyncClient() as http_client,
-            ):
-                for idx, dataset_id in enumerate(dataset_ids, start=1):
-                    if await http_request.is_disconnected():
-                        break
-
-                    t0 = time.time()
-                    yield line(
-                        {
-                            "type": "dataset_start",
-                            "i": idx,
-                            "total": len(dataset_ids),
-                            "id": dataset_id,
-                        }
-                    )
-
+            http_client = get_http_client()
+            stages = _EvalStages(
+                fetch=asyncio.Semaphore(EVAL_FETCH_CONCURRENCY),
+                generate=asyncio.Semaphore(EVAL_GENERATE_CONCURRENCY),
+                judge=asyncio.Semaphore(EVAL_JUDGE_CONCURRENCY),
+            )
+            dataset_slots = asyncio.Semaphore(EVAL_DATASET_CONCURRENCY)
+            memo = _EvalMemo(request.reuseMemo)
+            async with AsyncOpenAI(
+                base_url=LLM_ENDPOINT, api_key=LLM_API_KEY
+            ) as openai_client:
+                # Datasets run concurrently (EVAL_DATASET_CONCURRENCY at a
+                # time), each into its own event queue. Queues are drained in
+                # dataset order, so the stream reads exactly like a serial run:
+                # the oldest unfinished dataset streams live, later ones are
+                # buffered until their turn.
+                queues: list[asyncio.Queue[dict[str, Any] | None]] = [
+                    asyncio.Queue() for _ in dataset_ids
+                ]
+
+                async def run_dataset(idx: int, dataset_id: str) -> dict[str, Any]:
+                    queue = queues[idx - 1]
                     try:
-                        ds = await _fetch_dataset(http_client, dataset_id)
-                    except Exception as exc:
-                        err = f"fetch failed: {exc}"
-                        results.append({"dataset_id": dataset_id, "error": err})
-                        yield line(
-                            {
-                                "type": "dataset_done",
-                                "result": results[-1],
-                                "elapsed_seconds": round(time.time() - t0, 2),
-                            }
-                        )
-                        continue
-
-                    gold_description = (ds.get("description") or "").strip()
-                    if not gold_description:
-                        results.append(
-                            {
-                                "dataset_id": dataset_id,
-                                "name": ds["name"],
-                                "error": "no gold description",
-                            }
-                        )
-                        yield line(
-                            {
-                                "type": "dataset_done",
-                                "result": results[-1],
-                                "elapsed_seconds": round(time.time() - t0, 2),
-                            }
-                        )
-                        continue
-
-                    yield line({"type": "stage", "stage": "generating"})
-                    dataset_prompt = _build_dataset_prompt(
-                        ds["name"],
-                        ds["total_rows"],
-                        ds["columns"],
-                        ds["sample_rows"],
-                    )
-                    gen_description, gen_usage = await _generate(
-                        openai_client, dataset_prompt, LLM_MODEL
-                    )
-
-                    yield line({"type": "stage", "stage": "judging"})
-                    dataset_context = (
-                        f"Dataset Name: {_sanitize_inline(ds['name'])}\n"
-                        f"Rows: {ds['total_rows']}\n"
-                        f"Columns: {len(ds['columns'])}\n"
-                        f"Column list: {', '.join(_sanitize_inline(c['name']) for c in ds['columns'])}"
-                    )
-                    dataset_judgment, judge_usage = await _judge(
-                        openai_client,
-                        dataset_context,
-                        gold_description,
-                        gen_description,
-                        _SCORING_CATEGORIES_DATASET,
-                        judge_model,
-                    )
-
-                    column_evals: list[dict[str, Any]] = []
-                    col_gen_prompt = col_gen_completion = 0
-                    col_judge_prompt = col_judge_completion = 0
-
-                    if request.evalColumns:
-                        cols = ds["columns"]
-                        if request.maxColumnsPerDataset is not None:
-                            cols = cols[: request.maxColumnsPerDataset]
-                        scored_count = 0
-                        scored_total = sum(
-                            1 for c in cols if (c.get("description") or "").strip()
-                        )
-                        for col in cols:
-                            if await http_request.is_disconnected():
-                                break
-                            col_gold = (col.get("description") or "").strip()
-                            if not col_gold:
-                                continue
-                            scored_count += 1
-                            stats, sample_values, sample_non_null = (
-                                _column_stats_from_sample(
-                                    col["name"], col["dataType"], ds["sample_rows"]
-                                )
-                            )
-                            est_non_null = int(
-                                round(
-                                    ds["total_rows"]
-                                    * (sample_non_null / max(len(ds["sample_rows"]), 1))
-                                )
-                            )
-
-                            yield line(
+                        previous = finished.get(dataset_id)
+                        if previous is not None:
+                            queue.put_nowait(
                                 {
-                                    "type": "stage",
-                                    "stage": "column",
-                                    "col": col["name"],
-                                    "i": scored_count,
-                                    "total": scored_total,
+                                    "type": "dataset_start",
+                                    "i": idx,
+                                    "total": len(dataset_ids),
+                                    "id": dataset_id,
                                 }
                             )
-
-                            column_prompt = _build_column_prompt(
-                                col["name"],
-                                col["dataType"],
-                                est_non_null,
-                                ds["total_rows"],
-                                stats,
-                                sample_values,
-                                gen_description,
-                            )
-                            col_gen, col_gen_usage = await _generate(
-                                openai_client, column_prompt, LLM_MODEL
-                            )
-                            col_gen_prompt += col_gen_usage["prompt_tokens"]
-                            col_gen_completion += col_gen_usage["completion_tokens"]
-
-                            col_context = (
-                                f"Dataset: {_sanitize_inline(ds['name'])}\n"
-                                f"Column name: {_sanitize_inline(col['name'])}\n"
-                                f"Data type: {_sanitize_inline(col['dataType'])}\n"
-                                f"Estimated non-null: {est_non_null}/{ds['total_rows']}\n"
-                                f"Sample values: {', '.join(_sanitize_inline(v) for v in sample_values)}"
+                            queue.put_nowait(
+                                {
+                                    "type": "dataset_done",
+                                    "result": previous,
+                                    "elapsed_seconds": previous.get(
+                                        "elapsed_seconds", 0
+                                    ),
+                                    "resumed": True,
+                                }
                             )
-                            col_judgment, col_judge_usage = await _judge(
+                            return previous
+                        async with dataset_slots:
+                            result = await _evaluate_dataset(
+                                request,
+                                http_client,
                                 openai_client,
-                                col_context,
-                                col_gold,
-                                col_gen,
-                                _SCORING_CATEGORIES_COLUMN,
+                                stages,
                                 judge_model,
+                                memo,
+                                dataset_id,
+                                idx,
+                                len(dataset_ids),
+                                queue.put_nowait,
                             )
-                            col_judge_prompt += col_judge_usage["prompt_tokens"]
-                            col_judge_completion += col_judge_usage["completion_tokens"]
-
-                            column_evals.append(
-                                {
-                                    "field_name": col["fieldName"],
-                                    "display_name": col["name"],
-                                    "data_type": col["dataType"],
-                                    "gold_description": col_gold,
-                                    "generated_description": col_gen,
-                                    "judgment": col_judgment,
-                                }
-                            )
-
-                    result = {
-                        "dataset_id": dataset_id,
-                        "name": ds["name"],
-                        "total_rows": ds["total_rows"],
-                        "column_count": len(ds["columns"]),
-                        "dataset_evaluation": {
-                            "gold_description": gold_description,
-                            "generated_description": gen_description,
-                            "judgment": dataset_judgment,
-                        },
-                        "column_evaluations": column_evals,
-                        "tokens": {
-                            "dataset_generation": {
-                                "prompt": gen_usage["prompt_tokens"],
-                                "completion": gen_usage["completion_tokens"],
-                                "total": gen_usage["total_tokens"],
-                            },
-                            "dataset_judge": {
-                                "prompt": judge_usage["prompt_tokens"],
-                                "completion": judge_usage["completion_tokens"],
-                                "total": judge_usage["total_tokens"],
-                            },
-                            "column_generation": {
-                                "prompt": col_gen_prompt,
-                                "completion": col_gen_completion,
-                                "total": col_gen_prompt + col_gen_completion,
-                            },
-                            "column_judge": {
-                                "prompt": col_judge_prompt,
-                                "completion": col_judge_completion,
-                                "total": col_judge_prompt + col_judge_completion,
-                            },
-                        },
-                        "elapsed_seconds": round(time.time() - t0, 2),
-                    }
-                    results.append(result)
-                    yield line(
-                        {
-                            "type": "dataset_done",
-                            "result": result,
-                            "elapsed_seconds": result["elapsed_seconds"],
-                        }
-                    )
+                        # Checkpoint as soon as the dataset finishes, not when
+                        # the stream reaches it, so buffered work survives a
+                        # dropped connection.
+                        _append_checkpoint(checkpoint, result)
+                        return result
+                    finally:
+                        queue.put_nowait(None)
+
+                tasks = [
+                    asyncio.create_task(run_dataset(idx, dataset_id))
+                    for idx, dataset_id in enumerate(dataset_ids, start=1)
+                ]
+                try:
+                    for queue, task in zip(queues, tasks):
+                        if await http_request.is_disconnected():
+                            break
+                        while (event := await queue.get()) is not None:
+                            yield line(event)
+                        results.append(task.result())
+                finally:
+                    for task in tasks:
+                        task.cancel()
 
             output = {
                 "metadata": {
@@ -814,6 +1157,15 @@ async def eval_run(request: EvalRunRequest, http_request: Request) -> StreamingR
                     "eval_columns": request.evalColumns,
                     "max_columns_per_dataset": request.maxColumnsPerDataset,
                     "source": "api",
+                    "run_id": run_id,
+                    "config_hash": config_hash,
+                    "resumed_datasets": resumed_count,
+                    "memo_reuse": memo.reuse,
+                    "memo_hits": memo.hits,
+                    # None when every judgment was memoized (nothing probed).
+                    "judge_response_format": _response_formats.get(
+                        str(openai_client.base_url), judge_model
+                    ),
                     "scoring_categories_dataset": [
                         {"key": k, "label": label, "description": desc}
                         for k, label, desc in _SCORING_CATEGORIES_DATASET
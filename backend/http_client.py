@@ -0,0 +1,83 @@
+import importlib.util
+import logging
+from http.cookiejar import Cookie, CookieJar, DefaultCookiePolicy
+from urllib.request import Request
+
+import httpx
+
+from .config import (
+    HTTP_CONNECT_TIMEOUT_SECONDS,
+    HTTP_ENABLE_HTTP2,
+    HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_TIMEOUT_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# One pooled client for all outbound Socrata traffic (the configured portal
+# and api.us.socrata.com). httpx keeps a separate keep-alive pool per host
+# inside a single client, so per-column SODA bursts reuse warm TLS
+# connections instead of re-handshaking on every request. Created lazily on
+# first use and closed by the app lifespan in main.py.
+_client: httpx.AsyncClient | None = None
+
+
+class _RejectAllCookies(DefaultCookiePolicy):
+    """The shared client serves every user, so it must never store a
+    Set-Cookie from one user's (authenticated) request and replay it on
+    another's. Auth travels in explicit per-request headers instead."""
+
+    def set_ok(self, cookie: Cookie, request: Request) -> bool:
+        return False
+
+    def return_ok(self, cookie: Cookie, request: Request) -> bool:
+        return False
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (`pip install httpx[http2]`)."""
+    if importlib.util.find_spec("h2") is not None:
+        return True
+    logger.warning(
+        "HTTP_ENABLE_HTTP2=1 but the 'h2' package is not installed — "
+        "falling back to HTTP/1.1. Install httpx[http2] to enable it."
+    )
+    return False
+
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=HTTP_ENABLE_HTTP2 and _http2_available(),
+        cookies=CookieJar(policy=_RejectAllCookies()),
+        timeout=httpx.Timeout(
+            HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS
+        ),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled client. Usable as a FastAPI dependency.
+
+    Callers must NOT close it or use it as a context manager — the lifespan
+    owns it. Pass a per-request `timeout=` where an endpoint needs a tighter
+    bound than the shared default.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the pooled client (app shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,44 +1,422 @@
+import asyncio
+import hashlib
 import json
 import logging
-from collections.abc import AsyncGenerator
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator
+from typing import Any
 
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
-from openai import APIStatusError, AsyncOpenAI
-from openai.types.chat import ChatCompletionMessageParam
+from openai import APIStatusError, AsyncStream
+from openai.types.chat import ChatCompletionChunk, ChatCompletionMessageParam
 
-from .auth import read_session
+from .auth import read_session, session_fingerprint
+from .cache import ByteLRUCache
 from .config import (
     LLM_API_KEY,
+    LLM_BATCH_CONCURRENCY,
+    LLM_BATCH_MAX_CONCURRENCY,
+    LLM_BATCH_MAX_ITEMS,
     LLM_ENDPOINT,
     LLM_MODEL,
     LLM_MODEL_CONCISE,
     LLM_MODEL_DETAILED,
     LLM_MODEL_SUGGEST,
+    LLM_RESPONSE_CACHE_MAX_BYTES,
+    LLM_RESPONSE_CACHE_TTL_SECONDS,
 )
-from .models import ChatRequest
+from .llm_clients import openai_clients
+from .llm_scheduler import SlotTicket, llm_scheduler
+from .models import ChatBatchRequest, ChatRequest, LLMStatsResponse
+from .shared_store import shared_store
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/openai")
 
+# Content deltas are coalesced into one SSE `content` event per flush: at most
+# STREAM_FLUSH_INTERVAL_SECONDS after the first pending delta, or as soon as
+# STREAM_FLUSH_BYTES have accumulated. Token-sized frames otherwise cost one
+# json.dumps and one socket write each.
+STREAM_FLUSH_INTERVAL_SECONDS = 0.03
+STREAM_FLUSH_BYTES = 256
+# How often the background watcher polls for a client disconnect.
+DISCONNECT_POLL_SECONDS = 0.25
+# Deltas queued per subscriber of a shared in-flight stream before it falls
+# back to catching up from the stream's buffer.
+INFLIGHT_SUBSCRIBER_QUEUE_SIZE = 64
+# Events a batch stream buffers for a slow client before its workers wait
+# for it to catch up (and stop starting new items meanwhile).
+BATCH_BUFFERED_EVENTS = 64
 
-@router.post("/chat/stream")
-async def openai_chat_stream(
-    request: ChatRequest, http_request: Request
-) -> StreamingResponse:
-    # Resolve configuration in tiers, binding credentials and model to the SAME
-    # source so the server's LLM_API_KEY can never be paired with an arbitrary
-    # user-chosen model or upstream endpoint:
-    #   Tier 1 — request body (user supplied apiKey inline this call)
-    #   Tier 2 — encrypted session cookie (user previously saved their config)
-    #   Tier 3 — server environment defaults (LLM_* vars)
-    session = read_session(http_request)
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+# Completed responses, stored as {"content", "usage", "expiresAt"} JSON. Only
+# streams that ran to completion are cached; a hit is replayed as a normal
+# SSE stream whose usage event is marked cached (and bills zero tokens).
+_response_cache = (
+    ByteLRUCache(
+        max_bytes=LLM_RESPONSE_CACHE_MAX_BYTES,
+        shared=shared_store,
+        shared_prefix="llm:",
+        shared_ttl_seconds=LLM_RESPONSE_CACHE_TTL_SECONDS,
+    )
+    if LLM_RESPONSE_CACHE_MAX_BYTES > 0
+    else None
+)
+
+
+def response_cache_key(
+    base_url: str,
+    api_key: str,
+    model: str,
+    mode: str,
+    messages: list[ChatCompletionMessageParam],
+) -> str:
+    """Content address of a completion request. The API key is hashed in so
+    users bringing their own credentials never share entries with others."""
+    material = json.dumps(
+        [
+            base_url.rstrip("/"),
+            hashlib.sha256(api_key.encode()).hexdigest(),
+            model,
+            mode,
+            messages,
+        ],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def _cached_response(key: str) -> tuple[str, dict[str, int]] | None:
+    if _response_cache is None:
+        return None
+    raw = _response_cache.get(key)
+    if raw is None:
+        return None
+    entry = json.loads(raw)
+    if entry["expiresAt"] <= time.time():
+        return None
+    return entry["content"], entry["usage"]
+
+
+def _store_response(key: str, content: str, usage: dict[str, int]) -> None:
+    if _response_cache is None:
+        return
+    _response_cache.set(
+        key,
+        json.dumps(
+            {
+                "content": content,
+                "usage": usage,
+                "expiresAt": time.time() + LLM_RESPONSE_CACHE_TTL_SECONDS,
+            }
+        ),
+    )
+
+
+async def _replay_deltas(content: str) -> AsyncIterator[str]:
+    for start in range(0, len(content), STREAM_FLUSH_BYTES):
+        yield content[start : start + STREAM_FLUSH_BYTES]
+
+
+def sse_event(event: dict[str, Any]) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+
+async def _content_deltas(
+    stream: AsyncStream[ChatCompletionChunk], usage: dict[str, int]
+) -> AsyncIterator[str]:
+    """Yield the content deltas of a completion stream, recording its token
+    usage into `usage` as the final chunk arrives."""
+    try:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+            if chunk.usage:
+                usage["promptTokens"] = chunk.usage.prompt_tokens or 0
+                usage["completionTokens"] = chunk.usage.completion_tokens or 0
+                usage["totalTokens"] = chunk.usage.total_tokens or 0
+    finally:
+        # Release the upstream connection promptly, including on cancellation.
+        await stream.close()
+
+
+async def _watch_disconnect(http_request: Request, task: asyncio.Future[Any]) -> None:
+    while not task.done():
+        if await http_request.is_disconnected():
+            task.cancel()
+            return
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+
+async def coalesce_deltas(
+    deltas: AsyncIterator[str], http_request: Request | None = None
+) -> AsyncIterator[str]:
+    """Re-chunk `deltas` into time- and size-bounded batches.
+
+    The source is drained by a producer task so a slow upstream never holds
+    back a pending flush. With `http_request`, a watcher polls for a client
+    disconnect every DISCONNECT_POLL_SECONDS and cancels the producer (and so
+    the upstream stream); iteration then ends quietly. Any other producer
+    error is raised after the pending text has been flushed.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[str | None] = asyncio.Queue()
+
+    async def pump() -> None:
+        try:
+            async for delta in deltas:
+                queue.put_nowait(delta)
+        finally:
+            queue.put_nowait(None)
+
+    producer = asyncio.create_task(pump())
+    watcher = (
+        asyncio.create_task(_watch_disconnect(http_request, producer))
+        if http_request is not None
+        else None
+    )
+    pending: list[str] = []
+    pending_bytes = 0
+    deadline: float | None = None
+    try:
+        finished = False
+        while not finished:
+            try:
+                if deadline is None:
+                    item = await queue.get()
+                else:
+                    item = await asyncio.wait_for(
+                        queue.get(), max(0.0, deadline - loop.time())
+                    )
+            except TimeoutError:
+                item = ""
+            else:
+                # Drain whatever else is already queued without re-awaiting.
+                while item is not None:
+                    pending.append(item)
+                    pending_bytes += len(item)
+                    if queue.empty():
+                        item = ""
+                        break
+                    item = queue.get_nowait()
+                finished = item is None
+                if deadline is None:
+                    deadline = loop.time() + STREAM_FLUSH_INTERVAL_SECONDS
+
+            if pending and (
+                finished
+                or pending_bytes >= STREAM_FLUSH_BYTES
+                or (deadline is not None and loop.time() >= deadline)
+            ):
+                yield "".join(pending)
+                pending.clear()
+                pending_bytes = 0
+                deadline = None
+
+        if not producer.cancelled():
+            # Re-raise an upstream failure (the None sentinel came from
+            # pump's finally block).
+            producer.result()
+    finally:
+        producer.cancel()
+        if watcher is not None:
+            watcher.cancel()
+
+
+class _UsageReport:
+    """What a completion's final usage event carries: the tokens to bill
+    to this request and its `cached` / `shared` flags. Filled in when the
+    deltas end, since which subscriber of a shared stream reports the real
+    totals can change while it runs."""
+
+    def __init__(self, **flags: bool) -> None:
+        self.usage = {"promptTokens": 0, "completionTokens": 0, "totalTokens": 0}
+        self.flags = flags
+
+
+class _Subscription:
+    def __init__(self, cursor: int, report: _UsageReport, billed: bool) -> None:
+        self.queue: asyncio.Queue[str | None] = asyncio.Queue(
+            maxsize=INFLIGHT_SUBSCRIBER_QUEUE_SIZE
+        )
+        # Number of the flight's deltas this subscriber has been handed.
+        self.cursor = cursor
+        # Set when the queue overflowed; the subscriber then catches up from
+        # the flight's buffer instead of the queue.
+        self.lagging = False
+        self.report = report
+        # Whether this subscriber reports the flight's real token usage.
+        self.billed = billed
+
+
+class InflightCompletion:
+    """One upstream completion stream shared by every identical request.
+
+    Deltas are buffered in full (late joiners start with the prefix so far)
+    and fanned out through per-subscriber bounded queues, so a slow client
+    never holds back the upstream read or the other subscribers. The
+    upstream is cancelled once the last subscriber leaves.
+
+    Exactly one subscriber reports the real token usage: the request that
+    opened the stream, or, if it leaves early, one of those still attached.
+
+    The upstream call waits for a llm_scheduler slot charged to `session`,
+    the session of the request that opened it, in that request's lane until
+    an interactive request joins (see `promote`). Joined requests add no
+    upstream load, so they take no slot of their own.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        base_url: str,
+        api_key: str,
+        model: str,
+        messages: list[ChatCompletionMessageParam],
+        session: str,
+        interactive: bool,
+    ) -> None:
+        self.key = key
+        self.parts: list[str] = []
+        self.usage: dict[str, int] = {
+            "promptTokens": 0,
+            "completionTokens": 0,
+            "totalTokens": 0,
+        }
+        self.done = False
+        self.error: Exception | None = None
+        self._subscribers: set[_Subscription] = set()
+        self._ticket = SlotTicket(session, interactive)
+        self._task = asyncio.create_task(self._run(base_url, api_key, model, messages))
+
+    def promote(self) -> None:
+        """Run (or keep waiting) in the interactive lane: an interactive
+        request joined this stream, and shouldn't queue behind bulk work."""
+        llm_scheduler.promote(self._ticket)
+
+    async def _run(
+        self,
+        base_url: str,
+        api_key: str,
+        model: str,
+        messages: list[ChatCompletionMessageParam],
+    ) -> None:
+        try:
+            # Pooled per (base_url, api_key) so parallel generations share
+            # keep-alive connections to the LLM endpoint.
+            async with (
+                llm_scheduler.slot_for(self._ticket),
+                openai_clients.lease(base_url, api_key) as client,
+            ):
+                stream = await client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                async for delta in _content_deltas(stream, self.usage):
+                    self._publish(delta)
+            if self.parts:
+                _store_response(self.key, "".join(self.parts), self.usage)
+        except Exception as e:
+            self.error = e
+        finally:
+            if _inflight.get(self.key) is self:
+                del _inflight[self.key]
+            self.done = True
+            for sub in self._subscribers:
+                self._push(sub, None)
+
+    def _push(self, sub: _Subscription, item: str | None) -> None:
+        if sub.lagging:
+            return
+        try:
+            sub.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            sub.lagging = True
+
+    def _publish(self, delta: str) -> None:
+        self.parts.append(delta)
+        for sub in self._subscribers:
+            self._push(sub, delta)
+
+    async def subscribe(self, report: _UsageReport, billed: bool) -> AsyncIterator[str]:
+        """Yield the buffered prefix, then every new delta until the stream
+        ends, then fill in `report`. Raises the upstream error, if any."""
+        sub = _Subscription(len(self.parts), report, billed)
+        self._subscribers.add(sub)
+        reported = False
+        try:
+            if sub.cursor:
+                yield "".join(self.parts[: sub.cursor])
+            while True:
+                if sub.lagging and sub.queue.empty():
+                    missed = self.parts[sub.cursor :]
+                    sub.cursor = len(self.parts)
+                    sub.lagging = False
+                    if missed:
+                        yield "".join(missed)
+                    if self.done:
+                        break
+                    continue
+                if self.done and sub.queue.empty():
+                    break
+                item = await sub.queue.get()
+                if item is None:
+                    break
+                sub.cursor += 1
+                yield item
+            if self.error is not None:
+                raise self.error
+            if sub.billed:
+                sub.report.usage = dict(self.usage)
+            reported = True
+        finally:
+            self._subscribers.discard(sub)
+            if sub.billed and not reported and self._subscribers:
+                # Leaving early: hand the billed tokens to a subscriber that
+                # will still see the end, so they aren't dropped from every
+                # client's accounting.
+                next(iter(self._subscribers)).billed = True
+            if not self._subscribers and not self.done:
+                self._task.cancel()
+
+
+# Upstream streams currently running, by response_cache_key.
+_inflight: dict[str, InflightCompletion] = {}
+
+
+def resolve_llm_config(
+    session: dict[str, Any],
+    base_url: str | None,
+    api_key: str | None,
+    model: str | None,
+    mode: str | None,
+) -> tuple[str, str, str]:
+    """Return the (base_url, api_key, model) a completion should use.
+
+    Configuration resolves in tiers, binding credentials and model to the SAME
+    source so the server's LLM_API_KEY can never be paired with an arbitrary
+    user-chosen model or upstream endpoint:
+      Tier 1 — request body (user supplied apiKey inline this call)
+      Tier 2 — encrypted session cookie (user previously saved their config)
+      Tier 3 — server environment defaults (LLM_* vars)
+    Raises HTTPException(400) for a disallowed or incomplete combination.
+    """
     config = session.get("openai_config") or {}
 
-    req_base_url = (request.baseURL or "").strip()
-    req_api_key = (request.apiKey or "").strip()
-    req_model = (request.model or "").strip()
+    req_base_url = (base_url or "").strip()
+    req_api_key = (api_key or "").strip()
+    req_model = (model or "").strip()
 
     cfg_base_url = (config.get("baseURL") or "").strip()
     cfg_api_key = (config.get("apiKey") or "").strip()
@@ -47,13 +425,13 @@ async def openai_chat_stream(
         "concise": (config.get("modelConcise") or "").strip(),
         "detailed": (config.get("modelDetailed") or "").strip(),
         "suggest": (config.get("modelSuggest") or "").strip(),
-    }.get(request.mode or "", "")
+    }.get(mode or "", "")
 
     env_mode_model = {
         "concise": LLM_MODEL_CONCISE,
         "detailed": LLM_MODEL_DETAILED,
         "suggest": LLM_MODEL_SUGGEST,
-    }.get(request.mode or "", "")
+    }.get(mode or "", "")
 
     if req_api_key:
         if not req_base_url:
@@ -61,13 +439,13 @@ async def openai_chat_stream(
                 status_code=400,
                 detail="To use a custom API Key, you must also provide a Base URL.",
             )
-        base_url = req_base_url
-        api_key = req_api_key
-        model = req_model or cfg_mode_model or cfg_model
+        resolved_base_url = req_base_url
+        resolved_api_key = req_api_key
+        resolved_model = req_model or cfg_mode_model or cfg_model
     elif cfg_api_key:
-        base_url = req_base_url or cfg_base_url
-        api_key = cfg_api_key
-        model = req_model or cfg_mode_model or cfg_model
+        resolved_base_url = req_base_url or cfg_base_url
+        resolved_api_key = cfg_api_key
+        resolved_model = req_model or cfg_mode_model or cfg_model
     else:
         # Server defaults only — reject any attempt to override model or baseURL,
         # so the server's API key is always paired with the server's configured
@@ -78,17 +456,17 @@ async def openai_chat_stream(
                 detail="To use a custom model or Base URL, you must also configure "
                 "your own API Key in Settings.",
             )
-        base_url = LLM_ENDPOINT
-        api_key = LLM_API_KEY
-        model = env_mode_model or LLM_MODEL
+        resolved_base_url = LLM_ENDPOINT
+        resolved_api_key = LLM_API_KEY
+        resolved_model = env_mode_model or LLM_MODEL
 
     # Validate configuration
     missing_config = []
-    if not base_url:
+    if not resolved_base_url:
         missing_config.append("Base URL")
-    if not api_key:
+    if not resolved_api_key:
         missing_config.append("API Key")
-    if not model:
+    if not resolved_model:
         missing_config.append("Model")
 
     if missing_config:
@@ -97,66 +475,278 @@ async def openai_chat_stream(
             detail=f"Missing required configuration: {', '.join(missing_config)}. "
             "Please enter them in the Settings page.",
         )
+    return resolved_base_url, resolved_api_key, resolved_model
 
-    # Build messages array, only include system prompt if provided
+
+def build_messages(
+    prompt: str, system_prompt: str | None
+) -> list[ChatCompletionMessageParam]:
+    # Only include the system prompt if provided
     messages: list[ChatCompletionMessageParam] = []
-    if request.systemPrompt and request.systemPrompt.strip():
-        messages.append({"role": "system", "content": request.systemPrompt})
-    messages.append({"role": "user", "content": request.prompt})
+    if system_prompt and system_prompt.strip():
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": prompt})
+    return messages
 
-    # Shared path for all providers (OpenAI / LM Studio / Ollama via AsyncOpenAI)
-    async def generate() -> AsyncGenerator[str, None]:
-        usage: dict[str, int] = {
-            "promptTokens": 0,
-            "completionTokens": 0,
-            "totalTokens": 0,
-        }
 
-        try:
-            client = AsyncOpenAI(
-                base_url=base_url,
-                api_key=api_key,
-            )
+def _error_message(e: Exception) -> str:
+    if isinstance(e, APIStatusError):
+        return f"API error ({e.status_code}): {e.message}"
+    return str(e)
 
-            stream = await client.chat.completions.create(
-                model=model,
-                messages=messages,
-                stream=True,
-                stream_options={"include_usage": True},
-            )
 
-            async for chunk in stream:
-                # Check if the client disconnected
-                if await http_request.is_disconnected():
-                    break
+def _completion_source(
+    base_url: str,
+    api_key: str,
+    model: str,
+    mode: str | None,
+    messages: list[ChatCompletionMessageParam],
+    session: str,
+    interactive: bool,
+    no_cache: bool = False,
+) -> tuple[AsyncIterator[str], _UsageReport]:
+    """Content deltas for one completion and its usage report (filled in
+    once the deltas end).
+
+    Served from the response cache, from an identical in-flight stream, or
+    from a new upstream stream, in that order. Replays (`cached`) and joined
+    streams (`shared`) report zero tokens; the request that opened the
+    upstream stream was billed for them. If that request leaves early, a
+    joined stream inherits the real totals (still flagged `shared`).
+
+    `no_cache` (an explicit regenerate) always opens a new upstream stream;
+    its result still refreshes the cache.
+    """
+    key = response_cache_key(base_url, api_key, model, mode or "default", messages)
+    if not no_cache:
+        cached = _cached_response(key)
+        if cached is not None:
+            return _replay_deltas(cached[0]), _UsageReport(cached=True)
+
+        flight = _inflight.get(key)
+        if flight is not None:
+            if interactive:
+                flight.promote()
+            report = _UsageReport(shared=True)
+            return flight.subscribe(report, billed=False), report
+    flight = InflightCompletion(
+        key, base_url, api_key, model, messages, session, interactive
+    )
+    # A bypassing stream leaves an already-registered one in place for
+    # others to join.
+    _inflight.setdefault(key, flight)
+    report = _UsageReport()
+    return flight.subscribe(report, billed=True), report
 
-                if chunk.choices and chunk.choices[0].delta.content:
-                    content = chunk.choices[0].delta.content
-                    yield f"data: {json.dumps({'type': 'content', 'content': content})}\n\n"
 
-                if chunk.usage:
-                    usage["promptTokens"] = chunk.usage.prompt_tokens or 0
-                    usage["completionTokens"] = chunk.usage.completion_tokens or 0
-                    usage["totalTokens"] = chunk.usage.total_tokens or 0
+@router.get("/stats", response_model=LLMStatsResponse)
+async def openai_stats(http_request: Request) -> LLMStatsResponse:
+    """Return LLM scheduler (queue depth, throttling) and response cache
+    counters for this process.
+
+    The counters reflect every user's generations, so like
+    /api/socrata/stats this needs a signed-in session (OAuth or API key).
+    """
+    session = read_session(http_request)
+    if session.get("kind") not in ("oauth", "api_key"):
+        raise HTTPException(
+            status_code=401,
+            detail="Authentication required to view server statistics. "
+            "Please sign in with OAuth or save an API key.",
+        )
+    return LLMStatsResponse(
+        scheduler=llm_scheduler.stats(),
+        responseCache=_response_cache.stats() if _response_cache else None,
+        inflight=len(_inflight),
+    )
+
+
+@router.post("/chat/stream")
+async def openai_chat_stream(
+    request: ChatRequest, http_request: Request
+) -> StreamingResponse:
+    base_url, api_key, model = resolve_llm_config(
+        read_session(http_request),
+        request.baseURL,
+        request.apiKey,
+        request.model,
+        request.mode,
+    )
+    messages = build_messages(request.prompt, request.systemPrompt)
+    session = session_fingerprint(http_request)
+
+    # Shared path for all providers (OpenAI / LM Studio / Ollama via AsyncOpenAI)
+    async def generate() -> AsyncGenerator[str, None]:
+        try:
+            # Single-field generations run in the scheduler's interactive
+            # lane, ahead of batch and eval work.
+            deltas, report = _completion_source(
+                base_url,
+                api_key,
+                model,
+                request.mode,
+                messages,
+                session,
+                True,
+                no_cache=request.noCache,
+            )
+            # Disconnects are detected by a background watcher rather than
+            # probed per chunk; leaving unsubscribes, and the last subscriber
+            # to leave cancels the upstream stream.
+            async for content in coalesce_deltas(deltas, http_request):
+                yield sse_event({"type": "content", "content": content})
 
             # Send final usage data
-            yield f"data: {json.dumps({'type': 'usage', 'usage': usage})}\n\n"
+            yield sse_event({"type": "usage", "usage": report.usage, **report.flags})
             yield "data: [DONE]\n\n"
 
         except Exception as e:
             logger.exception("Streaming chat error")
-            if isinstance(e, APIStatusError):
-                error_message = f"API error ({e.status_code}): {e.message}"
-            else:
-                error_message = str(e)
-            yield f"data: {json.dumps({'type': 'error', 'error': error_message})}\n\n"
+            yield sse_event({"type": "error", "error": _error_message(e)})
 
     return StreamingResponse(
         generate(),
         media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@router.post("/chat/batch")
+async def openai_chat_batch(
+    request: ChatBatchRequest, http_request: Request
+) -> StreamingResponse:
+    """Generate completions for many prompts over one NDJSON stream.
+
+    Items are scheduled here rather than by the browser: highest priority
+    first (ties in request order), at most `concurrency` at a time. Every
+    event but the last carries the item's id:
+
+      {"type": "content", "id", "content"}         — one per flushed chunk
+      {"type": "usage", "id", "usage"[, "cached" | "shared"]}
+      {"type": "error", "id", "error"}             — replaces "usage" on failure
+      {"type": "done", "completed", "failed", "elapsedSeconds"}
+
+    Every item's configuration is resolved before the stream opens, so a bad
+    configuration still fails the request with a plain HTTP error status.
+    """
+    items = request.items
+    if not items:
+        raise HTTPException(status_code=400, detail="No prompts to generate.")
+    if len(items) > LLM_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many prompts in one batch (max {LLM_BATCH_MAX_ITEMS}).",
+        )
+    if len({item.id for item in items}) != len(items):
+        raise HTTPException(status_code=400, detail="Batch item ids must be unique.")
+
+    session = read_session(http_request)
+    resolved = [
+        resolve_llm_config(
+            session, request.baseURL, request.apiKey, request.model, item.mode
+        )
+        for item in items
+    ]
+    fingerprint = session_fingerprint(http_request)
+    concurrency = min(
+        max(1, request.concurrency or LLM_BATCH_CONCURRENCY),
+        LLM_BATCH_MAX_CONCURRENCY,
+        len(items),
+    )
+    pending = deque(sorted(range(len(items)), key=lambda i: (-items[i].priority, i)))
+    t0 = time.time()
+
+    async def event_stream() -> AsyncGenerator[str, None]:
+        def line(payload: dict[str, Any]) -> str:
+            return json.dumps(payload, ensure_ascii=False, default=str) + "\n"
+
+        # Events are counted against `room` rather than a queue maxsize so a
+        # worker's end-of-work marker (None) can always be queued, even when
+        # it is cancelled with the buffer full.
+        out: asyncio.Queue[str | None] = asyncio.Queue()
+        room = asyncio.Semaphore(BATCH_BUFFERED_EVENTS)
+        failed = 0
+
+        async def emit(payload: dict[str, Any]) -> None:
+            await room.acquire()
+            out.put_nowait(line(payload))
+
+        async def worker() -> None:
+            nonlocal failed
+            try:
+                while pending:
+                    index = pending.popleft()
+                    item = items[index]
+                    base_url, api_key, model = resolved[index]
+                    try:
+                        deltas, report = _completion_source(
+                            base_url,
+                            api_key,
+                            model,
+                            item.mode,
+                            build_messages(item.prompt, item.systemPrompt),
+                            fingerprint,
+                            False,
+                        )
+                        async for content in coalesce_deltas(deltas):
+                            await emit(
+                                {
+                                    "type": "content",
+                                    "id": item.id,
+                                    "content": content,
+                                }
+                            )
+                        await emit(
+                            {
+                                "type": "usage",
+                                "id": item.id,
+                                "usage": report.usage,
+                                **report.flags,
+                            }
+                        )
+                    except Exception as e:
+                        logger.warning("Batch item %s failed: %s", item.id, e)
+                        failed += 1
+                        await emit(
+                            {
+                                "type": "error",
+                                "id": item.id,
+                                "error": _error_message(e),
+                            }
+                        )
+            finally:
+                out.put_nowait(None)
+
+        runner = asyncio.gather(*(worker() for _ in range(concurrency)))
+        watcher = asyncio.create_task(_watch_disconnect(http_request, runner))
+        try:
+            running = concurrency
+            while running:
+                chunk = await out.get()
+                if chunk is None:
+                    running -= 1
+                    continue
+                room.release()
+                yield chunk
+            if not runner.cancelled():
+                yield line(
+                    {
+                        "type": "done",
+                        "completed": len(items) - failed,
+                        "failed": failed,
+                        "elapsedSeconds": round(time.time() - t0, 2),
+                    }
+                )
+        finally:
+            # Client went away — don't keep generating for nobody.
+            runner.cancel()
+            watcher.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
         headers={
             "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
             "X-Accel-Buffering": "no",
         },
     )
@@ -0,0 +1,101 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from openai import AsyncOpenAI
+
+from .config import LLM_CLIENT_IDLE_SECONDS, LLM_CLIENT_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PooledClient:
+    client: AsyncOpenAI
+    last_used: float = field(default_factory=time.monotonic)
+    leases: int = 0
+    # Set when the entry falls out of the LRU while a stream still holds it;
+    # the last lease to release it closes the client.
+    evicted: bool = False
+
+
+class OpenAIClientPool:
+    """Bounded LRU of AsyncOpenAI clients keyed by (base_url, sha256(api_key)).
+
+    Each AsyncOpenAI owns an httpx connection pool, so reusing one per
+    endpoint+key lets parallel generations share keep-alive connections
+    instead of opening a fresh pool (and TLS handshake) per request. The raw
+    API key is never used as a dict key — only its hash.
+
+    Clients are handed out as leases so eviction never closes a client that
+    an in-flight stream is still reading from.
+    """
+
+    def __init__(self, max_clients: int, idle_seconds: float) -> None:
+        self._max_clients = max_clients
+        self._idle_seconds = idle_seconds
+        self._entries: OrderedDict[tuple[str, str], _PooledClient] = OrderedDict()
+
+    @staticmethod
+    def _key(base_url: str, api_key: str) -> tuple[str, str]:
+        return base_url, hashlib.sha256(api_key.encode()).hexdigest()
+
+    def _collect_evictions(self, now: float) -> list[AsyncOpenAI]:
+        """Drop idle and over-capacity entries; return the ones safe to close now."""
+        to_close: list[AsyncOpenAI] = []
+        for key, entry in list(self._entries.items()):
+            idle = entry.leases == 0 and now - entry.last_used > self._idle_seconds
+            over = len(self._entries) > self._max_clients
+            if not (idle or over):
+                continue
+            del self._entries[key]
+            if entry.leases == 0:
+                to_close.append(entry.client)
+            else:
+                entry.evicted = True
+        return to_close
+
+    @asynccontextmanager
+    async def lease(self, base_url: str, api_key: str) -> AsyncIterator[AsyncOpenAI]:
+        """Borrow the pooled client for (base_url, api_key) for one request."""
+        key = self._key(base_url, api_key)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _PooledClient(
+                client=AsyncOpenAI(base_url=base_url, api_key=api_key)
+            )
+            self._entries[key] = entry
+        self._entries.move_to_end(key)
+        entry.leases += 1
+        entry.last_used = now
+        # The just-leased entry is most recent and has leases > 0, so it is
+        # never closed by its own sweep.
+        for client in self._collect_evictions(now):
+            await client.close()
+        try:
+            yield entry.client
+        finally:
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+            if entry.evicted and entry.leases == 0:
+                await entry.client.close()
+
+    async def aclose(self) -> None:
+        """Close every pooled client (app shutdown)."""
+        entries = list(self._entries.values())
+        self._entries.clear()
+        for entry in entries:
+            try:
+                await entry.client.close()
+            except Exception:
+                logger.exception("Failed to close pooled OpenAI client")
+
+
+openai_clients = OpenAIClientPool(
+    max_clients=LLM_CLIENT_POOL_SIZE, idle_seconds=LLM_CLIENT_IDLE_SECONDS
+)
@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from dataclasses import dataclass, field
+
+from openai import RateLimitError
+
+from .config import (
+    LLM_INTERACTIVE_RESERVED_SLOTS,
+    LLM_MAX_CONCURRENCY,
+    LLM_SESSION_MAX_CONCURRENCY,
+)
+from .ratelimit import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Pause applied on a 429 that carries no usable Retry-After.
+DEFAULT_THROTTLE_SECONDS = 2.0
+
+
+@dataclass(eq=False)
+class SlotTicket:
+    """One request for a completion slot, from queueing to release.
+
+    Created by `slot()`, or up front by a caller that may need to
+    `promote()` it while it waits or runs.
+    """
+
+    session: str
+    interactive: bool
+    future: asyncio.Future[None] = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future()
+    )
+    granted: bool = False
+    released: bool = False
+
+
+class LLMScheduler:
+    """Concurrency governor and fair queue for upstream LLM completions.
+
+    At most `max_concurrency` completions run at once, and at most
+    `per_session` of them for any one session. Waiting requests are queued
+    per session and granted round-robin across sessions, so one user's bulk
+    job can't starve everyone else. Interactive requests (a single field
+    regeneration) are served before bulk ones, and bulk work may only use
+    `max_concurrency - interactive_reserved` slots, keeping headroom for
+    them.
+
+    A 429 from the endpoint pauses every new grant until its Retry-After
+    elapses. Limits are per worker process.
+    """
+
+    def __init__(
+        self, max_concurrency: int, per_session: int, interactive_reserved: int
+    ) -> None:
+        self._max = max_concurrency
+        self._per_session = per_session
+        self._bulk_max = max(1, max_concurrency - interactive_reserved)
+        self._in_flight = 0
+        self._bulk_in_flight = 0
+        self._session_in_flight: dict[str, int] = {}
+        # Lane -> session -> waiters; the OrderedDict order is the round-robin
+        # ring (a session moves to the back after each grant).
+        self._lanes: dict[bool, OrderedDict[str, deque[SlotTicket]]] = {
+            True: OrderedDict(),
+            False: OrderedDict(),
+        }
+        self._blocked_until = 0.0
+        self._wakeup: asyncio.TimerHandle | None = None
+        self.granted = 0
+        self.throttled = 0
+        self.max_queued = 0
+
+    def queued(self, interactive: bool | None = None) -> int:
+        lanes = (
+            self._lanes.values() if interactive is None else [self._lanes[interactive]]
+        )
+        return sum(len(q) for lane in lanes for q in lane.values())
+
+    def _next_waiter(self) -> SlotTicket | None:
+        for interactive, lane in self._lanes.items():
+            if not interactive and self._bulk_in_flight >= self._bulk_max:
+                continue
+            for session in list(lane):
+                if self._session_in_flight.get(session, 0) >= self._per_session:
+                    continue
+                waiters = lane[session]
+                waiter = waiters.popleft()
+                if waiters:
+                    lane.move_to_end(session)
+                else:
+                    del lane[session]
+                return waiter
+        return None
+
+    def _on_wakeup(self) -> None:
+        self._wakeup = None
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        wait = self._blocked_until - time.monotonic()
+        if wait > 0:
+            if self._wakeup is None and self.queued():
+                self._wakeup = asyncio.get_running_loop().call_later(
+                    wait, self._on_wakeup
+                )
+            return
+        while self._in_flight < self._max:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            if waiter.future.done():
+                # Cancelled while queued; its task is withdrawing it.
+                continue
+            self._in_flight += 1
+            if not waiter.interactive:
+                self._bulk_in_flight += 1
+            self._session_in_flight[waiter.session] = (
+                self._session_in_flight.get(waiter.session, 0) + 1
+            )
+            self.granted += 1
+            waiter.granted = True
+            waiter.future.set_result(None)
+
+    def _release(self, ticket: SlotTicket) -> None:
+        ticket.released = True
+        self._in_flight -= 1
+        if not ticket.interactive:
+            self._bulk_in_flight -= 1
+        remaining = self._session_in_flight[ticket.session] - 1
+        if remaining:
+            self._session_in_flight[ticket.session] = remaining
+        else:
+            del self._session_in_flight[ticket.session]
+        self._dispatch()
+
+    def _withdraw(self, waiter: SlotTicket) -> bool:
+        lane = self._lanes[waiter.interactive]
+        waiters = lane.get(waiter.session)
+        if waiters is None or waiter not in waiters:
+            return False
+        waiters.remove(waiter)
+        if not waiters:
+            del lane[waiter.session]
+        return True
+
+    def promote(self, ticket: SlotTicket) -> None:
+        """Move a bulk ticket to the interactive lane, e.g. because an
+        interactive request is now waiting on its result.
+
+        A queued ticket moves to the back of its session's interactive
+        queue; a running one stops counting against the bulk limit.
+        """
+        if ticket.interactive or ticket.released:
+            return
+        if ticket.granted:
+            self._bulk_in_flight -= 1
+            ticket.interactive = True
+        elif self._withdraw(ticket):
+            ticket.interactive = True
+            self._lanes[True].setdefault(ticket.session, deque()).append(ticket)
+        else:
+            # Not queued yet; slot_for() will queue it in the right lane.
+            ticket.interactive = True
+        self._dispatch()
+
+    def slot(
+        self, session: str, interactive: bool = False
+    ) -> AbstractAsyncContextManager[None]:
+        """Hold one completion slot for `session` while the body runs.
+
+        A RateLimitError raised by the body pauses the scheduler (it is
+        re-raised unchanged).
+        """
+        return self.slot_for(SlotTicket(session, interactive))
+
+    @asynccontextmanager
+    async def slot_for(self, ticket: SlotTicket) -> AsyncIterator[None]:
+        """`slot()` for a ticket created up front."""
+        self._lanes[ticket.interactive].setdefault(ticket.session, deque()).append(
+            ticket
+        )
+        self.max_queued = max(self.max_queued, self.queued())
+        self._dispatch()
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # Granted just as we were cancelled — hand the slot back.
+                self._release(ticket)
+            else:
+                self._withdraw(ticket)
+            raise
+        try:
+            yield
+        except RateLimitError as e:
+            self.on_throttle(parse_retry_after(e.response.headers.get("retry-after")))
+            raise
+        finally:
+            self._release(ticket)
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        self.throttled += 1
+        pause = retry_after if retry_after is not None else DEFAULT_THROTTLE_SECONDS
+        self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+        logger.warning(
+            "LLM endpoint throttled; pausing new completions for %.1fs " "(%d queued)",
+            pause,
+            self.queued(),
+        )
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "maxConcurrency": self._max,
+            "inFlight": self._in_flight,
+            "bulkInFlight": self._bulk_in_flight,
+            "queued": self.queued(),
+            "queuedInteractive": self.queued(True),
+            "maxQueued": self.max_queued,
+            "sessions": len(self._session_in_flight),
+            "granted": self.granted,
+            "throttled": self.throttled,
+            "blockedForSeconds": round(
+                max(self._blocked_until - time.monotonic(), 0.0), 3
+            ),
+        }
+
+
+llm_scheduler = LLMScheduler(
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    per_session=LLM_SESSION_MAX_CONCURRENCY,
+    interactive_reserved=LLM_INTERACTIVE_RESERVED_SLOTS,
+)
@@ -1,3 +1,6 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -9,17 +12,39 @@ from starlette.middleware.base import RequestResponseEndpoint
 
 # Importing config first triggers dotenv loading for the whole package, so any
 # module imported afterwards (e.g. .eval) sees a populated environment.
-from .config import ENABLE_EVAL, FRONTEND_URL, PORT
+from .config import ENABLE_EVAL, FRONTEND_URL, PORT, WORKERS
 from .auth import router as auth_router
 from .eval import router as eval_router
+from .http_client import close_http_client, get_http_client
+from .llm_clients import openai_clients
 from .llm import router as llm_router
 from .models import HealthResponse
+from .shared_store import shared_store
+from .socrata import load_catalog_snapshot, warm_catalog_caches
 from .socrata import router as socrata_router
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Shared outbound clients are created lazily on first use; the lifespan
+    # owns their shutdown so keep-alive connections close cleanly.
+    # Catalog lists come back from the last snapshot and are refreshed in the
+    # background, so the first requests after a restart answer from memory.
+    load_catalog_snapshot()
+    warm_up = asyncio.create_task(warm_catalog_caches(get_http_client()))
+    yield
+    warm_up.cancel()
+    await close_http_client()
+    await openai_clients.aclose()
+    if shared_store is not None:
+        shared_store.close()
+
+
 app = FastAPI(
     title="AI Metadata Improvement Tool API",
     description="Backend API for metadata improvement using AI",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS: cookie-based sessions require a concrete allowed origin (wildcard +
@@ -129,4 +154,9 @@ if static_dir.exists():
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=PORT)
+    # Multiple workers need the app as an import string so each process can
+    # import it (see WORKERS in config.py).
+    if WORKERS > 1:
+        uvicorn.run("backend.main:app", host="0.0.0.0", port=PORT, workers=WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=PORT)
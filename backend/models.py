@@ -16,6 +16,42 @@ class ChatRequest(BaseModel):
     baseURL: str | None = None  # Falls back to LLM_ENDPOINT env var
     apiKey: str | None = None  # Falls back to LLM_API_KEY env var
     mode: Literal["default", "concise", "detailed", "suggest"] | None = None
+    # Skip the response cache (and identical in-flight streams) so the user
+    # gets a fresh generation; the result still refreshes the cache.
+    noCache: bool = False
+
+
+class ChatBatchItem(BaseModel):
+    """One prompt of a batch generation, tagged with a caller-chosen id
+    (e.g. the column name) that every result event for it carries."""
+
+    id: str
+    prompt: str
+    systemPrompt: str | None = None
+    mode: Literal["default", "concise", "detailed", "suggest"] | None = None
+    # Higher runs first; ties run in request order.
+    priority: int = 0
+
+
+class ChatBatchRequest(BaseModel):
+    """Request for many chat completions streamed over one connection.
+    model / baseURL / apiKey apply to every item, as on ChatRequest."""
+
+    items: list[ChatBatchItem]
+    model: str | None = None
+    baseURL: str | None = None
+    apiKey: str | None = None
+    # Completions run at once; clamped to LLM_BATCH_MAX_CONCURRENCY.
+    concurrency: int | None = None
+
+
+class LLMStatsResponse(BaseModel):
+    """Operational counters for the LLM proxy (scheduler queue depth and
+    throttling, response cache hit rates, shared in-flight streams)."""
+
+    scheduler: dict[str, float]
+    responseCache: dict[str, int] | None = None
+    inflight: int
 
 
 # ============================================================================
@@ -39,9 +75,21 @@ class SocrataImportRequest(BaseModel):
     """Request to import a dataset from the Socrata portal by dataset ID.
 
     Auth (OAuth token or API key) is read from the encrypted session cookie.
+    `quantileMethod` picks how numeric quartiles are computed: "exact" sorts
+    the column once per quartile, "histogram" approximates all three from one
+    bucketed query. Falls back to the SOCRATA_QUANTILE_METHOD env default.
+    `statsEngine` picks how column stats are computed: "soda" (aggregate
+    queries), "local" (one streamed pass over the CSV export) or "auto";
+    falls back to SOCRATA_STATS_ENGINE.
+    `lazyStats` skips computing column stats (columnStats is empty unless a
+    full import is already cached); fetch them per column from
+    /api/socrata/{datasetId}/columns/{fieldName}/stats instead.
     """
 
     datasetId: str
+    quantileMethod: Literal["exact", "histogram"] | None = None
+    statsEngine: Literal["auto", "soda", "local"] | None = None
+    lazyStats: bool = False
 
 
 class SocrataColumnMetadata(BaseModel):
@@ -84,6 +132,14 @@ class SocrataImportResponse(BaseModel):
     columnStats: dict[str, ColumnStats]
 
 
+class SocrataStatsResponse(BaseModel):
+    """Operational counters for the Socrata import path (cache hit rates,
+    the adaptive SODA concurrency window, …)."""
+
+    importCache: dict[str, int]
+    sodaLimiter: dict[str, float]
+
+
 # ============================================================================
 # Socrata Export Models
 # ============================================================================
@@ -255,3 +311,11 @@ class EvalRunRequest(BaseModel):
     datasetLimit: int | None = Field(default=5, ge=1, le=200)
     evalColumns: bool = True
     maxColumnsPerDataset: int | None = Field(default=8, ge=1, le=100)
+    # Every finished dataset is checkpointed to disk under a run id. With
+    # resume, datasets already finished in that run (or, without runId, the
+    # latest run with the same configuration) are replayed, not re-evaluated.
+    resume: bool = False
+    runId: str | None = Field(default=None, pattern=r"^[A-Za-z0-9_-]{1,64}$")
+    # Reuse memoized fetches, generations and judgments from earlier runs
+    # (see EVAL_MEMO_DIR). False runs every stage fresh (and records it).
+    reuseMemo: bool = True
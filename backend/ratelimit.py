@@ -0,0 +1,162 @@
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from .shared_store import SharedStore
+
+# Upper bound on how long a single Retry-After may pause us, so a misbehaving
+# upstream can't park every request for hours.
+MAX_RETRY_AFTER_SECONDS = 60.0
+# How often a limiter re-reads throttle signals published by other workers.
+SHARED_SYNC_INTERVAL_SECONDS = 0.5
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER_SECONDS)
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency window for calls to a rate-limited upstream.
+
+    The window grows by one slot per window's worth of successes (additive
+    increase) and halves on a throttling response (multiplicative decrease),
+    converging on the highest concurrency the upstream tolerates for our
+    token instead of a hard-coded guess. A Retry-After pauses all new
+    acquisitions until it elapses.
+
+    Decreases are applied at most once per `decrease_cooldown` seconds: a
+    burst of 429s from requests that were already in flight reflects one
+    overload event, not N of them.
+
+    With a `shared` store (multi-worker mode), throttling is published under
+    `shared_key`: every worker's limiter adopts the reduced window and the
+    Retry-After pause, since they all draw on the same upstream quota.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        decrease_cooldown: float = 1.0,
+        shared: SharedStore | None = None,
+        shared_key: str = "limiter",
+    ) -> None:
+        self._limit = float(initial)
+        self._min = min_limit
+        self._max = max_limit
+        self._cooldown = decrease_cooldown
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+        self._shared = shared
+        self._shared_key = shared_key
+        self._shared_seen = 0.0
+        self._shared_checked = 0.0
+        self.throttled = 0
+
+    @property
+    def window(self) -> int:
+        return int(self._limit)
+
+    def _sync_shared(self) -> None:
+        """Adopt a throttle signal another worker published since we last looked."""
+        now = time.monotonic()
+        if (
+            self._shared is None
+            or now - self._shared_checked < SHARED_SYNC_INTERVAL_SECONDS
+        ):
+            return
+        self._shared_checked = now
+        row = self._shared.get(self._shared_key)
+        if row is None or row[1] <= self._shared_seen:
+            return
+        self._shared_seen = row[1]
+        try:
+            signal = json.loads(row[0])
+            limit = float(signal["limit"])
+            blocked_for = float(signal["blockedUntil"]) - time.time()
+        except (KeyError, TypeError, ValueError):
+            return
+        self._limit = max(float(self._min), min(self._limit, limit))
+        if blocked_for > 0:
+            self._blocked_until = max(self._blocked_until, now + blocked_for)
+
+    async def _acquire(self) -> None:
+        async with self._cond:
+            self._sync_shared()
+            while True:
+                wait = self._blocked_until - time.monotonic()
+                if wait > 0:
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=wait)
+                    except TimeoutError:
+                        pass
+                    continue
+                if self._in_flight < self.window:
+                    break
+                await self._cond.wait()
+            self._in_flight += 1
+
+    async def _release(self) -> None:
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one concurrency slot for the duration of a single request."""
+        await self._acquire()
+        try:
+            yield
+        finally:
+            await self._release()
+
+    def on_success(self) -> None:
+        self._limit = min(float(self._max), self._limit + 1.0 / self._limit)
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        self.throttled += 1
+        now = time.monotonic()
+        if now - self._last_decrease >= self._cooldown:
+            self._limit = max(float(self._min), self._limit / 2)
+            self._last_decrease = now
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+        if self._shared is not None:
+            wall_blocked_until = time.time() + max(self._blocked_until - now, 0.0)
+            self._shared.set(
+                self._shared_key,
+                json.dumps({"limit": self._limit, "blockedUntil": wall_blocked_until}),
+            )
+            # Don't re-adopt our own signal.
+            self._shared_seen = time.time()
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "window": self.window,
+            "inFlight": self._in_flight,
+            "blockedForSeconds": round(
+                max(self._blocked_until - time.monotonic(), 0.0), 3
+            ),
+            "throttled": self.throttled,
+        }
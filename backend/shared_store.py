@@ -0,0 +1,120 @@
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .config import SHARED_CACHE_MAX_BYTES, SHARED_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Expired rows (and the oldest past the size cap) are swept on every Nth
+# write rather than on a timer.
+_PRUNE_EVERY_WRITES = 256
+# How long a call waits on another worker's write lock. Calls run on the
+# event loop, so this stays short: a locked database is a miss (or a dropped
+# write), not a stalled worker. Setup uses a longer wait.
+_BUSY_TIMEOUT_MS = 50
+_SETUP_TIMEOUT_SECONDS = 5.0
+
+
+class SharedStore:
+    """String key-value store with per-key expiry, shared by every worker
+    process on the host through one SQLite file (WAL mode).
+
+    Used as a second tier behind the per-process caches so work one worker
+    did (a catalog fetch, an import, a throttling signal) is visible to the
+    others. Calls are short local-disk operations and run synchronously;
+    failures are logged and treated as misses so a broken store only costs
+    the sharing, never the request. Lock waits are capped at
+    _BUSY_TIMEOUT_MS for the same reason.
+
+    Keys and values are kept to `max_bytes` in total (UTF-8) by the
+    periodic prune, which drops the least recently updated entries first.
+    """
+
+    def __init__(self, path: Path, max_bytes: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(path),
+            timeout=_SETUP_TIMEOUT_SECONDS,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._max_bytes = max_bytes
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " expires_at REAL)"
+            )
+            self._conn.execute(f"PRAGMA busy_timeout={_BUSY_TIMEOUT_MS}")
+
+    def get(self, key: str) -> tuple[str, float] | None:
+        """Return (value, updated_at) for a live key, else None."""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, updated_at FROM entries"
+                    " WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                    (key, time.time()),
+                ).fetchone()
+        except sqlite3.Error:
+            logger.warning("Shared store read failed for %s", key, exc_info=True)
+            return None
+        return (row[0], row[1]) if row else None
+
+    def set(
+        self,
+        key: str,
+        value: str,
+        ttl_seconds: float | None = None,
+        updated_at: float | None = None,
+    ) -> None:
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds is not None else None
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                    (key, value, now if updated_at is None else updated_at, expires_at),
+                )
+                self._writes += 1
+                if self._writes % _PRUNE_EVERY_WRITES == 0:
+                    self._prune(now)
+        except sqlite3.Error:
+            logger.warning("Shared store write failed for %s", key, exc_info=True)
+
+    def _prune(self, now: float) -> None:
+        self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        # Keep the newest entries whose running size fits under the cap.
+        deleted = self._conn.execute(
+            "DELETE FROM entries WHERE key IN ("
+            " SELECT key FROM ("
+            "  SELECT key, SUM("
+            "   LENGTH(CAST(key AS BLOB)) + LENGTH(CAST(value AS BLOB))"
+            "  ) OVER (ORDER BY updated_at DESC, key) AS running"
+            "  FROM entries)"
+            " WHERE running > ?)",
+            (self._max_bytes,),
+        ).rowcount
+        if deleted > 0:
+            logger.info("Shared store over its size cap; dropped %d entries", deleted)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# None in single-worker mode (see config.SHARED_CACHE_PATH).
+shared_store = (
+    SharedStore(SHARED_CACHE_PATH, SHARED_CACHE_MAX_BYTES)
+    if SHARED_CACHE_PATH
+    else None
+)
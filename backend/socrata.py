@@ -1,13 +1,29 @@
 import asyncio
+import json
 import logging
+import os
 import time
-from typing import Any
+from collections.abc import AsyncGenerator, Callable
+from pathlib import Path
+from typing import Any, TypeVar, cast
 
 import httpx
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
 from .auth import read_session, require_xhr_header
-from .config import SOCRATA_BASE_URL, SOCRATA_DOMAIN
+from .cache import ByteLRUCache, RefreshingCache, SharedTier
+from .config import (
+    CATALOG_SNAPSHOT_PATH,
+    IMPORT_CACHE_DIR,
+    IMPORT_CACHE_DISK_MAX_BYTES,
+    IMPORT_CACHE_MAX_BYTES,
+    SOCRATA_BASE_URL,
+    SOCRATA_DOMAIN,
+    SOCRATA_QUANTILE_METHOD,
+    SOCRATA_STATS_ENGINE,
+)
+from .http_client import get_http_client
 from .models import (
     ColumnStats,
     SocrataCategoriesResponse,
@@ -19,26 +35,279 @@ from .models import (
     SocrataImportResponse,
     SocrataLicenseInfo,
     SocrataLicensesResponse,
+    SocrataStatsResponse,
     SocrataTagsResponse,
 )
-from .socrata_soda import build_socrata_auth, compute_column_stats, soda_get
+from .socrata_soda import (
+    QuantileMethod,
+    SodaQueryError,
+    build_socrata_auth,
+    compute_column_stats,
+    start_column_aggregates,
+    soda_get,
+    soda_limiter,
+)
+from .socrata_profile import (
+    StatsEngine,
+    local_profile_candidates,
+    local_profile_columns,
+    profile_columns,
+)
+from .shared_store import shared_store
+from .tag_index import TagIndex
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/socrata")
 
-# Cache for the live category list fetched from the Socrata catalog API.
-# Populated lazily on first request; refreshed after TTL expires.
-_categories_cache: dict[str, Any] = {"value": None, "fetched_at": 0.0}
+V = TypeVar("V")
+
+
+# Caches for the live category / license / tag lists from the catalog APIs.
+# Populated lazily on first request; after the TTL they keep answering from
+# memory while a single background fetch refreshes them.
+# Every successful fetch also schedules a snapshot write (see
+# load_catalog_snapshot) and, with multiple workers, is shared with the other
+# processes. The *_to_json / *_from_json pairs are the encoding for both.
+def _categories_from_json(data: Any) -> list[str]:
+    return [str(c) for c in data]
+
+
+def _licenses_to_json(licenses: list[SocrataLicenseInfo]) -> Any:
+    return [lic.model_dump() for lic in licenses]
+
+
+def _licenses_from_json(data: Any) -> list[SocrataLicenseInfo]:
+    return [SocrataLicenseInfo.model_validate(lic) for lic in data]
+
+
+def _tags_to_json(index: TagIndex) -> Any:
+    return index.pairs()
+
+
+def _tags_from_json(data: Any) -> TagIndex:
+    return TagIndex([(str(name), int(count)) for name, count in data])
+
+
+def _shared_tier(
+    namespace: str, to_json: Callable[[V], Any], from_json: Callable[[Any], V]
+) -> SharedTier[V] | None:
+    if shared_store is None:
+        return None
+    return SharedTier(
+        store=shared_store,
+        namespace=namespace,
+        encode=lambda value: json.dumps(to_json(value)),
+        decode=lambda raw: from_json(json.loads(raw)),
+    )
+
+
 _CATEGORIES_TTL_SECONDS = 24 * 60 * 60
+_categories_cache: RefreshingCache[list[str]] = RefreshingCache(
+    _CATEGORIES_TTL_SECONDS,
+    on_update=lambda: _schedule_catalog_snapshot(),
+    shared=_shared_tier("categories:", list, _categories_from_json),
+)
 
-_licenses_cache: dict[str, Any] = {"value": None, "fetched_at": 0.0}
 _LICENSES_TTL_SECONDS = 24 * 60 * 60
+_licenses_cache: RefreshingCache[list[SocrataLicenseInfo]] = RefreshingCache(
+    _LICENSES_TTL_SECONDS,
+    on_update=lambda: _schedule_catalog_snapshot(),
+    shared=_shared_tier("licenses:", _licenses_to_json, _licenses_from_json),
+)
 
-# Tag list cache, keyed by category (empty string = no category filter).
-_tags_cache: dict[str, dict[str, Any]] = {}
+# Tag lists, keyed by category (empty string = no category filter). The key
+# comes from the query string, so bound how many categories are held.
 _TAGS_TTL_SECONDS = 24 * 60 * 60
+_TAGS_MAX_CATEGORIES = 256
 _TAGS_MAX_RETURN = 2000
+_TAG_SEARCH_MAX_LIMIT = 200
+_tags_cache: RefreshingCache[TagIndex] = RefreshingCache(
+    _TAGS_TTL_SECONDS,
+    max_keys=_TAGS_MAX_CATEGORIES,
+    on_update=lambda: _schedule_catalog_snapshot(),
+    shared=_shared_tier("tags:", _tags_to_json, _tags_from_json),
+)
+
+# Bump when the snapshot layout changes; older files are ignored.
+_CATALOG_SNAPSHOT_VERSION = 1
+# Writes are debounced so a burst of per-category tag loads writes once.
+_CATALOG_SNAPSHOT_DEBOUNCE_SECONDS = 2.0
+_catalog_snapshot_pending = False
+
+# Full import results, keyed by dataset id + the view's version stamps, so
+# re-importing an unchanged dataset costs one metadata GET. Shared entries
+# expire after a week so superseded versions don't accumulate.
+_IMPORT_SHARED_TTL_SECONDS = 7 * 24 * 60 * 60
+_import_cache = ByteLRUCache(
+    max_bytes=IMPORT_CACHE_MAX_BYTES,
+    disk_dir=Path(IMPORT_CACHE_DIR) if IMPORT_CACHE_DIR else None,
+    disk_max_bytes=IMPORT_CACHE_DISK_MAX_BYTES,
+    shared=shared_store,
+    shared_prefix="import:",
+    shared_ttl_seconds=_IMPORT_SHARED_TTL_SECONDS,
+)
+
+
+def _schedule_catalog_snapshot() -> None:
+    global _catalog_snapshot_pending
+    if CATALOG_SNAPSHOT_PATH is None or _catalog_snapshot_pending:
+        return
+    _catalog_snapshot_pending = True
+    asyncio.get_running_loop().call_later(
+        _CATALOG_SNAPSHOT_DEBOUNCE_SECONDS, _save_catalog_snapshot
+    )
+
+
+def _save_catalog_snapshot() -> None:
+    """Write the catalog caches to CATALOG_SNAPSHOT_PATH (atomically)."""
+    global _catalog_snapshot_pending
+    _catalog_snapshot_pending = False
+    if CATALOG_SNAPSHOT_PATH is None:
+        return
+    payload = {
+        "version": _CATALOG_SNAPSHOT_VERSION,
+        "domain": SOCRATA_DOMAIN,
+        "savedAt": time.time(),
+        "categories": [
+            {"key": k, "fetchedAt": t, "value": v}
+            for k, v, t in _categories_cache.items()
+        ],
+        "licenses": [
+            {"key": k, "fetchedAt": t, "value": _licenses_to_json(v)}
+            for k, v, t in _licenses_cache.items()
+        ],
+        "tags": [
+            {"key": k, "fetchedAt": t, "value": _tags_to_json(v)}
+            for k, v, t in _tags_cache.items()
+        ],
+    }
+    try:
+        CATALOG_SNAPSHOT_PATH.parent.mkdir(parents=True, exist_ok=True)
+        # Per-process temp name: every worker writes the same snapshot.
+        tmp = CATALOG_SNAPSHOT_PATH.with_name(
+            f"{CATALOG_SNAPSHOT_PATH.name}.{os.getpid()}.tmp"
+        )
+        tmp.write_text(json.dumps(payload), encoding="utf-8")
+        tmp.replace(CATALOG_SNAPSHOT_PATH)
+    except OSError:
+        logger.warning(
+            "Failed to write catalog snapshot %s", CATALOG_SNAPSHOT_PATH, exc_info=True
+        )
+
+
+def load_catalog_snapshot() -> None:
+    """Seed the catalog caches from the last snapshot (app startup).
+
+    Entries keep their original fetch time, so anything past its TTL is
+    served immediately and refreshed in the background on first use. A
+    snapshot from another portal domain or layout version is ignored.
+    """
+    if CATALOG_SNAPSHOT_PATH is None:
+        return
+    try:
+        payload = json.loads(CATALOG_SNAPSHOT_PATH.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError):
+        logger.warning(
+            "Failed to read catalog snapshot %s", CATALOG_SNAPSHOT_PATH, exc_info=True
+        )
+        return
+    if (
+        payload.get("version") != _CATALOG_SNAPSHOT_VERSION
+        or payload.get("domain") != SOCRATA_DOMAIN
+    ):
+        return
+    try:
+        for entry in payload.get("categories", []):
+            _categories_cache.set(
+                entry["key"],
+                _categories_from_json(entry["value"]),
+                entry["fetchedAt"],
+            )
+        for entry in payload.get("licenses", []):
+            _licenses_cache.set(
+                entry["key"], _licenses_from_json(entry["value"]), entry["fetchedAt"]
+            )
+        for entry in payload.get("tags", []):
+            _tags_cache.set(
+                entry["key"], _tags_from_json(entry["value"]), entry["fetchedAt"]
+            )
+    except (KeyError, TypeError, ValueError):
+        logger.warning("Ignoring malformed catalog snapshot", exc_info=True)
+
+
+async def warm_catalog_caches(client: httpx.AsyncClient) -> None:
+    """Load (or start refreshing) the unscoped catalog lists at startup so the
+    first user doesn't pay for the catalog API calls."""
+    results = await asyncio.gather(
+        _categories_cache.get("", lambda: _fetch_socrata_categories(client)),
+        _licenses_cache.get("", lambda: _fetch_socrata_licenses(client)),
+        _tags_cache.get("", lambda: _fetch_socrata_tags(client)),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning("Catalog cache warm-up failed: %s", result)
+
+
+def _version_cache_key(dataset_id: str, metadata: dict[str, Any]) -> str | None:
+    """Cache key for one version of a view, or None if it isn't versioned.
+
+    `rowsUpdatedAt` moves when the data changes and `viewLastModified` when
+    the metadata does (including our own exports), so either bump yields a
+    fresh key and stale entries simply age out of the LRU.
+    """
+    rows_updated = metadata.get("rowsUpdatedAt")
+    view_modified = metadata.get("viewLastModified")
+    if rows_updated is None and view_modified is None:
+        return None
+    return f"{SOCRATA_DOMAIN}/{dataset_id}@{rows_updated}:{view_modified}"
+
+
+def _import_cache_key(
+    dataset_id: str,
+    metadata: dict[str, Any],
+    quantile_method: str,
+    stats_engine: str,
+) -> str | None:
+    """Cache key for an import result with column stats.
+
+    Stats depend on how they were computed as well as on the data: the
+    local profiler and SODA differ in e.g. which values they sample, so
+    each engine setting gets its own entry.
+    """
+    version_key = _version_cache_key(dataset_id, metadata)
+    if version_key is None:
+        return None
+    return f"{version_key}/{quantile_method}/{stats_engine}"
+
+
+# Row counts and previews don't depend on the stats settings, so they're
+# keyed by the view version alone.
+def _row_count_cache_key(version_key: str) -> str:
+    return f"{version_key}/rows"
+
+
+def _preview_cache_key(version_key: str) -> str:
+    return f"{version_key}/preview"
+
+
+def _column_cache_key(import_key: str, field_name: str) -> str:
+    return f"{import_key}/columns/{field_name}"
+
+
+async def _fetch_row_count(
+    client: httpx.AsyncClient,
+    soda_base: str,
+    headers: dict[str, str],
+    strict: bool = False,
+) -> int:
+    count_rows = await soda_get(
+        client, soda_base, {"$select": "count(*) as total"}, headers, strict
+    )
+    return int(count_rows[0]["total"]) if count_rows else 0
 
 
 @router.get("/config", response_model=SocrataConfigResponse)
@@ -47,136 +316,658 @@ async def socrata_config() -> SocrataConfigResponse:
     return SocrataConfigResponse(domain=SOCRATA_DOMAIN)
 
 
-@router.post("/import", response_model=SocrataImportResponse)
-async def socrata_import(
+@router.get("/stats", response_model=SocrataStatsResponse)
+async def socrata_stats(http_request: Request) -> SocrataStatsResponse:
+    """Return import cache and SODA rate-limiter counters for this process.
+
+    The counters reflect every user's imports, so like /export this needs a
+    signed-in session (OAuth or API key).
+    """
+    session = read_session(http_request)
+    if session.get("kind") not in ("oauth", "api_key"):
+        raise HTTPException(
+            status_code=401,
+            detail="Authentication required to view server statistics. "
+            "Please sign in with OAuth or save an API key.",
+        )
+    return SocrataStatsResponse(
+        importCache=_import_cache.stats(), sodaLimiter=soda_limiter.stats()
+    )
+
+
+def _import_params(
     request: SocrataImportRequest, http_request: Request
-) -> SocrataImportResponse:
+) -> tuple[str, QuantileMethod, StatsEngine, dict[str, str]]:
+    """Validate an import request.
+
+    Returns (dataset_id, quantile_method, stats_engine, headers).
+    """
     if not request.datasetId or not request.datasetId.strip():
         raise HTTPException(status_code=400, detail="Dataset ID is required")
-
-    dataset_id = request.datasetId.strip()
     session = read_session(http_request)
-    headers = build_socrata_auth(session)
+    return (
+        request.datasetId.strip(),
+        request.quantileMethod or SOCRATA_QUANTILE_METHOD,
+        request.statsEngine or SOCRATA_STATS_ENGINE,
+        build_socrata_auth(session),
+    )
+
+
+async def fetch_view_metadata(
+    client: httpx.AsyncClient, dataset_id: str, headers: dict[str, str]
+) -> dict[str, Any]:
+    """GET /api/views/{id}.json, raising the portal's status on failure."""
+    metadata_resp = await client.get(
+        f"{SOCRATA_BASE_URL}/api/views/{dataset_id}.json", headers=headers
+    )
+    if metadata_resp.status_code != 200:
+        raise HTTPException(
+            status_code=metadata_resp.status_code,
+            detail=f"Failed to fetch dataset metadata: {metadata_resp.reason_phrase}",
+        )
+    return cast(dict[str, Any], metadata_resp.json())
 
-    metadata_url = f"{SOCRATA_BASE_URL}/api/views/{dataset_id}.json"
+
+def _import_skeleton(
+    dataset_id: str, metadata: dict[str, Any]
+) -> SocrataImportResponse:
+    """Build the import response from view metadata alone.
+
+    Sample rows, row count and column stats are left empty for the caller to
+    fill in. Raises 400 if the view has no (non-system) columns.
+    """
+    dataset_name = metadata.get("name") or dataset_id
+    dataset_description = metadata.get("description") or ""
+    row_label = (
+        metadata.get("metadata", {}).get("rowLabel", "")
+        or metadata.get("rowLabel", "")
+        or ""
+    )
+    category = metadata.get("category") or ""
+    raw_tags = metadata.get("tags")
+    if isinstance(raw_tags, list):
+        tags = [str(t) for t in raw_tags if t]
+    else:
+        tags = []
+
+    license_id = metadata.get("licenseId") or ""
+    attribution = metadata.get("attribution") or ""
+
+    nested_metadata = metadata.get("metadata") or {}
+    if not isinstance(nested_metadata, dict):
+        nested_metadata = {}
+    contact_email = nested_metadata.get("contactEmail") or ""
+
+    custom_fields = nested_metadata.get("custom_fields") or {}
+    if not isinstance(custom_fields, dict):
+        custom_fields = {}
+    temporal_fields = custom_fields.get("Temporal") or {}
+    if not isinstance(temporal_fields, dict):
+        temporal_fields = {}
+    period_of_time = str(temporal_fields.get("Period of Time") or "")
+    posting_frequency = str(temporal_fields.get("Posting Frequency") or "")
+
+    # Extract column metadata (skip system columns starting with ':')
+    columns: list[SocrataColumnMetadata] = []
+    for col in metadata.get("columns", []):
+        field_name = col.get("fieldName") or ""
+        if field_name.startswith(":"):
+            continue
+        columns.append(
+            SocrataColumnMetadata(
+                fieldName=field_name,
+                name=col.get("name") or "",
+                description=col.get("description") or "",
+                dataTypeName=col.get("dataTypeName") or "",
+            )
+        )
+
+    if not columns:
+        raise HTTPException(
+            status_code=400, detail="No columns found in dataset metadata"
+        )
+
+    return SocrataImportResponse(
+        sampleRows=[],
+        totalRowCount=0,
+        fileName=f"{dataset_name}.csv",
+        datasetName=dataset_name,
+        datasetDescription=dataset_description,
+        rowLabel=row_label,
+        category=category,
+        tags=tags,
+        licenseId=license_id,
+        attribution=attribution,
+        contactEmail=contact_email,
+        periodOfTime=period_of_time,
+        postingFrequency=posting_frequency,
+        columns=columns,
+        columnStats={},
+    )
+
+
+# fieldName -> the wide aggregate query task covering that column.
+_AggregateTasks = dict[str, asyncio.Task[dict[str, dict[str, Any]]]]
+
+
+def _cancel_aggregates(aggregate_tasks: _AggregateTasks) -> None:
+    for task in set(aggregate_tasks.values()):
+        task.cancel()
+
+
+async def _fetch_rows_and_plan(
+    client: httpx.AsyncClient,
+    soda_base: str,
+    columns: list[SocrataColumnMetadata],
+    headers: dict[str, str],
+    engine: StatsEngine,
+) -> tuple[
+    int,
+    list[dict[str, Any]],
+    list[SocrataColumnMetadata],
+    _AggregateTasks,
+]:
+    """Row count + sample rows, then pick each column's stats engine.
+
+    Returns (total_rows, sample_rows, local_columns, aggregate_tasks) as soon
+    as the count and samples are in. Columns in `local_columns` are profiled
+    from one CSV pass; the rest get their scalar aggregates from a few wide
+    queries, still running in `aggregate_tasks` — the caller owns them.
+    Sample rows come back keyed by display name rather than fieldName.
+    """
+    rows = asyncio.gather(
+        _fetch_row_count(client, soda_base, headers),
+        soda_get(client, soda_base, {"$limit": "10"}, headers),
+    )
+    # Columns the local engine can never take start their wide aggregates
+    # right behind the row count (which queues first for the SODA limiter),
+    # so the SODA path keeps its latency. The rest wait for the plan, so no
+    # query is issued twice.
+    candidates = {c.fieldName for c in local_profile_candidates(engine, columns)}
+    speculative = start_column_aggregates(
+        client,
+        soda_base,
+        [c for c in columns if c.fieldName not in candidates],
+        headers,
+    )
+    try:
+        total_rows, sample_rows = await rows
+    except BaseException:
+        _cancel_aggregates(speculative)
+        raise
+    local_columns = local_profile_columns(engine, total_rows, columns)
+    local_fields = {c.fieldName for c in local_columns}
+    remaining = [
+        c
+        for c in columns
+        if c.fieldName not in local_fields and c.fieldName not in speculative
+    ]
+    aggregate_tasks = {
+        **speculative,
+        **start_column_aggregates(client, soda_base, remaining, headers),
+    }
+    return (
+        total_rows,
+        _remap_sample_rows(sample_rows, columns),
+        local_columns,
+        aggregate_tasks,
+    )
+
+
+def _column_stats_tasks(
+    client: httpx.AsyncClient,
+    soda_base: str,
+    columns: list[SocrataColumnMetadata],
+    local_columns: list[SocrataColumnMetadata],
+    total_rows: int,
+    headers: dict[str, str],
+    aggregate_tasks: _AggregateTasks,
+    quantile_method: QuantileMethod,
+) -> list[asyncio.Task[list[tuple[str, ColumnStats]]]]:
+    """One task per SODA column plus one for all locally profiled columns.
+
+    Each task yields (display_name, stats) pairs. A SODA column starts its
+    per-type queries as soon as its own wide aggregate batch lands. If local
+    profiling fails, its columns fall back to the SODA path inside the same
+    task.
+    """
+
+    async def _soda(col: SocrataColumnMetadata) -> list[tuple[str, ColumnStats]]:
+        aggregates: dict[str, Any] | None = None
+        batch = aggregate_tasks.get(col.fieldName)
+        if batch is not None:
+            try:
+                # shield(): the batch is shared with other columns.
+                aggregates = (await asyncio.shield(batch)).get(col.fieldName)
+            except Exception as exc:
+                logger.warning("Wide aggregate query failed, falling back: %s", exc)
+        return [
+            await compute_column_stats(
+                client,
+                soda_base,
+                col,
+                total_rows,
+                headers,
+                aggregates,
+                quantile_method,
+            )
+        ]
+
+    async def _local() -> list[tuple[str, ColumnStats]]:
+        try:
+            return await profile_columns(
+                client, soda_base, local_columns, total_rows, headers
+            )
+        except Exception as exc:
+            logger.warning("Local profile failed, falling back to SODA: %s", exc)
+        results = await asyncio.gather(
+            *(_soda(col) for col in local_columns), return_exceptions=True
+        )
+        pairs: list[tuple[str, ColumnStats]] = []
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning("Column stats computation failed: %s", result)
+                continue
+            pairs.extend(result)
+        return pairs
+
+    local_fields = {c.fieldName for c in local_columns}
+    tasks = [
+        asyncio.create_task(_soda(col))
+        for col in columns
+        if col.fieldName not in local_fields
+    ]
+    if local_columns:
+        tasks.append(asyncio.create_task(_local()))
+    return tasks
+
+
+def _remap_sample_rows(
+    sample_rows: list[dict[str, Any]], columns: list[SocrataColumnMetadata]
+) -> list[dict[str, Any]]:
+    """Re-key sample rows from fieldName to display name."""
+    field_to_display = {c.fieldName: (c.name or c.fieldName) for c in columns}
+    remapped_samples: list[dict[str, Any]] = []
+    for row in sample_rows:
+        remapped: dict[str, Any] = {}
+        for key, value in row.items():
+            display = field_to_display.get(key, key)
+            remapped[display] = value
+        remapped_samples.append(remapped)
+    return remapped_samples
+
+
+async def _fill_preview_rows(
+    client: httpx.AsyncClient,
+    soda_base: str,
+    response: SocrataImportResponse,
+    headers: dict[str, str],
+    version_key: str | None,
+    strict: bool = False,
+) -> None:
+    """Fetch row count and sample rows concurrently into `response`.
+
+    The row count is cached under the view's version key so per-column
+    stats requests don't each re-count the dataset. With `strict`, a
+    failed count or sample query raises (see soda_get) instead of leaving
+    an empty preview.
+    """
+    total_rows, sample_rows = await asyncio.gather(
+        _fetch_row_count(client, soda_base, headers, strict),
+        soda_get(client, soda_base, {"$limit": "10"}, headers, strict),
+    )
+    response.totalRowCount = total_rows
+    response.sampleRows = _remap_sample_rows(sample_rows, response.columns)
+    if version_key is not None:
+        _import_cache.set(_row_count_cache_key(version_key), str(total_rows))
+
+
+async def fetch_dataset_preview(
+    client: httpx.AsyncClient,
+    dataset_id: str,
+    metadata: dict[str, Any],
+    headers: dict[str, str],
+) -> SocrataImportResponse:
+    """Import-shaped dataset (metadata, samples, row count) for callers
+    outside this router, such as the eval. `metadata` comes from
+    fetch_view_metadata.
+
+    A cached full import at the default quantile method and stats engine
+    is returned as is (column stats included); otherwise this is a lazy
+    import without stats, itself cached under the view's version key. A
+    count or sample query the portal rejects raises httpx.HTTPStatusError
+    rather than yielding (and caching) a preview with no rows.
+    """
+    version_key = _version_cache_key(dataset_id, metadata)
+    cache_key = _import_cache_key(
+        dataset_id, metadata, SOCRATA_QUANTILE_METHOD, SOCRATA_STATS_ENGINE
+    )
+    if version_key is not None and cache_key is not None:
+        cached = _import_cache.get(cache_key) or _import_cache.get(
+            _preview_cache_key(version_key)
+        )
+        if cached is not None:
+            return SocrataImportResponse.model_validate_json(cached)
+    response = _import_skeleton(dataset_id, metadata)
+    soda_base = f"{SOCRATA_BASE_URL}/resource/{dataset_id}.json"
+    await _fill_preview_rows(
+        client, soda_base, response, headers, version_key, strict=True
+    )
+    if version_key is not None:
+        _import_cache.set(_preview_cache_key(version_key), response.model_dump_json())
+    return response
+
+
+@router.post("/import", response_model=SocrataImportResponse)
+async def socrata_import(
+    request: SocrataImportRequest,
+    http_request: Request,
+    client: httpx.AsyncClient = Depends(get_http_client),
+) -> SocrataImportResponse:
+    dataset_id, quantile_method, engine, headers = _import_params(request, http_request)
     soda_base = f"{SOCRATA_BASE_URL}/resource/{dataset_id}.json"
 
     try:
-        async with httpx.AsyncClient(timeout=90.0) as client:
-            # Phase 1: metadata + row count + sample rows (parallel)
-            metadata_resp, count_rows, sample_rows = await asyncio.gather(
-                client.get(metadata_url, headers=headers),
-                soda_get(client, soda_base, {"$select": "count(*) as total"}, headers),
-                soda_get(client, soda_base, {"$limit": "10"}, headers),
+        # Phase 1: metadata. Fetched on its own first — it carries the view's
+        # version stamps, so a cache hit costs this single request. It also
+        # enforces the caller's access to the dataset before any cached
+        # result is served.
+        metadata = await fetch_view_metadata(client, dataset_id, headers)
+        cache_key = _import_cache_key(dataset_id, metadata, quantile_method, engine)
+        if cache_key is not None:
+            cached = _import_cache.get(cache_key)
+            if cached is not None:
+                return SocrataImportResponse.model_validate_json(cached)
+
+        response = _import_skeleton(dataset_id, metadata)
+        columns = response.columns
+
+        if request.lazyStats:
+            # Metadata, samples and row count only; stats are fetched per
+            # column on demand.
+            await _fill_preview_rows(
+                client,
+                soda_base,
+                response,
+                headers,
+                _version_cache_key(dataset_id, metadata),
             )
+            return response
 
-            if metadata_resp.status_code != 200:
-                raise HTTPException(
-                    status_code=metadata_resp.status_code,
-                    detail=f"Failed to fetch dataset metadata: {metadata_resp.reason_phrase}",
+        # Phase 2: row count + sample rows, then the engine plan: small
+        # datasets are profiled from one CSV pass, the rest get every
+        # column's scalar aggregates packed into a few wide queries
+        total_rows, sample_rows, local_columns, aggregate_tasks = (
+            await _fetch_rows_and_plan(client, soda_base, columns, headers, engine)
+        )
+        response.totalRowCount = total_rows
+        response.sampleRows = sample_rows
+
+        # Phase 3: per-type stats (group-bys, samples, quartiles) in parallel
+        stats_tasks = _column_stats_tasks(
+            client,
+            soda_base,
+            columns,
+            local_columns,
+            total_rows,
+            headers,
+            aggregate_tasks,
+            quantile_method,
+        )
+        try:
+            stats_results = await asyncio.gather(*stats_tasks, return_exceptions=True)
+        finally:
+            for task in stats_tasks:
+                task.cancel()
+            _cancel_aggregates(aggregate_tasks)
+
+        for result in stats_results:
+            if isinstance(result, BaseException):
+                logger.warning("Column stats computation failed: %s", result)
+                continue
+            for display_name, col_stats in result:
+                response.columnStats[display_name] = col_stats
+
+        # Only cache complete results — a column that failed this time should
+        # be retried on the next import, not pinned until the data changes.
+        if cache_key is not None and len(response.columnStats) == len(columns):
+            _import_cache.set(cache_key, response.model_dump_json())
+        return response
+
+    except HTTPException:
+        raise
+    except SodaQueryError as e:
+        logger.warning("Socrata import throttled: %s", e)
+        raise HTTPException(
+            status_code=503,
+            detail=f"{SOCRATA_DOMAIN} is rate-limiting or unavailable; try again shortly.",
+        )
+    except Exception as e:
+        logger.exception("Socrata import error")
+        raise HTTPException(
+            status_code=500, detail=f"Failed to fetch from {SOCRATA_DOMAIN}: {str(e)}"
+        )
+
+
+@router.post("/import/stream")
+async def socrata_import_stream(
+    request: SocrataImportRequest,
+    http_request: Request,
+    client: httpx.AsyncClient = Depends(get_http_client),
+) -> StreamingResponse:
+    """NDJSON variant of /import that emits column stats as they finish.
+
+    Events, one JSON object per line:
+      {"type": "metadata", ...}  — every SocrataImportResponse field except
+                                   columnStats (sample rows and row count
+                                   included)
+      {"type": "column", "name": <display name>, "stats": ColumnStats}
+      {"type": "done", "columnCount", "failedColumns", "cached",
+       "elapsedSeconds"}
+      {"type": "error", "error": <message>}  — replaces "done" on failure
+
+    Metadata is fetched before the stream opens, so a missing dataset or
+    denied access still surfaces as a plain HTTP error status.
+    """
+    dataset_id, quantile_method, engine, headers = _import_params(request, http_request)
+    soda_base = f"{SOCRATA_BASE_URL}/resource/{dataset_id}.json"
+    t0 = time.time()
+
+    try:
+        metadata = await fetch_view_metadata(client, dataset_id, headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Socrata import error")
+        raise HTTPException(
+            status_code=500, detail=f"Failed to fetch from {SOCRATA_DOMAIN}: {str(e)}"
+        )
+    cache_key = _import_cache_key(dataset_id, metadata, quantile_method, engine)
+    cached = _import_cache.get(cache_key) if cache_key is not None else None
+    skeleton = (
+        SocrataImportResponse.model_validate_json(cached)
+        if cached is not None
+        else _import_skeleton(dataset_id, metadata)
+    )
+
+    async def event_stream() -> AsyncGenerator[str, None]:
+        def line(payload: dict[str, Any]) -> str:
+            return json.dumps(payload, ensure_ascii=False, default=str) + "\n"
+
+        def done(failed: int, from_cache: bool) -> str:
+            return line(
+                {
+                    "type": "done",
+                    "columnCount": len(skeleton.columns),
+                    "failedColumns": failed,
+                    "cached": from_cache,
+                    "elapsedSeconds": round(time.time() - t0, 2),
+                }
+            )
+
+        if cached is not None:
+            yield line(
+                {"type": "metadata", **skeleton.model_dump(exclude={"columnStats"})}
+            )
+            for name, stats in skeleton.columnStats.items():
+                yield line(
+                    {"type": "column", "name": name, "stats": stats.model_dump()}
+                )
+            yield done(0, True)
+            return
+
+        response = skeleton
+        tasks: list[asyncio.Task[list[tuple[str, ColumnStats]]]] = []
+        aggregate_tasks: _AggregateTasks = {}
+        try:
+            # Metadata and samples go out as soon as the count and sample
+            # queries return, while the wide aggregate batches still run;
+            # each column streams once its own batch and queries finish.
+            total_rows, sample_rows, local_columns, aggregate_tasks = (
+                await _fetch_rows_and_plan(
+                    client, soda_base, response.columns, headers, engine
                 )
+            )
+            response.totalRowCount = total_rows
+            response.sampleRows = sample_rows
+            yield line(
+                {"type": "metadata", **response.model_dump(exclude={"columnStats"})}
+            )
 
-            metadata = metadata_resp.json()
-            dataset_name = metadata.get("name") or dataset_id
-            dataset_description = metadata.get("description") or ""
-            row_label = (
-                metadata.get("metadata", {}).get("rowLabel", "")
-                or metadata.get("rowLabel", "")
-                or ""
+            tasks = _column_stats_tasks(
+                client,
+                soda_base,
+                response.columns,
+                local_columns,
+                total_rows,
+                headers,
+                aggregate_tasks,
+                quantile_method,
             )
-            category = metadata.get("category") or ""
-            raw_tags = metadata.get("tags")
-            if isinstance(raw_tags, list):
-                tags = [str(t) for t in raw_tags if t]
-            else:
-                tags = []
-
-            license_id = metadata.get("licenseId") or ""
-            attribution = metadata.get("attribution") or ""
-
-            nested_metadata = metadata.get("metadata") or {}
-            if not isinstance(nested_metadata, dict):
-                nested_metadata = {}
-            contact_email = nested_metadata.get("contactEmail") or ""
-
-            custom_fields = nested_metadata.get("custom_fields") or {}
-            if not isinstance(custom_fields, dict):
-                custom_fields = {}
-            temporal_fields = custom_fields.get("Temporal") or {}
-            if not isinstance(temporal_fields, dict):
-                temporal_fields = {}
-            period_of_time = str(temporal_fields.get("Period of Time") or "")
-            posting_frequency = str(temporal_fields.get("Posting Frequency") or "")
-
-            total_rows = int(count_rows[0]["total"]) if count_rows else 0
-
-            # Extract column metadata (skip system columns starting with ':')
-            columns: list[SocrataColumnMetadata] = []
-            for col in metadata.get("columns", []):
-                field_name = col.get("fieldName") or ""
-                if field_name.startswith(":"):
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    pairs = await next_done
+                except Exception as exc:
+                    logger.warning("Column stats computation failed: %s", exc)
                     continue
-                columns.append(
-                    SocrataColumnMetadata(
-                        fieldName=field_name,
-                        name=col.get("name") or "",
-                        description=col.get("description") or "",
-                        dataTypeName=col.get("dataTypeName") or "",
+                for display_name, col_stats in pairs:
+                    response.columnStats[display_name] = col_stats
+                    yield line(
+                        {
+                            "type": "column",
+                            "name": display_name,
+                            "stats": col_stats.model_dump(),
+                        }
                     )
-                )
 
-            if not columns:
-                raise HTTPException(
-                    status_code=400, detail="No columns found in dataset metadata"
-                )
+            failed = len(response.columns) - len(response.columnStats)
+            if cache_key is not None and failed == 0:
+                _import_cache.set(cache_key, response.model_dump_json())
+            yield done(failed, False)
+        except SodaQueryError as e:
+            logger.warning("Socrata import throttled: %s", e)
+            yield line(
+                {
+                    "type": "error",
+                    "error": f"{SOCRATA_DOMAIN} is rate-limiting or unavailable; "
+                    "try again shortly.",
+                }
+            )
+        except Exception as e:
+            logger.exception("Socrata import stream error")
+            yield line(
+                {
+                    "type": "error",
+                    "error": f"Failed to fetch from {SOCRATA_DOMAIN}: {e}",
+                }
+            )
+        finally:
+            # Client went away (or we failed) — don't leave stats queries
+            # running against the portal for nobody.
+            for task in tasks:
+                task.cancel()
+            _cancel_aggregates(aggregate_tasks)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@router.get("/{dataset_id}/columns/{field_name}/stats", response_model=ColumnStats)
+async def socrata_column_stats(
+    dataset_id: str,
+    field_name: str,
+    http_request: Request,
+    quantileMethod: QuantileMethod | None = None,
+    client: httpx.AsyncClient = Depends(get_http_client),
+) -> ColumnStats:
+    """Stats for a single column, computed on first request.
+
+    Pairs with a `lazyStats` import. Served from a cached full import when
+    one exists, else from (and into) a per-column entry in the same cache,
+    so it is invalidated by the same view version stamps.
+    """
+    dataset_id = dataset_id.strip()
+    if not dataset_id:
+        raise HTTPException(status_code=400, detail="Dataset ID is required")
+    quantile_method = quantileMethod or SOCRATA_QUANTILE_METHOD
+    headers = build_socrata_auth(read_session(http_request))
+    soda_base = f"{SOCRATA_BASE_URL}/resource/{dataset_id}.json"
 
-            # Phase 2+3: compute stats for all columns in parallel
-            stats_tasks = [
-                compute_column_stats(client, soda_base, col, total_rows, headers)
-                for col in columns
-            ]
-            stats_results = await asyncio.gather(*stats_tasks, return_exceptions=True)
+    try:
+        metadata = await fetch_view_metadata(client, dataset_id, headers)
+        columns = _import_skeleton(dataset_id, metadata).columns
+        col = next((c for c in columns if c.fieldName == field_name), None)
+        if col is None:
+            raise HTTPException(
+                status_code=404, detail=f"Column '{field_name}' not found"
+            )
 
-            column_stats: dict[str, ColumnStats] = {}
-            for result in stats_results:
-                if isinstance(result, BaseException):
-                    logger.warning("Column stats computation failed: %s", result)
-                    continue
-                display_name, col_stats = result
-                column_stats[display_name] = col_stats
-
-            # Remap sample row keys from fieldName to displayName
-            field_to_display = {c.fieldName: (c.name or c.fieldName) for c in columns}
-            remapped_samples: list[dict[str, Any]] = []
-            for row in sample_rows:
-                remapped: dict[str, Any] = {}
-                for key, value in row.items():
-                    display = field_to_display.get(key, key)
-                    remapped[display] = value
-                remapped_samples.append(remapped)
-
-            return SocrataImportResponse(
-                sampleRows=remapped_samples,
-                totalRowCount=total_rows,
-                fileName=f"{dataset_name}.csv",
-                datasetName=dataset_name,
-                datasetDescription=dataset_description,
-                rowLabel=row_label,
-                category=category,
-                tags=tags,
-                licenseId=license_id,
-                attribution=attribution,
-                contactEmail=contact_email,
-                periodOfTime=period_of_time,
-                postingFrequency=posting_frequency,
-                columns=columns,
-                columnStats=column_stats,
+        # Computed with SODA queries, so only SODA-engine results are reused.
+        version_key = _version_cache_key(dataset_id, metadata)
+        cache_key = _import_cache_key(dataset_id, metadata, quantile_method, "soda")
+        total_rows: int | None = None
+        if version_key is not None and cache_key is not None:
+            full = _import_cache.get(cache_key)
+            if full is not None:
+                cached_stats = SocrataImportResponse.model_validate_json(
+                    full
+                ).columnStats.get(col.name or col.fieldName)
+                if cached_stats is not None:
+                    return cached_stats
+            cached = _import_cache.get(_column_cache_key(cache_key, field_name))
+            if cached is not None:
+                return ColumnStats.model_validate_json(cached)
+            cached_rows = _import_cache.get(_row_count_cache_key(version_key))
+            if cached_rows is not None:
+                total_rows = int(cached_rows)
+
+        if total_rows is None:
+            total_rows = await _fetch_row_count(client, soda_base, headers)
+        _, col_stats = await compute_column_stats(
+            client, soda_base, col, total_rows, headers, None, quantile_method
+        )
+        if cache_key is not None:
+            _import_cache.set(
+                _column_cache_key(cache_key, field_name), col_stats.model_dump_json()
             )
+        return col_stats
 
     except HTTPException:
         raise
+    except SodaQueryError as e:
+        logger.warning("Socrata column stats throttled: %s", e)
+        raise HTTPException(
+            status_code=503,
+            detail=f"{SOCRATA_DOMAIN} is rate-limiting or unavailable; try again shortly.",
+        )
     except Exception as e:
-        logger.exception("Socrata import error")
+        logger.exception("Socrata column stats error")
         raise HTTPException(
             status_code=500, detail=f"Failed to fetch from {SOCRATA_DOMAIN}: {str(e)}"
         )
@@ -188,7 +979,9 @@ async def socrata_import(
     dependencies=[Depends(require_xhr_header)],
 )
 async def socrata_export(
-    request: SocrataExportRequest, http_request: Request
+    request: SocrataExportRequest,
+    http_request: Request,
+    client: httpx.AsyncClient = Depends(get_http_client),
 ) -> SocrataExportResponse:
     if not request.datasetId or not request.datasetId.strip():
         raise HTTPException(status_code=400, detail="Dataset ID is required")
@@ -210,193 +1003,191 @@ async def socrata_export(
     metadata_url = f"{SOCRATA_BASE_URL}/api/views/{dataset_id}.json"
 
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            # 1. Fetch current metadata to get column IDs
-            meta_resp = await client.get(metadata_url, headers=headers)
-            if meta_resp.status_code != 200:
-                raise HTTPException(
-                    status_code=meta_resp.status_code,
-                    detail=f"Failed to fetch current metadata: {meta_resp.reason_phrase}",
-                )
-            current_metadata = meta_resp.json()
-
-            # 2. Build update payload — merge into existing metadata to avoid overwriting
-            update_payload: dict[str, Any] = {}
-            existing_metadata: dict[str, Any] = current_metadata.get("metadata", {})
-
-            if request.datasetTitle is not None:
-                update_payload["name"] = request.datasetTitle
-
-            if request.datasetDescription is not None:
-                update_payload["description"] = request.datasetDescription
-
-            if request.category is not None:
-                update_payload["category"] = request.category
-
-            if request.tags is not None:
-                # Append the AI-Metadata-Tool tag for auditability if any metadata is changed
-                tags = list(request.tags)
-                if "AI-Metadata-Tool" not in tags:
-                    tags.append("AI-Metadata-Tool")
-                update_payload["tags"] = tags
-            elif (
-                any(
-                    v is not None
-                    for v in (
-                        request.datasetTitle,
-                        request.datasetDescription,
-                        request.category,
-                        request.rowLabel,
-                        request.licenseId,
-                        request.attribution,
-                        request.contactEmail,
-                        request.periodOfTime,
-                        request.postingFrequency,
-                    )
+        # 1. Fetch current metadata to get column IDs
+        meta_resp = await client.get(metadata_url, headers=headers, timeout=60.0)
+        if meta_resp.status_code != 200:
+            raise HTTPException(
+                status_code=meta_resp.status_code,
+                detail=f"Failed to fetch current metadata: {meta_resp.reason_phrase}",
+            )
+        current_metadata = meta_resp.json()
+
+        # 2. Build update payload — merge into existing metadata to avoid overwriting
+        update_payload: dict[str, Any] = {}
+        existing_metadata: dict[str, Any] = current_metadata.get("metadata", {})
+
+        if request.datasetTitle is not None:
+            update_payload["name"] = request.datasetTitle
+
+        if request.datasetDescription is not None:
+            update_payload["description"] = request.datasetDescription
+
+        if request.category is not None:
+            update_payload["category"] = request.category
+
+        if request.tags is not None:
+            # Append the AI-Metadata-Tool tag for auditability if any metadata is changed
+            tags = list(request.tags)
+            if "AI-Metadata-Tool" not in tags:
+                tags.append("AI-Metadata-Tool")
+            update_payload["tags"] = tags
+        elif (
+            any(
+                v is not None
+                for v in (
+                    request.datasetTitle,
+                    request.datasetDescription,
+                    request.category,
+                    request.rowLabel,
+                    request.licenseId,
+                    request.attribution,
+                    request.contactEmail,
+                    request.periodOfTime,
+                    request.postingFrequency,
                 )
-                or request.columns
+            )
+            or request.columns
+        ):
+            # If tags weren't provided in the request but other things were,
+            # try to preserve existing tags and add our tool tag.
+            existing_tags = current_metadata.get("tags") or []
+            if (
+                isinstance(existing_tags, list)
+                and "AI-Metadata-Tool" not in existing_tags
             ):
-                # If tags weren't provided in the request but other things were,
-                # try to preserve existing tags and add our tool tag.
-                existing_tags = current_metadata.get("tags") or []
-                if (
-                    isinstance(existing_tags, list)
-                    and "AI-Metadata-Tool" not in existing_tags
-                ):
-                    update_payload["tags"] = existing_tags + ["AI-Metadata-Tool"]
-
-            if request.licenseId is not None:
-                update_payload["licenseId"] = request.licenseId
-
-            if request.attribution is not None:
-                update_payload["attribution"] = request.attribution
-
-            metadata_changed = False
-
-            if request.rowLabel is not None:
-                existing_metadata["rowLabel"] = request.rowLabel
-                metadata_changed = True
-
-            if request.contactEmail is not None:
-                existing_metadata["contactEmail"] = request.contactEmail
-                metadata_changed = True
-
-            if request.periodOfTime is not None or request.postingFrequency is not None:
-                existing_custom = existing_metadata.get("custom_fields") or {}
-                if not isinstance(existing_custom, dict):
-                    existing_custom = {}
-                existing_temporal = existing_custom.get("Temporal") or {}
-                if not isinstance(existing_temporal, dict):
-                    existing_temporal = {}
-                if request.periodOfTime is not None:
-                    existing_temporal["Period of Time"] = request.periodOfTime
-                if request.postingFrequency is not None:
-                    existing_temporal["Posting Frequency"] = request.postingFrequency
-                existing_custom["Temporal"] = existing_temporal
-                existing_metadata["custom_fields"] = existing_custom
-                metadata_changed = True
-
-            if metadata_changed:
-                update_payload["metadata"] = existing_metadata
-
-            # Merge column metadata updates into existing columns
-            updated_col_count = 0
-            renamed_field_count = 0
-            renamed_display_count = 0
-            if request.columns:
-                update_map = {c.fieldName: c for c in request.columns}
-                updated_columns = []
-                for col in current_metadata.get("columns", []):
-                    field_name = col.get("fieldName", "")
-                    if field_name in update_map:
-                        update = update_map[field_name]
-                        col_changed = False
-                        if update.description is not None:
-                            col["description"] = update.description
-                            col_changed = True
-                        if update.name is not None and update.name != col.get("name"):
-                            col["name"] = update.name
-                            renamed_display_count += 1
-                            col_changed = True
-                        if (
-                            update.newFieldName is not None
-                            and update.newFieldName != field_name
-                        ):
-                            col["fieldName"] = update.newFieldName
-                            renamed_field_count += 1
-                            col_changed = True
-                        if col_changed:
-                            updated_col_count += 1
-                    updated_columns.append(col)
-                update_payload["columns"] = updated_columns
-
-            if not update_payload:
-                return SocrataExportResponse(
-                    success=True,
-                    message="No changes to push.",
-                    updatedColumns=0,
-                )
+                update_payload["tags"] = existing_tags + ["AI-Metadata-Tool"]
 
-            # 3. PUT updated metadata back to Socrata
-            put_resp = await client.put(
-                metadata_url,
-                headers=headers,
-                json=update_payload,
-            )
+        if request.licenseId is not None:
+            update_payload["licenseId"] = request.licenseId
 
-            if put_resp.status_code not in (200, 202):
-                error_detail = (
-                    put_resp.text[:500] if put_resp.text else put_resp.reason_phrase
-                )
-                raise HTTPException(
-                    status_code=put_resp.status_code,
-                    detail=f"Failed to update metadata on {SOCRATA_DOMAIN}: {error_detail}",
-                )
+        if request.attribution is not None:
+            update_payload["attribution"] = request.attribution
 
-            parts = []
-            if request.datasetTitle is not None:
-                parts.append("dataset title")
-            if request.datasetDescription is not None:
-                parts.append("dataset description")
-            if request.rowLabel is not None:
-                parts.append("row label")
-            if request.category is not None:
-                parts.append("category")
-            if request.tags is not None:
-                final_tag_count = len(update_payload.get("tags", []))
-                parts.append(
-                    f"{final_tag_count} tag{'s' if final_tag_count != 1 else ''}"
-                )
-            if request.licenseId is not None:
-                parts.append("license")
-            if request.attribution is not None:
-                parts.append("attribution")
-            if request.contactEmail is not None:
-                parts.append("contact email")
+        metadata_changed = False
+
+        if request.rowLabel is not None:
+            existing_metadata["rowLabel"] = request.rowLabel
+            metadata_changed = True
+
+        if request.contactEmail is not None:
+            existing_metadata["contactEmail"] = request.contactEmail
+            metadata_changed = True
+
+        if request.periodOfTime is not None or request.postingFrequency is not None:
+            existing_custom = existing_metadata.get("custom_fields") or {}
+            if not isinstance(existing_custom, dict):
+                existing_custom = {}
+            existing_temporal = existing_custom.get("Temporal") or {}
+            if not isinstance(existing_temporal, dict):
+                existing_temporal = {}
             if request.periodOfTime is not None:
-                parts.append("period of time")
+                existing_temporal["Period of Time"] = request.periodOfTime
             if request.postingFrequency is not None:
-                parts.append("posting frequency")
-            if updated_col_count > 0:
-                parts.append(
-                    f"{updated_col_count} column{'s' if updated_col_count != 1 else ''}"
-                )
-            if renamed_display_count > 0:
-                parts.append(
-                    f"{renamed_display_count} display name{'s' if renamed_display_count != 1 else ''} renamed"
-                )
-            if renamed_field_count > 0:
-                parts.append(
-                    f"{renamed_field_count} API field name{'s' if renamed_field_count != 1 else ''} renamed"
-                )
-            message = f"Successfully updated {' and '.join(parts)} on {SOCRATA_DOMAIN}."
-
+                existing_temporal["Posting Frequency"] = request.postingFrequency
+            existing_custom["Temporal"] = existing_temporal
+            existing_metadata["custom_fields"] = existing_custom
+            metadata_changed = True
+
+        if metadata_changed:
+            update_payload["metadata"] = existing_metadata
+
+        # Merge column metadata updates into existing columns
+        updated_col_count = 0
+        renamed_field_count = 0
+        renamed_display_count = 0
+        if request.columns:
+            update_map = {c.fieldName: c for c in request.columns}
+            updated_columns = []
+            for col in current_metadata.get("columns", []):
+                field_name = col.get("fieldName", "")
+                if field_name in update_map:
+                    update = update_map[field_name]
+                    col_changed = False
+                    if update.description is not None:
+                        col["description"] = update.description
+                        col_changed = True
+                    if update.name is not None and update.name != col.get("name"):
+                        col["name"] = update.name
+                        renamed_display_count += 1
+                        col_changed = True
+                    if (
+                        update.newFieldName is not None
+                        and update.newFieldName != field_name
+                    ):
+                        col["fieldName"] = update.newFieldName
+                        renamed_field_count += 1
+                        col_changed = True
+                    if col_changed:
+                        updated_col_count += 1
+                updated_columns.append(col)
+            update_payload["columns"] = updated_columns
+
+        if not update_payload:
             return SocrataExportResponse(
                 success=True,
-                message=message,
-                updatedColumns=updated_col_count,
+                message="No changes to push.",
+                updatedColumns=0,
+            )
+
+        # 3. PUT updated metadata back to Socrata
+        put_resp = await client.put(
+            metadata_url,
+            headers=headers,
+            json=update_payload,
+            timeout=60.0,
+        )
+
+        if put_resp.status_code not in (200, 202):
+            error_detail = (
+                put_resp.text[:500] if put_resp.text else put_resp.reason_phrase
+            )
+            raise HTTPException(
+                status_code=put_resp.status_code,
+                detail=f"Failed to update metadata on {SOCRATA_DOMAIN}: {error_detail}",
             )
 
+        parts = []
+        if request.datasetTitle is not None:
+            parts.append("dataset title")
+        if request.datasetDescription is not None:
+            parts.append("dataset description")
+        if request.rowLabel is not None:
+            parts.append("row label")
+        if request.category is not None:
+            parts.append("category")
+        if request.tags is not None:
+            final_tag_count = len(update_payload.get("tags", []))
+            parts.append(f"{final_tag_count} tag{'s' if final_tag_count != 1 else ''}")
+        if request.licenseId is not None:
+            parts.append("license")
+        if request.attribution is not None:
+            parts.append("attribution")
+        if request.contactEmail is not None:
+            parts.append("contact email")
+        if request.periodOfTime is not None:
+            parts.append("period of time")
+        if request.postingFrequency is not None:
+            parts.append("posting frequency")
+        if updated_col_count > 0:
+            parts.append(
+                f"{updated_col_count} column{'s' if updated_col_count != 1 else ''}"
+            )
+        if renamed_display_count > 0:
+            parts.append(
+                f"{renamed_display_count} display name{'s' if renamed_display_count != 1 else ''} renamed"
+            )
+        if renamed_field_count > 0:
+            parts.append(
+                f"{renamed_field_count} API field name{'s' if renamed_field_count != 1 else ''} renamed"
+            )
+        message = f"Successfully updated {' and '.join(parts)} on {SOCRATA_DOMAIN}."
+
+        return SocrataExportResponse(
+            success=True,
+            message=message,
+            updatedColumns=updated_col_count,
+        )
+
     except HTTPException:
         raise
     except Exception as e:
@@ -407,13 +1198,12 @@ async def socrata_export(
         )
 
 
-async def _fetch_socrata_categories() -> list[str]:
+async def _fetch_socrata_categories(client: httpx.AsyncClient) -> list[str]:
     """Fetch the live domain category list from Socrata's public catalog API."""
     url = "https://api.us.socrata.com/api/catalog/v1/domain_categories"
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.get(url, params={"domains": SOCRATA_DOMAIN})
-        resp.raise_for_status()
-        data = resp.json()
+    resp = await client.get(url, params={"domains": SOCRATA_DOMAIN}, timeout=10.0)
+    resp.raise_for_status()
+    data = resp.json()
 
     results = data.get("results") or []
     seen: set[str] = set()
@@ -431,13 +1221,14 @@ async def _fetch_socrata_categories() -> list[str]:
     return categories
 
 
-async def _fetch_socrata_licenses() -> list[SocrataLicenseInfo]:
+async def _fetch_socrata_licenses(
+    client: httpx.AsyncClient,
+) -> list[SocrataLicenseInfo]:
     """Fetch the live license list from the configured Socrata portal."""
     url = f"{SOCRATA_BASE_URL}/api/licenses.json"
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        data = resp.json()
+    resp = await client.get(url, timeout=10.0)
+    resp.raise_for_status()
+    data = resp.json()
 
     licenses: list[SocrataLicenseInfo] = []
     seen: set[str] = set()
@@ -462,61 +1253,47 @@ async def _fetch_socrata_licenses() -> list[SocrataLicenseInfo]:
 
 
 @router.get("/licenses", response_model=SocrataLicensesResponse)
-async def socrata_licenses() -> SocrataLicensesResponse:
-    """Return the live list of portal licenses, cached for 24 hours."""
-    now = time.time()
-    cached = _licenses_cache["value"]
-    fetched_at = _licenses_cache["fetched_at"]
-
-    if cached is not None and (now - fetched_at) < _LICENSES_TTL_SECONDS:
-        return SocrataLicensesResponse(licenses=cached)
-
+async def socrata_licenses(
+    client: httpx.AsyncClient = Depends(get_http_client),
+) -> SocrataLicensesResponse:
+    """Return the live list of portal licenses, refreshed every 24 hours."""
     try:
-        licenses = await _fetch_socrata_licenses()
+        licenses = await _licenses_cache.get(
+            "", lambda: _fetch_socrata_licenses(client)
+        )
     except Exception as e:
         logger.warning("Failed to fetch Socrata licenses: %s", e)
-        if cached is not None:
-            return SocrataLicensesResponse(licenses=cached)
         raise HTTPException(
             status_code=503,
             detail=f"Could not reach {SOCRATA_DOMAIN} to load licenses.",
         )
-
-    _licenses_cache["value"] = licenses
-    _licenses_cache["fetched_at"] = now
     return SocrataLicensesResponse(licenses=licenses)
 
 
 @router.get("/categories", response_model=SocrataCategoriesResponse)
-async def socrata_categories() -> SocrataCategoriesResponse:
-    """Return the live list of portal categories, cached for 24 hours."""
-    now = time.time()
-    cached = _categories_cache["value"]
-    fetched_at = _categories_cache["fetched_at"]
-
-    if cached is not None and (now - fetched_at) < _CATEGORIES_TTL_SECONDS:
-        return SocrataCategoriesResponse(categories=cached)
-
+async def socrata_categories(
+    client: httpx.AsyncClient = Depends(get_http_client),
+) -> SocrataCategoriesResponse:
+    """Return the live list of portal categories, refreshed every 24 hours."""
     try:
-        categories = await _fetch_socrata_categories()
+        categories = await _categories_cache.get(
+            "", lambda: _fetch_socrata_categories(client)
+        )
     except Exception as e:
         logger.warning("Failed to fetch Socrata categories: %s", e)
-        if cached is not None:
-            return SocrataCategoriesResponse(categories=cached)
         raise HTTPException(
             status_code=503,
             detail="Could not reach Socrata catalog API to load categories.",
         )
-
-    _categories_cache["value"] = categories
-    _categories_cache["fetched_at"] = now
     return SocrataCategoriesResponse(categories=categories)
 
 
-async def _fetch_socrata_tags(category: str = "") -> list[str]:
+async def _fetch_socrata_tags(
+    client: httpx.AsyncClient, category: str = ""
+) -> TagIndex:
     """Fetch the live tag list from Socrata's catalog, optionally scoped to a category.
 
-    Returns tags sorted by descending usage count, capped at _TAGS_MAX_RETURN.
+    Returns every tag with its usage count, indexed for ranked search.
     """
     url = "https://api.us.socrata.com/api/catalog/v1/domain_tags"
     # Socrata's catalog API defaults to a 100-row page; request the full set so the
@@ -524,10 +1301,9 @@ async def _fetch_socrata_tags(category: str = "") -> list[str]:
     params: dict[str, str] = {"domains": SOCRATA_DOMAIN, "limit": "10000"}
     if category:
         params["categories"] = category
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.get(url, params=params)
-        resp.raise_for_status()
-        data = resp.json()
+    resp = await client.get(url, params=params, timeout=10.0)
+    resp.raise_for_status()
+    data = resp.json()
 
     results = data.get("results") or []
     pairs: list[tuple[str, int]] = []
@@ -545,32 +1321,46 @@ async def _fetch_socrata_tags(category: str = "") -> list[str]:
         except (TypeError, ValueError):
             count = 0
         pairs.append((name, count))
-    pairs.sort(key=lambda p: (-p[1], p[0]))
-    return [name for name, _ in pairs[:_TAGS_MAX_RETURN]]
+    return TagIndex(pairs)
 
 
 @router.get("/tags", response_model=SocrataTagsResponse)
-async def socrata_tags(category: str = "") -> SocrataTagsResponse:
+async def socrata_tags(
+    category: str = "",
+    client: httpx.AsyncClient = Depends(get_http_client),
+) -> SocrataTagsResponse:
     """Return the live list of portal tags, optionally scoped to a category.
 
-    Cached for 24 hours per category.
+    Refreshed every 24 hours per category.
     """
-    key = category.strip()
-    now = time.time()
-    entry = _tags_cache.get(key)
-    if entry and (now - entry["fetched_at"]) < _TAGS_TTL_SECONDS:
-        return SocrataTagsResponse(tags=entry["value"])
+    index = await _load_tag_index(client, category)
+    return SocrataTagsResponse(tags=index.top(_TAGS_MAX_RETURN))
+
 
+@router.get("/tags/search", response_model=SocrataTagsResponse)
+async def socrata_tags_search(
+    q: str = "",
+    category: str = "",
+    limit: int = 20,
+    client: httpx.AsyncClient = Depends(get_http_client),
+) -> SocrataTagsResponse:
+    """Top `limit` tags matching `q` for autocomplete.
+
+    Prefix matches come first, then substring matches, each ranked by usage
+    count. Searches the full tag list, not just the top _TAGS_MAX_RETURN.
+    """
+    limit = max(1, min(limit, _TAG_SEARCH_MAX_LIMIT))
+    index = await _load_tag_index(client, category)
+    return SocrataTagsResponse(tags=index.search(q, limit))
+
+
+async def _load_tag_index(client: httpx.AsyncClient, category: str) -> TagIndex:
+    key = category.strip()
     try:
-        tags = await _fetch_socrata_tags(key)
+        return await _tags_cache.get(key, lambda: _fetch_socrata_tags(client, key))
     except Exception as e:
         logger.warning("Failed to fetch Socrata tags (category=%r): %s", key, e)
-        if entry is not None:
-            return SocrataTagsResponse(tags=entry["value"])
         raise HTTPException(
             status_code=503,
             detail="Could not reach Socrata catalog API to load tags.",
         )
-
-    _tags_cache[key] = {"value": tags, "fetched_at": now}
-    return SocrataTagsResponse(tags=tags)
@@ -0,0 +1,414 @@
+import csv
+import hashlib
+import heapq
+import logging
+import random
+from collections import deque
+from collections.abc import AsyncIterator, Iterator
+from typing import Any, Literal
+from urllib.parse import quote
+
+import httpx
+
+from .config import LOCAL_PROFILE_MAX_CELLS
+from .models import ColumnStats, SocrataColumnMetadata
+from .socrata_soda import (
+    CATEGORICAL_BOUNDED_LIMIT,
+    CATEGORICAL_SOCRATA_TYPES,
+    GEOSPATIAL_SOCRATA_TYPES,
+    NUMERIC_SOCRATA_TYPES,
+    OPAQUE_SOCRATA_TYPES,
+    PHONE_SOCRATA_TYPE,
+    SAMPLED_TEXT_SOCRATA_TYPES,
+    SODA_MAX_SELECT_URL_CHARS,
+    TEMPORAL_SOCRATA_TYPES,
+    TEXT_GROUPBY_LIMIT,
+    URL_SOCRATA_TYPE,
+    classify_bounded_categorical,
+    classify_from_groupby,
+    truncate_sample,
+    soda_escape,
+    soda_limiter,
+)
+
+logger = logging.getLogger(__name__)
+
+# "soda" computes every column with server-side aggregate queries
+# (socrata_soda.compute_column_stats); "local" streams the dataset's CSV
+# export once and profiles every column in a single pass; "auto" picks local
+# for datasets up to LOCAL_PROFILE_MAX_CELLS (rows x profiled columns).
+StatsEngine = Literal["auto", "soda", "local"]
+
+# Numeric quartiles come from a uniform reservoir sample of this many values:
+# exact (same rank convention as socrata_soda._exact_quartiles) while the
+# column has at most this many non-null values, sampled beyond.
+QUANTILE_RESERVOIR_SIZE = 20_000
+# Per-column value counters keep at most 2x this many distinct values; past
+# that the rarest are dropped. Heavy hitters survive, which is all the top-N
+# group-by emulation needs (TEXT_GROUPBY_LIMIT + 1 values at most).
+TOP_VALUES_CAPACITY = 512
+# KMV sketch size for count(distinct): exact below this many distinct
+# values, roughly 1/sqrt(k) (~3%) relative error above.
+DISTINCT_SKETCH_SIZE = 1024
+# Matches the `$limit 5` sample query of the SODA path.
+SAMPLE_VALUES = 5
+
+# url / phone export to CSV as flattened strings rather than their
+# url/description and number/type subfields, so those stay on the SODA path.
+_SODA_ONLY_TYPES = {URL_SOCRATA_TYPE, PHONE_SOCRATA_TYPE}
+# A CSV record still open after this many characters means an unbalanced
+# quote: profiling fails (and falls back to SODA) instead of buffering the
+# rest of the export as one record.
+_CSV_MAX_RECORD_CHARS = 8 * 1024 * 1024
+
+
+def local_profile_candidates(
+    engine: StatsEngine, columns: list[SocrataColumnMetadata]
+) -> list[SocrataColumnMetadata]:
+    """Columns `engine` may profile locally, before the dataset's size is
+    known; every other column always goes through SODA."""
+    if engine == "soda":
+        return []
+    return [c for c in columns if c.dataTypeName.lower() not in _SODA_ONLY_TYPES]
+
+
+def _csv_select(columns: list[SocrataColumnMetadata]) -> str:
+    return ", ".join(soda_escape(c.fieldName) for c in columns)
+
+
+def local_profile_columns(
+    engine: StatsEngine, total_rows: int, columns: list[SocrataColumnMetadata]
+) -> list[SocrataColumnMetadata]:
+    """Columns to profile locally under `engine`; the rest go through SODA."""
+    if total_rows <= 0:
+        return []
+    eligible = local_profile_candidates(engine, columns)
+    if engine == "auto" and total_rows * len(eligible) > LOCAL_PROFILE_MAX_CELLS:
+        return []
+    # The CSV export names every profiled column in one `$select`; on very
+    # wide views that URL would outgrow what portals accept, so those stay
+    # on the (batched) SODA path.
+    if len(quote(_csv_select(eligible), safe="")) > SODA_MAX_SELECT_URL_CHARS:
+        logger.info(
+            "CSV export $select for %d columns is too long; using SODA",
+            len(eligible),
+        )
+        return []
+    return eligible
+
+
+class _TopValues:
+    """Value -> count map bounded to 2x `capacity` distinct values.
+
+    When full, it is pruned back to the `capacity` most frequent values.
+    Exact for columns that never overflow it.
+    """
+
+    def __init__(self, capacity: int = TOP_VALUES_CAPACITY) -> None:
+        self._capacity = capacity
+        self._counts: dict[str, int] = {}
+
+    def add(self, value: str) -> None:
+        counts = self._counts
+        if value in counts:
+            counts[value] += 1
+            return
+        if len(counts) >= 2 * self._capacity:
+            self._counts = counts = dict(self.most_common(self._capacity))
+        counts[value] = 1
+
+    def most_common(self, n: int) -> list[tuple[str, int]]:
+        return heapq.nlargest(n, self._counts.items(), key=lambda kv: kv[1])
+
+
+class _DistinctSketch:
+    """K-minimum-values estimate of count(distinct …)."""
+
+    def __init__(self, k: int = DISTINCT_SKETCH_SIZE) -> None:
+        self._k = k
+        # Max-heap (negated) of the k smallest 64-bit hashes seen so far.
+        self._heap: list[int] = []
+        self._members: set[int] = set()
+
+    def add(self, value: str) -> None:
+        h = int.from_bytes(
+            hashlib.blake2b(value.encode(), digest_size=8).digest(), "big"
+        )
+        if h in self._members:
+            return
+        if len(self._heap) < self._k:
+            heapq.heappush(self._heap, -h)
+            self._members.add(h)
+        elif h < -self._heap[0]:
+            evicted = -heapq.heapreplace(self._heap, -h)
+            self._members.discard(evicted)
+            self._members.add(h)
+
+    def estimate(self) -> int:
+        if len(self._heap) < self._k:
+            return len(self._heap)
+        return int((self._k - 1) * 2**64 / -self._heap[0])
+
+
+class _ColumnProfile:
+    """Single-pass accumulator for one column; `finish` builds its stats
+    with the same rules (and shapes) as the matching SODA builder."""
+
+    def __init__(self, col: SocrataColumnMetadata) -> None:
+        self.field = col.fieldName
+        self.data_type = col.dataTypeName.lower()
+        self.count = 0
+        self.minimum: Any = None
+        self.maximum: Any = None
+        self.total = 0.0
+        self.reservoir: list[float] = []
+        self.samples: list[str] = []
+        self.top: _TopValues | None = None
+        self.distinct: _DistinctSketch | None = None
+        self._rng = random.Random(0)
+        if self.data_type in NUMERIC_SOCRATA_TYPES:
+            self.kind = "numeric"
+        elif self.data_type in TEMPORAL_SOCRATA_TYPES:
+            self.kind = "temporal"
+        elif self.data_type in GEOSPATIAL_SOCRATA_TYPES:
+            self.kind = "geospatial"
+        elif self.data_type in OPAQUE_SOCRATA_TYPES:
+            self.kind = "opaque"
+        elif self.data_type in SAMPLED_TEXT_SOCRATA_TYPES:
+            self.kind = "sampled_text"
+            self.distinct = _DistinctSketch()
+        elif self.data_type in CATEGORICAL_SOCRATA_TYPES:
+            self.kind = "categorical"
+            self.top = _TopValues()
+        else:
+            self.kind = "text"
+            self.top = _TopValues()
+
+    def add(self, value: str) -> None:
+        """Feed one non-empty cell."""
+        if self.kind == "numeric":
+            try:
+                number = float(value)
+            except ValueError:
+                return
+            self.count += 1
+            self.total += number
+            if self.minimum is None or number < self.minimum:
+                self.minimum = number
+            if self.maximum is None or number > self.maximum:
+                self.maximum = number
+            # Algorithm R: every value ends up in the reservoir with equal
+            # probability, so its quantiles estimate the column's.
+            if len(self.reservoir) < QUANTILE_RESERVOIR_SIZE:
+                self.reservoir.append(number)
+            else:
+                slot = self._rng.randrange(self.count)
+                if slot < QUANTILE_RESERVOIR_SIZE:
+                    self.reservoir[slot] = number
+            return
+
+        self.count += 1
+        if self.kind == "temporal":
+            # ISO-8601 timestamps order lexicographically.
+            if self.minimum is None or value < self.minimum:
+                self.minimum = value
+            if self.maximum is None or value > self.maximum:
+                self.maximum = value
+        elif self.kind == "sampled_text":
+            if self.distinct is not None:
+                self.distinct.add(value)
+            if len(self.samples) < SAMPLE_VALUES:
+                self.samples.append(truncate_sample(value))
+        elif self.top is not None:
+            self.top.add(value)
+
+    def finish(self, total_rows: int) -> ColumnStats:
+        if self.count == 0:
+            return ColumnStats(
+                type="empty", stats={}, nullCount=total_rows, totalCount=total_rows
+            )
+        null_count = total_rows - self.count
+
+        if self.kind == "numeric":
+            ordered = sorted(self.reservoir)
+            n = len(ordered)
+
+            def rank(p: float) -> float:
+                return ordered[max(0, int(n * p) - 1)]
+
+            return ColumnStats(
+                type="numeric",
+                stats={
+                    "count": self.count,
+                    "min": self.minimum,
+                    "max": self.maximum,
+                    "mean": self.total / self.count,
+                    "q1": rank(0.25),
+                    "median": rank(0.5),
+                    "q3": rank(0.75),
+                },
+                nullCount=null_count,
+                totalCount=total_rows,
+            )
+        if self.kind == "temporal":
+            return ColumnStats(
+                type="temporal",
+                stats={
+                    "count": self.count,
+                    "min": str(self.minimum),
+                    "max": str(self.maximum),
+                },
+                nullCount=null_count,
+                totalCount=total_rows,
+            )
+        if self.kind == "geospatial":
+            return ColumnStats(
+                type="geospatial",
+                stats={"count": self.count, "geometryType": self.data_type},
+                nullCount=null_count,
+                totalCount=total_rows,
+            )
+        if self.kind == "opaque":
+            return ColumnStats(
+                type="opaque",
+                stats={"count": self.count},
+                nullCount=null_count,
+                totalCount=total_rows,
+            )
+        if self.kind == "sampled_text":
+            unique_count = self.distinct.estimate() if self.distinct else self.count
+            return ColumnStats(
+                type="text",
+                stats={
+                    "count": self.count,
+                    "uniqueCount": max(1, min(unique_count, self.count)),
+                    "samples": self.samples,
+                },
+                nullCount=null_count,
+                totalCount=total_rows,
+            )
+
+        # Emulate the SODA group-by (`count(*)` per value, count desc, limit N).
+        limit = (
+            CATEGORICAL_BOUNDED_LIMIT
+            if self.kind == "categorical"
+            else TEXT_GROUPBY_LIMIT
+        )
+        top = self.top.most_common(limit + 1) if self.top is not None else []
+        groups = [{self.field: value, "cnt": n} for value, n in top]
+        if self.kind == "categorical":
+            return classify_bounded_categorical(
+                groups, self.field, total_rows, self.count
+            )
+        return classify_from_groupby(
+            groups, self.field, total_rows, TEXT_GROUPBY_LIMIT, self.count
+        )
+
+
+async def _iter_csv_records(resp: httpx.Response) -> AsyncIterator[list[str]]:
+    """Yield parsed CSV records from a streamed response.
+
+    One strict csv.reader parses the whole stream from lines that keep
+    their endings, so quoted cells round-trip exactly (`\r\n` included)
+    and malformed CSV raises csv.Error. The reader can't wait on the
+    network, so it only runs once the buffer holds a complete record: a
+    line ends one when the quotes seen since the last record are balanced
+    (escaped `""` pairs keep them so).
+    """
+    lines: deque[str] = deque()
+    complete = 0  # Records fully buffered in `lines`.
+    quotes = 0
+    open_chars = 0
+    ended = False
+
+    def buffered_lines() -> Iterator[str]:
+        while lines or not ended:
+            if not lines:
+                # Only reachable on CSV the quote count misjudges.
+                raise csv.Error("CSV record runs past the buffered data")
+            yield lines.popleft()
+
+    reader = csv.reader(buffered_lines(), strict=True)
+    tail = ""
+    async for text in resp.aiter_text():
+        *new_lines, tail = (tail + text).split("\n")
+        for line in new_lines:
+            line += "\n"
+            lines.append(line)
+            quotes += line.count('"')
+            open_chars += len(line)
+            if quotes % 2 == 0:
+                complete += 1
+                quotes = open_chars = 0
+        if open_chars + len(tail) > _CSV_MAX_RECORD_CHARS:
+            raise ValueError("CSV record too long (unbalanced quote?)")
+        for _ in range(complete):
+            record = next(reader)
+            if record:
+                yield record
+        complete = 0
+    if tail:
+        lines.append(tail)
+    ended = True
+    for record in reader:
+        if record:
+            yield record
+
+
+async def profile_columns(
+    client: httpx.AsyncClient,
+    soda_base: str,
+    columns: list[SocrataColumnMetadata],
+    total_rows: int,
+    headers: dict[str, str],
+) -> list[tuple[str, ColumnStats]]:
+    """Profile `columns` from one streamed pass over the CSV export.
+
+    Returns (display_name, stats) pairs like compute_column_stats. Memory is
+    bounded per column (reservoir, capped counters, KMV sketch) regardless
+    of row count. Raises on any HTTP or parse failure — the caller falls
+    back to the SODA path for these columns.
+    """
+    csv_url = soda_base.removesuffix(".json") + ".csv"
+    params = {
+        "$select": _csv_select(columns),
+        # SODA's CSV export defaults to 1,000 rows.
+        "$limit": str(total_rows),
+    }
+    profiles = {c.fieldName: _ColumnProfile(c) for c in columns}
+    rows_seen = 0
+
+    async with soda_limiter.slot():
+        async with client.stream(
+            "GET", csv_url, params=params, headers=headers
+        ) as resp:
+            if resp.status_code != 200:
+                await resp.aread()
+                raise httpx.HTTPStatusError(
+                    f"CSV export failed ({resp.status_code}): {resp.text[:300]}",
+                    request=resp.request,
+                    response=resp,
+                )
+            records = _iter_csv_records(resp)
+            header = await anext(records, None)
+            if header is None:
+                raise ValueError("CSV export returned no header row")
+            slots = [profiles.get(name) for name in header]
+            missing = set(profiles) - set(header)
+            if missing:
+                raise ValueError(f"CSV export is missing columns: {sorted(missing)}")
+            async for record in records:
+                rows_seen += 1
+                for profile, cell in zip(slots, record):
+                    if profile is not None and cell != "":
+                        profile.add(cell)
+    soda_limiter.on_success()
+
+    if rows_seen != total_rows:
+        logger.info(
+            "Local profile saw %d rows (row count said %d)", rows_seen, total_rows
+        )
+    return [
+        (c.name or c.fieldName, profiles[c.fieldName].finish(rows_seen))
+        for c in columns
+    ]
@@ -1,13 +1,23 @@
 import asyncio
 import base64
 import logging
-from typing import Any, cast
+import random
+from decimal import Decimal
+from typing import Any, Literal, cast
+from urllib.parse import quote
 
 import httpx
 from fastapi import HTTPException
 
-from .config import SOCRATA_APP_TOKEN
+from .config import (
+    SOCRATA_APP_TOKEN,
+    SODA_INITIAL_CONCURRENCY,
+    SODA_MAX_ATTEMPTS,
+    SODA_MAX_CONCURRENCY,
+)
 from .models import ColumnStats, SocrataColumnMetadata
+from .ratelimit import AdaptiveLimiter, parse_retry_after
+from .shared_store import shared_store
 
 logger = logging.getLogger(__name__)
 
@@ -61,11 +71,45 @@ CATEGORICAL_BOUNDED_LIMIT = 10
 # values to decide categorical-vs-text by unique-ratio.
 TEXT_GROUPBY_LIMIT = 50
 
-# Limit concurrent SODA requests to avoid rate-limiting / 429s
-_soda_semaphore = asyncio.Semaphore(10)
+# Wide aggregate queries pack many columns' scalar aggregates into a single
+# `$select`. Portals reject very long request lines (commonly ~8 KB), so cap
+# the URL-encoded `$select` well under that and split into several queries.
+SODA_MAX_SELECT_URL_CHARS = 4000
+# URL-encoded ", " between `$select` terms (%2C%20; httpx's %2C+ is shorter).
+_SELECT_SEPARATOR_URL_CHARS = len(quote(", ", safe=""))
+
+# Approximate quartiles ("histogram" quantile method) bucket the numeric range
+# into this many equal-width bins; the estimate is within one bin width,
+# i.e. (max - min) / NUMERIC_HISTOGRAM_BUCKETS, of the exact quartile.
+NUMERIC_HISTOGRAM_BUCKETS = 100
+QuantileMethod = Literal["exact", "histogram"]
+
+# SODA concurrency adapts to the portal's rate limiting (AIMD, see
+# ratelimit.AdaptiveLimiter) instead of a fixed semaphore. Throttling and
+# transient 5xx responses are retried with jittered exponential backoff.
+soda_limiter = AdaptiveLimiter(
+    initial=SODA_INITIAL_CONCURRENCY,
+    min_limit=1,
+    max_limit=SODA_MAX_CONCURRENCY,
+    shared=shared_store,
+    shared_key="soda-limiter",
+)
+_SODA_TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+# 429 and 503 mean "slow down" — shrink the window. Other 5xx are retried
+# without penalising throughput.
+_SODA_THROTTLE_STATUSES = {429, 503}
+_SODA_BACKOFF_BASE_SECONDS = 0.5
+
+
+class SodaQueryError(Exception):
+    """A SODA query still failed transiently after all retries.
+
+    Raised instead of returning [] so callers don't mistake an overloaded
+    portal for an empty column.
+    """
 
 
-def _truncate_sample(value: str, max_len: int = TEXT_SAMPLE_MAX_LEN) -> str:
+def truncate_sample(value: str, max_len: int = TEXT_SAMPLE_MAX_LEN) -> str:
     """Cap a sample cell so a single huge value doesn't bloat the LLM prompt."""
     return value if len(value) <= max_len else value[: max_len - 3] + "..."
 
@@ -113,58 +157,218 @@ async def soda_get(
     soda_base: str,
     params: dict[str, str],
     headers: dict[str, str],
+    strict: bool = False,
 ) -> list[dict[str, Any]]:
-    """Issue a SODA query and return the parsed JSON list."""
-    async with _soda_semaphore:
-        resp = await client.get(soda_base, params=params, headers=headers)
-    if resp.status_code != 200:
-        logger.warning(
-            "SODA query failed (%s): params=%s body=%s",
-            resp.status_code,
+    """Issue a SODA query and return the parsed JSON list.
+
+    Non-transient failures (e.g. a 400 for a query the dataset can't answer)
+    are logged and return [], or raise httpx.HTTPStatusError if `strict`.
+    Throttling (429/503, honoring Retry-After), other 5xx and transport
+    errors are retried up to SODA_MAX_ATTEMPTS times; if they persist,
+    SodaQueryError is raised.
+    """
+    last_error = ""
+    for attempt in range(1, SODA_MAX_ATTEMPTS + 1):
+        retry_after: float | None = None
+        try:
+            async with soda_limiter.slot():
+                resp = await client.get(soda_base, params=params, headers=headers)
+        except httpx.TransportError as exc:
+            last_error = f"{type(exc).__name__}: {exc}"
+        else:
+            if resp.status_code == 200:
+                soda_limiter.on_success()
+                return cast(list[dict[str, Any]], resp.json())
+            if resp.status_code not in _SODA_TRANSIENT_STATUSES:
+                if strict:
+                    resp.raise_for_status()
+                logger.warning(
+                    "SODA query failed (%s): params=%s body=%s",
+                    resp.status_code,
+                    params,
+                    resp.text[:300],
+                )
+                return []
+            last_error = f"HTTP {resp.status_code}"
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            if resp.status_code in _SODA_THROTTLE_STATUSES:
+                soda_limiter.on_throttle(retry_after)
+
+        if attempt == SODA_MAX_ATTEMPTS:
+            break
+        # Full jitter keeps retries from a burst of columns from re-colliding.
+        delay = retry_after or random.uniform(
+            0, _SODA_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1)
+        )
+        logger.info(
+            "SODA query transient failure (%s), retry %d/%d in %.2fs: params=%s",
+            last_error,
+            attempt,
+            SODA_MAX_ATTEMPTS - 1,
+            delay,
             params,
-            resp.text[:300],
         )
-        return []
-    return cast(list[dict[str, Any]], resp.json())
+        await asyncio.sleep(delay)
 
+    raise SodaQueryError(
+        f"SODA query failed after {SODA_MAX_ATTEMPTS} attempts ({last_error})"
+    )
 
-async def _compute_numeric_stats(
+
+def _aggregate_kind(data_type: str) -> str:
+    """Map a Socrata `dataTypeName` to the set of scalar aggregates it needs."""
+    if data_type in NUMERIC_SOCRATA_TYPES:
+        return "numeric"
+    if data_type in TEMPORAL_SOCRATA_TYPES:
+        return "temporal"
+    if data_type == URL_SOCRATA_TYPE:
+        return "url"
+    if data_type == PHONE_SOCRATA_TYPE:
+        return "phone"
+    if data_type in SAMPLED_TEXT_SOCRATA_TYPES:
+        return "sampled_text"
+    # Geospatial, opaque, categorical and ambiguous text only need count(field).
+    return "count"
+
+
+def _aggregate_exprs(field: str, kind: str) -> dict[str, str]:
+    """Scalar SoQL aggregates for one column, keyed by the alias suffix the
+    per-type builders read back (`cnt`, `mn`, `mx`, `av`, `ucnt`)."""
+    esc = soda_escape(field)
+    if kind == "numeric":
+        return {
+            "cnt": f"count({esc})",
+            "mn": f"min({esc})",
+            "mx": f"max({esc})",
+            "av": f"avg({esc})",
+        }
+    if kind == "temporal":
+        return {"cnt": f"count({esc})", "mn": f"min({esc})", "mx": f"max({esc})"}
+    if kind in ("url", "phone", "sampled_text"):
+        # url / phone are nested objects — count the inner string subfield so
+        # distinct operates on the link / number rather than the wrapper.
+        inner = {"url": f"{esc}.url", "phone": f"{esc}.phone_number"}.get(kind, esc)
+        return {"cnt": f"count({inner})", "ucnt": f"count(distinct {inner})"}
+    return {"cnt": f"count({esc})"}
+
+
+async def _fetch_aggregates(
     client: httpx.AsyncClient,
     soda_base: str,
     field: str,
-    total_rows: int,
+    kind: str,
     headers: dict[str, str],
-) -> ColumnStats:
-    """Compute numeric column stats using SODA aggregate + quartile lookups."""
-    esc = soda_escape(field)
-
-    # Aggregate: count, min, max, avg
-    agg_rows = await soda_get(
-        client,
-        soda_base,
-        {
-            "$select": f"count({esc}) as cnt, min({esc}) as mn, max({esc}) as mx, avg({esc}) as av",
-        },
-        headers,
+) -> dict[str, Any]:
+    """Run one column's scalar aggregates on their own. Returns {} on failure."""
+    select = ", ".join(
+        f"{expr} as {key}" for key, expr in _aggregate_exprs(field, kind).items()
     )
+    rows = await soda_get(client, soda_base, {"$select": select}, headers)
+    return rows[0] if rows else {}
 
-    if not agg_rows:
-        return ColumnStats(
-            type="empty", stats={}, nullCount=total_rows, totalCount=total_rows
-        )
 
-    row = agg_rows[0]
-    cnt = int(row.get("cnt") or 0)
-    if cnt == 0:
-        return ColumnStats(
-            type="empty", stats={}, nullCount=total_rows, totalCount=total_rows
-        )
+async def _resolve_aggregates(
+    client: httpx.AsyncClient,
+    soda_base: str,
+    field: str,
+    kind: str,
+    headers: dict[str, str],
+    agg: dict[str, Any] | None,
+) -> dict[str, Any]:
+    """Use the planner's pre-fetched aggregates when present, else query them."""
+    if agg is not None:
+        return agg
+    return await _fetch_aggregates(client, soda_base, field, kind, headers)
 
-    mn = float(row.get("mn") or 0)
-    mx = float(row.get("mx") or 0)
-    av = float(row.get("av") or 0)
 
-    # Quartile lookups (q1, median, q3) via $order + $offset
+def start_column_aggregates(
+    client: httpx.AsyncClient,
+    soda_base: str,
+    columns: list[SocrataColumnMetadata],
+    headers: dict[str, str],
+) -> dict[str, asyncio.Task[dict[str, dict[str, Any]]]]:
+    """Start fetching every column's scalar aggregates in a few wide
+    `$select` queries, one task per query.
+
+    Each column's aggregates are aliased `agg{i}_{key}` and packed greedily
+    into queries whose URL-encoded `$select` stays under
+    SODA_MAX_SELECT_URL_CHARS. Returns each column's query task by
+    fieldName (columns packed together share a task), so a caller can use
+    each batch as soon as it lands. A task's result is keyed by fieldName,
+    each holding the same `cnt`/`mn`/`mx`/`av`/`ucnt` keys a single-column
+    query returns. The caller owns the tasks and must cancel them if it
+    gives up.
+
+    A chunk whose query fails (e.g. one column rejects `avg`) yields an
+    empty result — compute_column_stats then falls back to issuing that
+    column's own aggregate query, so one bad column can't blank the rest.
+    """
+    # Each chunk is a list of (fieldName, [(key, alias, expr), ...]).
+    chunks: list[list[tuple[str, list[tuple[str, str, str]]]]] = [[]]
+    chunk_len = 0
+    for i, col in enumerate(columns):
+        kind = _aggregate_kind(col.dataTypeName.lower())
+        terms = [
+            (key, f"agg{i}_{key}", expr)
+            for key, expr in _aggregate_exprs(col.fieldName, kind).items()
+        ]
+        # quote() is per character, so summing encoded terms plus one encoded
+        # separator each measures the joined clause exactly (plus one spare
+        # separator). safe="" encodes "/" too, as httpx does.
+        terms_len = sum(
+            len(quote(f"{expr} as {alias}", safe="")) + _SELECT_SEPARATOR_URL_CHARS
+            for _, alias, expr in terms
+        )
+        if chunks[-1] and chunk_len + terms_len > SODA_MAX_SELECT_URL_CHARS:
+            chunks.append([])
+            chunk_len = 0
+        chunks[-1].append((col.fieldName, terms))
+        chunk_len += terms_len
+
+    async def _run_chunk(
+        chunk: list[tuple[str, list[tuple[str, str, str]]]],
+    ) -> dict[str, dict[str, Any]]:
+        select = ", ".join(
+            f"{expr} as {alias}" for _, terms in chunk for _, alias, expr in terms
+        )
+        try:
+            rows = await soda_get(client, soda_base, {"$select": select}, headers)
+        except SodaQueryError as exc:
+            logger.warning("Wide aggregate query failed, falling back: %s", exc)
+            return {}
+        if not rows:
+            return {}
+        row = rows[0]
+        # SODA omits null aggregates from the row, so absent keys stay absent —
+        # matching what the single-column query would have returned.
+        return {
+            field: {key: row[alias] for key, alias, _ in terms if alias in row}
+            for field, terms in chunk
+        }
+
+    tasks: dict[str, asyncio.Task[dict[str, dict[str, Any]]]] = {}
+    for chunk in chunks:
+        if chunk:
+            task = asyncio.create_task(_run_chunk(chunk))
+            for field, _ in chunk:
+                tasks[field] = task
+    return tasks
+
+
+async def _exact_quartiles(
+    client: httpx.AsyncClient,
+    soda_base: str,
+    field: str,
+    cnt: int,
+    av: float,
+    headers: dict[str, str],
+) -> tuple[float, float, float]:
+    """Exact q1/median/q3 via three `$order … $offset N $limit 1` lookups.
+
+    Each lookup makes the portal sort the whole column, so this is the slow
+    path on large datasets — see _histogram_quartiles for the one-query one.
+    """
+    esc = soda_escape(field)
     offsets = {
         "q1": max(0, int(cnt * 0.25) - 1),
         "median": max(0, int(cnt * 0.5) - 1),
@@ -193,6 +397,124 @@ async def _compute_numeric_stats(
         _get_percentile(offsets["median"]),
         _get_percentile(offsets["q3"]),
     )
+    return q1, median, q3
+
+
+def _soql_number(x: float) -> str:
+    """Fixed-point SoQL literal for `x`: repr() would give e.g. `1e-05`,
+    which SoQL doesn't parse as a number."""
+    return format(Decimal(repr(x)), "f")
+
+
+def _interpolate_quantile(
+    buckets: list[tuple[int, int]], p: float, mn: float, mx: float, width: float
+) -> float:
+    """Linearly interpolate the p-quantile from sorted (bucket, count) pairs.
+
+    Bucket 0 holds values equal to `mn`; bucket b >= 1 covers
+    (mn + (b-1)·width, mn + b·width]. Uses the same rank convention as the
+    exact path (the int(n·p)-th smallest value).
+    """
+    total = sum(n for _, n in buckets)
+    target = max(1, int(total * p))
+    seen = 0
+    for bucket, n in buckets:
+        if seen + n >= target:
+            lo = mn + max(bucket - 1, 0) * width
+            hi = mn + bucket * width
+            value = lo + (target - seen) / n * (hi - lo)
+            return min(max(value, mn), mx)
+        seen += n
+    return mx
+
+
+async def _histogram_quartiles(
+    client: httpx.AsyncClient,
+    soda_base: str,
+    field: str,
+    mn: float,
+    mx: float,
+    headers: dict[str, str],
+) -> tuple[float, float, float] | None:
+    """Approximate q1/median/q3 from one bucketed group-by over [mn, mx].
+
+    Buckets the column into NUMERIC_HISTOGRAM_BUCKETS equal-width bins with
+    SoQL's `signed_magnitude_linear` (applied to `field - mn` so every value
+    lands in a non-negative bucket) and interpolates within the bin holding
+    each quartile's rank. The true quartile lies in that same bin, so the
+    error is bounded by one bin width: |estimate - exact| <= (mx - mn) /
+    NUMERIC_HISTOGRAM_BUCKETS.
+
+    Returns None if the histogram query fails so the caller can fall back to
+    the exact path.
+    """
+    if mx <= mn:
+        return mn, mn, mn
+    esc = soda_escape(field)
+    width = (mx - mn) / NUMERIC_HISTOGRAM_BUCKETS
+    shifted = (
+        f"{esc} - {_soql_number(mn)}" if mn >= 0 else f"{esc} + {_soql_number(-mn)}"
+    )
+    bucket_expr = f"signed_magnitude_linear({shifted}, {_soql_number(width)})"
+    rows = await soda_get(
+        client,
+        soda_base,
+        {
+            "$select": f"{bucket_expr} as bucket, count(*) as n",
+            "$where": f"{esc} IS NOT NULL",
+            "$group": bucket_expr,
+            # +2 covers bucket 0 and a float-rounding overflow bucket.
+            "$limit": str(NUMERIC_HISTOGRAM_BUCKETS + 2),
+        },
+        headers,
+    )
+    buckets: list[tuple[int, int]] = []
+    for r in rows:
+        try:
+            buckets.append((int(float(r["bucket"])), int(r["n"])))
+        except (KeyError, TypeError, ValueError):
+            continue
+    buckets = [(b, n) for b, n in sorted(buckets) if n > 0]
+    if not buckets:
+        return None
+    return (
+        _interpolate_quantile(buckets, 0.25, mn, mx, width),
+        _interpolate_quantile(buckets, 0.5, mn, mx, width),
+        _interpolate_quantile(buckets, 0.75, mn, mx, width),
+    )
+
+
+async def _compute_numeric_stats(
+    client: httpx.AsyncClient,
+    soda_base: str,
+    field: str,
+    total_rows: int,
+    headers: dict[str, str],
+    agg: dict[str, Any] | None = None,
+    quantile_method: QuantileMethod = "exact",
+) -> ColumnStats:
+    """Compute numeric column stats using SODA aggregate + quartile lookups."""
+    # Aggregate: count, min, max, avg
+    row = await _resolve_aggregates(client, soda_base, field, "numeric", headers, agg)
+    cnt = int(row.get("cnt") or 0)
+    if cnt == 0:
+        return ColumnStats(
+            type="empty", stats={}, nullCount=total_rows, totalCount=total_rows
+        )
+
+    mn = float(row.get("mn") or 0)
+    mx = float(row.get("mx") or 0)
+    av = float(row.get("av") or 0)
+
+    # Quartiles (q1, median, q3): one bucketed group-by, or exact $offset lookups
+    quartiles = None
+    if quantile_method == "histogram":
+        quartiles = await _histogram_quartiles(
+            client, soda_base, field, mn, mx, headers
+        )
+    if quartiles is None:
+        quartiles = await _exact_quartiles(client, soda_base, field, cnt, av, headers)
+    q1, median, q3 = quartiles
 
     return ColumnStats(
         type="numeric",
@@ -216,22 +538,10 @@ async def _compute_temporal_stats(
     field: str,
     total_rows: int,
     headers: dict[str, str],
+    agg: dict[str, Any] | None = None,
 ) -> ColumnStats:
     """Compute min/max/count for a date or timestamp column via a single SODA aggregate."""
-    esc = soda_escape(field)
-    rows = await soda_get(
-        client,
-        soda_base,
-        {
-            "$select": f"min({esc}) as mn, max({esc}) as mx, count({esc}) as cnt",
-        },
-        headers,
-    )
-    if not rows:
-        return ColumnStats(
-            type="empty", stats={}, nullCount=total_rows, totalCount=total_rows
-        )
-    row = rows[0]
+    row = await _resolve_aggregates(client, soda_base, field, "temporal", headers, agg)
     cnt = int(row.get("cnt") or 0)
     mn = row.get("mn")
     mx = row.get("mx")
@@ -248,21 +558,6 @@ async def _compute_temporal_stats(
     )
 
 
-async def _compute_non_null_count(
-    client: httpx.AsyncClient,
-    soda_base: str,
-    field: str,
-    headers: dict[str, str],
-) -> int:
-    esc = soda_escape(field)
-    rows = await soda_get(
-        client, soda_base, {"$select": f"count({esc}) as cnt"}, headers
-    )
-    if not rows:
-        return 0
-    return int(rows[0].get("cnt") or 0)
-
-
 async def _compute_geospatial_stats(
     client: httpx.AsyncClient,
     soda_base: str,
@@ -270,6 +565,7 @@ async def _compute_geospatial_stats(
     total_rows: int,
     headers: dict[str, str],
     geometry_type: str,
+    agg: dict[str, Any] | None = None,
 ) -> ColumnStats:
     """Count non-null geometries. Skip group-by — geometries are near-unique
     and their WKT/JSON noise pollutes the prompt.
@@ -279,7 +575,8 @@ async def _compute_geospatial_stats(
     if the LLM ever needs address strings as prompt context, split `location`
     out and project `field.human_address`.
     """
-    cnt = await _compute_non_null_count(client, soda_base, field, headers)
+    row = await _resolve_aggregates(client, soda_base, field, "count", headers, agg)
+    cnt = int(row.get("cnt") or 0)
     if cnt == 0:
         return ColumnStats(
             type="empty", stats={}, nullCount=total_rows, totalCount=total_rows
@@ -298,16 +595,12 @@ async def _compute_sampled_text_stats(
     field: str,
     total_rows: int,
     headers: dict[str, str],
+    agg: dict[str, Any] | None = None,
 ) -> ColumnStats:
     """For flat near-unique text types (email, phone): count, distinct, samples."""
     esc = soda_escape(field)
-    agg_rows, sample_rows = await asyncio.gather(
-        soda_get(
-            client,
-            soda_base,
-            {"$select": f"count({esc}) as cnt, count(distinct {esc}) as ucnt"},
-            headers,
-        ),
+    agg, sample_rows = await asyncio.gather(
+        _resolve_aggregates(client, soda_base, field, "sampled_text", headers, agg),
         soda_get(
             client,
             soda_base,
@@ -315,14 +608,13 @@ async def _compute_sampled_text_stats(
             headers,
         ),
     )
-    agg = agg_rows[0] if agg_rows else {}
     cnt = int(agg.get("cnt") or 0)
     if cnt == 0:
         return ColumnStats(
             type="empty", stats={}, nullCount=total_rows, totalCount=total_rows
         )
     unique_count = _coerce_unique_count(agg.get("ucnt"), cnt, field)
-    samples = [_truncate_sample(str(r[field])) for r in sample_rows if r.get(field)]
+    samples = [truncate_sample(str(r[field])) for r in sample_rows if r.get(field)]
     return ColumnStats(
         type="text",
         stats={"count": cnt, "uniqueCount": unique_count, "samples": samples},
@@ -337,6 +629,7 @@ async def _compute_url_stats(
     field: str,
     total_rows: int,
     headers: dict[str, str],
+    agg: dict[str, Any] | None = None,
 ) -> ColumnStats:
     """URL columns are nested objects with `url` and `description` subfields.
 
@@ -347,15 +640,8 @@ async def _compute_url_stats(
     esc = soda_escape(field)
     url_expr = f"{esc}.url"
     desc_expr = f"{esc}.description"
-    agg_rows, sample_rows = await asyncio.gather(
-        soda_get(
-            client,
-            soda_base,
-            {
-                "$select": f"count({url_expr}) as cnt, count(distinct {url_expr}) as ucnt"
-            },
-            headers,
-        ),
+    agg, sample_rows = await asyncio.gather(
+        _resolve_aggregates(client, soda_base, field, "url", headers, agg),
         soda_get(
             client,
             soda_base,
@@ -372,7 +658,6 @@ async def _compute_url_stats(
             headers,
         ),
     )
-    agg = agg_rows[0] if agg_rows else {}
     cnt = int(agg.get("cnt") or 0)
     if cnt == 0:
         return ColumnStats(
@@ -386,7 +671,7 @@ async def _compute_url_stats(
             continue
         label = r.get("label")
         rendered = f"{link} ({label})" if label else str(link)
-        samples.append(_truncate_sample(rendered))
+        samples.append(truncate_sample(rendered))
     return ColumnStats(
         type="text",
         stats={"count": cnt, "uniqueCount": unique_count, "samples": samples},
@@ -401,6 +686,7 @@ async def _compute_phone_stats(
     field: str,
     total_rows: int,
     headers: dict[str, str],
+    agg: dict[str, Any] | None = None,
 ) -> ColumnStats:
     """Legacy `phone` columns are nested objects with `phone_number` and
     `phone_type` subfields. Project them so samples are readable strings
@@ -409,15 +695,8 @@ async def _compute_phone_stats(
     esc = soda_escape(field)
     num_expr = f"{esc}.phone_number"
     type_expr = f"{esc}.phone_type"
-    agg_rows, sample_rows = await asyncio.gather(
-        soda_get(
-            client,
-            soda_base,
-            {
-                "$select": f"count({num_expr}) as cnt, count(distinct {num_expr}) as ucnt",
-            },
-            headers,
-        ),
+    agg, sample_rows = await asyncio.gather(
+        _resolve_aggregates(client, soda_base, field, "phone", headers, agg),
         soda_get(
             client,
             soda_base,
@@ -431,7 +710,6 @@ async def _compute_phone_stats(
             headers,
         ),
     )
-    agg = agg_rows[0] if agg_rows else {}
     cnt = int(agg.get("cnt") or 0)
     if cnt == 0:
         return ColumnStats(
@@ -445,7 +723,7 @@ async def _compute_phone_stats(
             continue
         kind = r.get("kind")
         rendered = f"{number} ({kind})" if kind else str(number)
-        samples.append(_truncate_sample(rendered))
+        samples.append(truncate_sample(rendered))
     return ColumnStats(
         type="text",
         stats={"count": cnt, "uniqueCount": unique_count, "samples": samples},
@@ -480,9 +758,11 @@ async def _compute_opaque_stats(
     field: str,
     total_rows: int,
     headers: dict[str, str],
+    agg: dict[str, Any] | None = None,
 ) -> ColumnStats:
     """For document/photo/dataset_link/nested_table: count only, no samples."""
-    cnt = await _compute_non_null_count(client, soda_base, field, headers)
+    row = await _resolve_aggregates(client, soda_base, field, "count", headers, agg)
+    cnt = int(row.get("cnt") or 0)
     if cnt == 0:
         return ColumnStats(
             type="empty", stats={}, nullCount=total_rows, totalCount=total_rows
@@ -524,7 +804,7 @@ async def _compute_groupby(
     )
 
 
-def _classify_from_groupby(
+def classify_from_groupby(
     groups: list[dict[str, Any]],
     field: str,
     total_rows: int,
@@ -559,7 +839,7 @@ def _classify_from_groupby(
         if unique_ratio >= 0.5:
             # Text column — use values from group-by (guaranteed non-null)
             samples = [
-                _truncate_sample(str(g.get(field) or ""))
+                truncate_sample(str(g.get(field) or ""))
                 for g in groups[:5]
                 if g.get(field) is not None
             ]
@@ -575,7 +855,7 @@ def _classify_from_groupby(
             )
 
     # Categorical
-    values = [_truncate_sample(str(g.get(field) or "")) for g in groups[:20]]
+    values = [truncate_sample(str(g.get(field) or "")) for g in groups[:20]]
     return ColumnStats(
         type="categorical",
         stats={
@@ -589,55 +869,95 @@ def _classify_from_groupby(
     )
 
 
+def classify_bounded_categorical(
+    groups: list[dict[str, Any]],
+    field: str,
+    total_rows: int,
+    non_null_count: int,
+) -> ColumnStats:
+    """Build stats for a bounded categorical type (checkbox/flag) from up to
+    CATEGORICAL_BOUNDED_LIMIT + 1 group-by rows sorted by count desc."""
+    has_more = len(groups) > CATEGORICAL_BOUNDED_LIMIT
+    groups = groups[:CATEGORICAL_BOUNDED_LIMIT]
+    values = [truncate_sample(str(g.get(field) or "")) for g in groups]
+    return ColumnStats(
+        type="categorical",
+        stats={
+            "count": non_null_count,
+            "uniqueCount": len(groups),
+            "values": values,
+            "hasMore": has_more,
+        },
+        nullCount=total_rows - non_null_count,
+        totalCount=total_rows,
+    )
+
+
 async def compute_column_stats(
     client: httpx.AsyncClient,
     soda_base: str,
     col_meta: SocrataColumnMetadata,
     total_rows: int,
     headers: dict[str, str],
+    aggregates: dict[str, Any] | None = None,
+    quantile_method: QuantileMethod = "exact",
 ) -> tuple[str, ColumnStats]:
-    """Compute stats for a single column. Returns (display_name, stats)."""
+    """Compute stats for a single column. Returns (display_name, stats).
+
+    `aggregates` is this column's entry from start_column_aggregates. When
+    omitted (or the wide query failed), the column issues its own aggregate
+    query instead. `quantile_method` picks how numeric quartiles are computed
+    (see _histogram_quartiles for the approximation's error bound).
+    """
     field = col_meta.fieldName
     display_name = col_meta.name or field
     data_type = col_meta.dataTypeName.lower()
 
     if data_type in NUMERIC_SOCRATA_TYPES:
         stats = await _compute_numeric_stats(
-            client, soda_base, field, total_rows, headers
+            client,
+            soda_base,
+            field,
+            total_rows,
+            headers,
+            agg=aggregates,
+            quantile_method=quantile_method,
         )
         return display_name, stats
 
     if data_type in TEMPORAL_SOCRATA_TYPES:
         stats = await _compute_temporal_stats(
-            client, soda_base, field, total_rows, headers
+            client, soda_base, field, total_rows, headers, agg=aggregates
         )
         return display_name, stats
 
     if data_type in GEOSPATIAL_SOCRATA_TYPES:
         stats = await _compute_geospatial_stats(
-            client, soda_base, field, total_rows, headers, data_type
+            client, soda_base, field, total_rows, headers, data_type, agg=aggregates
         )
         return display_name, stats
 
     if data_type == URL_SOCRATA_TYPE:
-        stats = await _compute_url_stats(client, soda_base, field, total_rows, headers)
+        stats = await _compute_url_stats(
+            client, soda_base, field, total_rows, headers, agg=aggregates
+        )
         return display_name, stats
 
     if data_type == PHONE_SOCRATA_TYPE:
         stats = await _compute_phone_stats(
-            client, soda_base, field, total_rows, headers
+            client, soda_base, field, total_rows, headers, agg=aggregates
         )
         return display_name, stats
 
     if data_type in SAMPLED_TEXT_SOCRATA_TYPES:
         stats = await _compute_sampled_text_stats(
-            client, soda_base, field, total_rows, headers
+            client, soda_base, field, total_rows, headers, agg=aggregates
         )
         return display_name, stats
 
     if data_type in OPAQUE_SOCRATA_TYPES:
         stats = await _compute_opaque_stats(
-            client, soda_base, field, total_rows, headers
+            client, soda_base, field, total_rows, headers, agg=aggregates
         )
         return display_name, stats
 
@@ -647,40 +967,29 @@ async def compute_column_stats(
         # values would falsely report hasMore=True.
         # Run the count(field) aggregate in parallel rather than summing the
         # truncated group counts — the sum undercounts whenever has_more is true.
-        groups, non_null = await asyncio.gather(
+        groups, agg = await asyncio.gather(
             _compute_groupby(
                 client, soda_base, field, headers, limit=CATEGORICAL_BOUNDED_LIMIT + 1
             ),
-            _compute_non_null_count(client, soda_base, field, headers),
-        )
-        has_more = len(groups) > CATEGORICAL_BOUNDED_LIMIT
-        groups = groups[:CATEGORICAL_BOUNDED_LIMIT]
-        values = [_truncate_sample(str(g.get(field) or "")) for g in groups]
-        unique_count = len(groups)
-        return display_name, ColumnStats(
-            type="categorical",
-            stats={
-                "count": non_null,
-                "uniqueCount": unique_count,
-                "values": values,
-                "hasMore": has_more,
-            },
-            nullCount=total_rows - non_null,
-            totalCount=total_rows,
+            _resolve_aggregates(client, soda_base, field, "count", headers, aggregates),
         )
+        non_null = int(agg.get("cnt") or 0)
+        stats = classify_bounded_categorical(groups, field, total_rows, non_null)
+        return display_name, stats
 
     # Ambiguous type (plain text, html, etc.) — run group-by to decide.
     # Fetch threshold+1 so has_more can distinguish "exactly threshold" from "more".
     # count(field) runs in parallel: summing the truncated group counts would
     # massively undercount non-nulls on any column with >TEXT_GROUPBY_LIMIT
     # distinct values (which is most real-world text columns).
-    groups, non_null = await asyncio.gather(
+    groups, agg = await asyncio.gather(
         _compute_groupby(
             client, soda_base, field, headers, limit=TEXT_GROUPBY_LIMIT + 1
         ),
-        _compute_non_null_count(client, soda_base, field, headers),
+        _resolve_aggregates(client, soda_base, field, "count", headers, aggregates),
     )
-    stats = _classify_from_groupby(
+    non_null = int(agg.get("cnt") or 0)
+    stats = classify_from_groupby(
         groups, field, total_rows, TEXT_GROUPBY_LIMIT, non_null
     )
     return display_name, stats
@@ -0,0 +1,51 @@
+import heapq
+from bisect import bisect_left
+
+
+class TagIndex:
+    """A portal tag list held for autocomplete: names sorted alphabetically
+    (for bisect prefix lookups) and by usage count (for ranking).
+
+    Search ranks prefix matches first, then substring matches, each by
+    descending usage count — the same ordering the tag picker applies
+    client-side.
+    """
+
+    def __init__(self, pairs: list[tuple[str, int]]) -> None:
+        self._counts = dict(pairs)
+        self._by_usage = sorted(self._counts, key=lambda n: (-self._counts[n], n))
+        self._sorted = sorted(self._counts)
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    def pairs(self) -> list[tuple[str, int]]:
+        """(name, count) pairs in usage order; round-trips through __init__."""
+        return [(name, self._counts[name]) for name in self._by_usage]
+
+    def top(self, limit: int) -> list[str]:
+        return self._by_usage[:limit]
+
+    def search(self, query: str, limit: int) -> list[str]:
+        q = query.strip().lower()
+        if not q:
+            return self.top(limit)
+
+        lo = bisect_left(self._sorted, q)
+        hi = bisect_left(self._sorted, q + "\U0010ffff", lo)
+        matches = heapq.nsmallest(
+            limit,
+            (self._sorted[i] for i in range(lo, hi)),
+            key=lambda n: (-self._counts[n], n),
+        )
+        if len(matches) >= limit:
+            return matches
+
+        # Substring matches: walk in usage order so the scan can stop as soon
+        # as the page is full.
+        for name in self._by_usage:
+            if q in name and not name.startswith(q):
+                matches.append(name)
+                if len(matches) >= limit:
+                    break
+        return matches
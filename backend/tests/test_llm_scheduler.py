@@ -0,0 +1,187 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+from backend.llm_scheduler import LLMScheduler, SlotTicket
+
+
+def _run(scenario: Callable[[], Awaitable[None]]) -> None:
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+
+
+async def _settle() -> None:
+    """Let every runnable task take its next step."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def _job(
+    scheduler: LLMScheduler,
+    session: str,
+    name: str,
+    order: list[str],
+    interactive: bool = False,
+    hold: asyncio.Event | None = None,
+) -> None:
+    async with scheduler.slot(session, interactive):
+        order.append(name)
+        if hold is not None:
+            await hold.wait()
+
+
+def test_grants_round_robin_across_sessions() -> None:
+    async def scenario() -> None:
+        scheduler = LLMScheduler(
+            max_concurrency=1, per_session=8, interactive_reserved=0
+        )
+        order: list[str] = []
+        gate = asyncio.Event()
+        blocker = asyncio.create_task(_job(scheduler, "x", "x", order, hold=gate))
+        await _settle()
+        jobs = [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1"), ("b", "b2")]
+        tasks = [asyncio.create_task(_job(scheduler, s, n, order)) for s, n in jobs]
+        await _settle()
+        assert scheduler.queued() == 5
+
+        gate.set()
+        await asyncio.gather(blocker, *tasks)
+        assert order == ["x", "a1", "b1", "a2", "b2", "a3"]
+
+    _run(scenario)
+
+
+def test_caps_slots_per_session() -> None:
+    async def scenario() -> None:
+        scheduler = LLMScheduler(
+            max_concurrency=4, per_session=2, interactive_reserved=0
+        )
+        order: list[str] = []
+        gate = asyncio.Event()
+        jobs = [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1")]
+        tasks = [
+            asyncio.create_task(_job(scheduler, s, n, order, hold=gate))
+            for s, n in jobs
+        ]
+        await _settle()
+        assert order == ["a1", "a2", "b1"]
+        assert scheduler.stats()["inFlight"] == 3
+        assert scheduler.queued() == 1
+
+        gate.set()
+        await asyncio.gather(*tasks)
+        assert order[-1] == "a3"
+
+    _run(scenario)
+
+
+def test_reserves_slots_for_interactive_requests() -> None:
+    async def scenario() -> None:
+        scheduler = LLMScheduler(
+            max_concurrency=3, per_session=8, interactive_reserved=1
+        )
+        order: list[str] = []
+        gate = asyncio.Event()
+        bulk = [
+            asyncio.create_task(_job(scheduler, "a", f"bulk{i}", order, hold=gate))
+            for i in range(3)
+        ]
+        await _settle()
+        assert order == ["bulk0", "bulk1"]
+
+        interactive = asyncio.create_task(
+            _job(scheduler, "b", "interactive", order, interactive=True, hold=gate)
+        )
+        await _settle()
+        assert order == ["bulk0", "bulk1", "interactive"]
+        assert scheduler.queued(interactive=False) == 1
+
+        gate.set()
+        await asyncio.gather(interactive, *bulk)
+
+    _run(scenario)
+
+
+def test_serves_interactive_before_queued_bulk() -> None:
+    async def scenario() -> None:
+        scheduler = LLMScheduler(
+            max_concurrency=1, per_session=8, interactive_reserved=0
+        )
+        order: list[str] = []
+        gate = asyncio.Event()
+        blocker = asyncio.create_task(_job(scheduler, "x", "x", order, hold=gate))
+        await _settle()
+        bulk = asyncio.create_task(_job(scheduler, "a", "bulk", order))
+        await _settle()
+        interactive = asyncio.create_task(
+            _job(scheduler, "b", "interactive", order, interactive=True)
+        )
+        await _settle()
+
+        gate.set()
+        await asyncio.gather(blocker, bulk, interactive)
+        assert order == ["x", "interactive", "bulk"]
+
+    _run(scenario)
+
+
+def test_promote_moves_a_queued_bulk_ticket_to_the_interactive_lane() -> None:
+    async def scenario() -> None:
+        scheduler = LLMScheduler(
+            max_concurrency=2, per_session=8, interactive_reserved=1
+        )
+        order: list[str] = []
+        gate = asyncio.Event()
+        running = asyncio.create_task(_job(scheduler, "a", "a", order, hold=gate))
+        await _settle()
+
+        ticket = SlotTicket("b", interactive=False)
+
+        async def held() -> None:
+            async with scheduler.slot_for(ticket):
+                order.append("b")
+                await gate.wait()
+
+        queued = asyncio.create_task(held())
+        await _settle()
+        assert order == ["a"]
+
+        scheduler.promote(ticket)
+        await _settle()
+        assert order == ["a", "b"]
+        assert scheduler.stats()["bulkInFlight"] == 1
+
+        gate.set()
+        await asyncio.gather(running, queued)
+        assert scheduler.stats()["inFlight"] == 0
+        assert scheduler.stats()["bulkInFlight"] == 0
+
+    _run(scenario)
+
+
+def test_pauses_grants_for_retry_after() -> None:
+    async def scenario() -> None:
+        scheduler = LLMScheduler(
+            max_concurrency=4, per_session=4, interactive_reserved=0
+        )
+        # Typed Any: some openai releases annotate against their own httpx.
+        response: Any = httpx.Response(
+            429,
+            headers={"retry-after": "0.3"},
+            request=httpx.Request("POST", "http://llm.test/v1/chat/completions"),
+        )
+        with pytest.raises(RateLimitError):
+            async with scheduler.slot("a"):
+                raise RateLimitError("slow down", response=response, body=None)
+        assert scheduler.throttled == 1
+
+        started = time.monotonic()
+        async with scheduler.slot("b"):
+            waited = time.monotonic() - started
+        assert waited >= 0.25
+
+    _run(scenario)
@@ -0,0 +1,96 @@
+import asyncio
+import csv
+import io
+import re
+from collections import Counter
+from typing import Any
+
+import httpx
+import pytest
+
+from backend.models import SocrataColumnMetadata
+from backend.socrata_profile import profile_columns
+from backend.socrata_soda import compute_column_stats
+
+SODA_BASE = "https://portal.test/resource/abcd-1234.json"
+
+COLUMNS = [
+    SocrataColumnMetadata(
+        fieldName="note", name="Note", description="", dataTypeName="text"
+    ),
+    SocrataColumnMetadata(
+        fieldName="kind", name="Kind", description="", dataTypeName="text"
+    ),
+]
+
+# Quoted cells with CRLF line breaks, embedded quotes and commas.
+ROWS: list[dict[str, str | None]] = [
+    {"note": "line one\r\nline two", "kind": "x"},
+    {"note": "line one\r\nline two", "kind": "x"},
+    {"note": "line one\r\nline two", "kind": "x"},
+    {"note": 'say "hi", then leave', "kind": "x"},
+    {"note": 'say "hi", then leave', "kind": "y"},
+    {"note": "plain", "kind": "y"},
+    {"note": None, "kind": "z"},
+]
+
+
+def _portal(rows: list[dict[str, str | None]], csv_text: str | None = None) -> Any:
+    """A SODA endpoint answering the CSV export plus the group-by and
+    count(field) queries the SODA path issues for text columns."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        if request.url.path.endswith(".csv"):
+            if csv_text is not None:
+                return httpx.Response(200, text=csv_text)
+            fields = [f.strip(" `") for f in params["$select"].split(",")]
+            buf = io.StringIO()
+            # Minimal quoting and \r\n line endings, like Socrata's export.
+            writer = csv.writer(buf)
+            writer.writerow(fields)
+            writer.writerows([[row.get(f) or "" for f in fields] for row in rows])
+            return httpx.Response(200, text=buf.getvalue())
+        if "$group" in params:
+            field = params["$group"]
+            counts = Counter(row[field] for row in rows if row[field] is not None)
+            groups = counts.most_common(int(params["$limit"]))
+            return httpx.Response(
+                200, json=[{field: value, "cnt": str(n)} for value, n in groups]
+            )
+        match = re.fullmatch(r"count\((\w+)\) as cnt", params["$select"])
+        assert match is not None, params
+        non_null = sum(row[match[1]] is not None for row in rows)
+        return httpx.Response(200, json=[{"cnt": str(non_null)}])
+
+    return httpx.MockTransport(handler)
+
+
+def test_local_profile_matches_soda_stats() -> None:
+    async def scenario() -> None:
+        async with httpx.AsyncClient(transport=_portal(ROWS)) as client:
+            local = dict(
+                await profile_columns(client, SODA_BASE, COLUMNS, len(ROWS), {})
+            )
+            soda = dict(
+                await asyncio.gather(
+                    *(
+                        compute_column_stats(client, SODA_BASE, c, len(ROWS), {})
+                        for c in COLUMNS
+                    )
+                )
+            )
+        assert local == soda
+        assert local["Note"].stats["values"][0] == "line one\r\nline two"
+
+    asyncio.run(scenario())
+
+
+def test_unbalanced_quote_fails_local_profile() -> None:
+    async def scenario() -> None:
+        broken = 'note,kind\r\nok,x\r\n"never closed,y\r\nmore,z\r\n'
+        async with httpx.AsyncClient(transport=_portal(ROWS, broken)) as client:
+            with pytest.raises(csv.Error):
+                await profile_columns(client, SODA_BASE, COLUMNS, len(ROWS), {})
+
+    asyncio.run(scenario())
@@ -0,0 +1,84 @@
+import asyncio
+import math
+import random
+import re
+from collections import Counter
+
+import httpx
+import pytest
+
+from backend.socrata_soda import (
+    NUMERIC_HISTOGRAM_BUCKETS,
+    _histogram_quartiles,
+    _interpolate_quantile,
+)
+
+SODA_BASE = "https://portal.test/resource/abcd-1234.json"
+
+# signed_magnitude_linear(field ± offset, width) with plain decimal literals;
+# scientific notation like `1e-05` isn't valid SoQL.
+_BUCKET_EXPR = re.compile(
+    r"signed_magnitude_linear\(amount ([-+]) (\d+(?:\.\d+)?), (\d+(?:\.\d+)?)\)"
+)
+
+
+def _histogram_portal(values: list[float]) -> httpx.MockTransport:
+    """Answers the histogram group-by over an `amount` column."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        match = _BUCKET_EXPR.fullmatch(request.url.params["$group"])
+        assert match is not None, request.url.params["$group"]
+        sign, offset, width = match[1], float(match[2]), float(match[3])
+        shift = offset if sign == "+" else -offset
+        buckets = Counter(
+            int(math.copysign(math.ceil(abs(v + shift) / width), v + shift))
+            for v in values
+        )
+        return httpx.Response(
+            200, json=[{"bucket": str(b), "n": str(n)} for b, n in buckets.items()]
+        )
+
+    return httpx.MockTransport(handler)
+
+
+def _exact_quartiles(values: list[float]) -> tuple[float, float, float]:
+    # The int(n·p)-th smallest value, as the exact SODA path computes it.
+    ordered = sorted(values)
+    q1, median, q3 = (
+        ordered[max(1, int(len(ordered) * p)) - 1] for p in (0.25, 0.5, 0.75)
+    )
+    return q1, median, q3
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        [i * 1e-6 for i in range(1, 401)],
+        [i * 1e-6 - 2.5e-4 for i in range(401)],
+        [random.Random(7).uniform(-1e6, 3e6) for _ in range(1000)],
+    ],
+    ids=["tiny-positive", "tiny-negative-min", "wide-negative-min"],
+)
+def test_histogram_quartiles_within_one_bucket(values: list[float]) -> None:
+    async def scenario() -> tuple[float, float, float] | None:
+        async with httpx.AsyncClient(transport=_histogram_portal(values)) as client:
+            return await _histogram_quartiles(
+                client, SODA_BASE, "amount", min(values), max(values), {}
+            )
+
+    estimate = asyncio.run(scenario())
+    assert estimate is not None
+    width = (max(values) - min(values)) / NUMERIC_HISTOGRAM_BUCKETS
+    for got, want in zip(estimate, _exact_quartiles(values)):
+        assert abs(got - want) <= width * (1 + 1e-9)
+
+
+def test_interpolate_quantile_from_a_negative_minimum() -> None:
+    # Ten values in each unit bucket over (-10, -6].
+    buckets = [(1, 10), (2, 10), (3, 10), (4, 10)]
+    assert _interpolate_quantile(buckets, 0.25, -10.0, -6.0, 1.0) == -9.0
+    assert _interpolate_quantile(buckets, 0.5, -10.0, -6.0, 1.0) == -8.0
+    assert _interpolate_quantile(buckets, 0.6, -10.0, -6.0, 1.0) == pytest.approx(-7.6)
+    assert _interpolate_quantile(buckets, 1.0, -10.0, -6.0, 1.0) == -6.0
+    # Bucket 0 holds the minimum itself, not a bin below it.
+    assert _interpolate_quantile([(0, 4), (1, 6)], 0.25, -10.0, -9.0, 1.0) == -10.0
@@ -0,0 +1,56 @@
+"""Micro-benchmark for backend.auth.read_session's decrypted-session cache.
+
+Times read_session on a cache hit (the same cookie every call) against a
+miss (a fresh cookie every call, so each one is Fernet-decrypted). The
+payload mirrors a signed-in OAuth session with a saved LLM config.
+
+Usage, from the repository root:
+    python scripts/bench_read_session.py [iterations]
+"""
+
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from starlette.requests import Request  # noqa: E402
+
+from backend.auth import read_session  # noqa: E402
+from backend.config import SESSION_COOKIE_NAME, fernet  # noqa: E402
+
+PAYLOAD = {
+    "kind": "oauth",
+    "token": "t" * 40,
+    "openai_config": {"baseURL": "https://llm.example/v1", "apiKey": "k" * 50},
+}
+
+
+def _request(cookie: str) -> Request:
+    header = f"{SESSION_COOKIE_NAME}={cookie}".encode()
+    return Request({"type": "http", "headers": [(b"cookie", header)]})
+
+
+def _cookie() -> str:
+    return fernet.encrypt(json.dumps(PAYLOAD).encode()).decode()
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+
+    hit_request = _request(_cookie())
+    read_session(hit_request)
+    hit = timeit.timeit(lambda: read_session(hit_request), number=n) / n
+
+    # Distinct cookies, built up front so encryption isn't timed.
+    miss_requests = iter([_request(_cookie()) for _ in range(n)])
+    miss = timeit.timeit(lambda: read_session(next(miss_requests)), number=n) / n
+
+    print(f"read_session over {n} calls:")
+    print(f"  miss (decrypt): {miss * 1e6:6.1f} us/call")
+    print(f"  hit (cached):   {hit * 1e6:6.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
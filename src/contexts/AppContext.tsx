@@ -1277,7 +1277,7 @@ export function AppProvider({ children }: {children: ReactNode}) {
                         fullContent += chunk;
                         setPendingDatasetDescriptionForDataset(regenDatasetId, fullContent);
                     },
-                    undefined, mode,
+                    undefined, mode, true,
                 );
                 addTokenUsage(result.usage);
                 setStatus({
@@ -1320,7 +1320,7 @@ export function AppProvider({ children }: {children: ReactNode}) {
                         fullContent += chunk;
                         setPendingColumnDescriptionForDataset(regenDatasetId, columnName, fullContent);
                     },
-                    undefined, mode,
+                    undefined, mode, true,
                 );
                 addTokenUsage(result.usage);
                 setStatus({
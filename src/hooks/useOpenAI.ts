@@ -11,10 +11,13 @@ export function useOpenAI() {
             systemPrompt: string,
             onChunk: (chunk: string) => void,
             abortSignal?: AbortSignal,
-            mode: GenerationMode = 'default'
+            mode: GenerationMode = 'default',
+            noCache = false
         ): Promise<{usage: TokenUsage; aborted: boolean}> => {
             // The server resolves the model from the encrypted session config and
             // .env fallbacks based on `mode`, so we don't send `model` here.
+            // `noCache` asks for a fresh generation instead of a cached one
+            // (explicit regenerate).
             const response = await fetch(`${API_BASE_URL}/api/openai/chat/stream`, {
                 method: 'POST',
                 headers: {
@@ -26,6 +29,7 @@ export function useOpenAI() {
                     baseURL: config.baseURL,
                     apiKey: config.apiKey,
                     mode,
+                    noCache,
                 }),
                 signal: abortSignal,
             });